@@ -0,0 +1,217 @@
+import math
+
+TWO_PI = 2 * math.pi
+
+
+class RunningStats:
+    """Media, desviación típica, mínimo y máximo en una pasada (algoritmo de Welford), con memoria O(1)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def copy(self):
+        stats = RunningStats()
+        stats.__dict__.update(self.__dict__)
+        return stats
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count > 1 else 0.0
+
+    def as_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "mean": self.mean, "std": self.std, "min": self.min, "max": self.max}
+
+
+class TrajectoryAnalytics:
+    """Métricas de la ejecución calculadas en línea desde DifferentialRobot.update()
+
+    No guarda historial: cada paso actualiza acumuladores y estadísticas
+    de Welford, así que la memoria no crece con la duración. Un tramo
+    (leg) es el recorrido hacia un mismo objetivo; el error de seguimiento
+    y el sobrepaso se miden respecto a la recta que va del inicio del tramo
+    al objetivo (o respecto al tramo activo de la ruta en AUTO_PURSUIT).
+    En AUTO_PURSUIT toda la ruta es un solo tramo hacia su último punto.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.steps = 0
+        self.path_length = 0.0
+        self.energy = 0.0  # ∫ (V_izq² + V_der²) dt, en V²·s
+        self.tracking_error = RunningStats()  # distancia al tramo activo (m)
+        self.heading_error = RunningStats()  # |error de rumbo| respecto al tramo mientras se avanza (rad)
+        self.time_to_target = RunningStats()  # s desde el inicio de cada tramo hasta llegar al objetivo
+        self.overshoot = RunningStats()  # m recorridos más allá del objetivo, por tramo terminado
+        self.legs = 0
+        self._mode = None  # modo y objetivo del tramo activo (None sin tramo)
+        self._target = None
+        self._leg_start = (0.0, 0.0)
+        self._leg_time = 0.0
+        self._leg_reached = False
+        self._leg_overshoot = 0.0
+
+    def observe(self, robot, dt, previous_x, previous_y):
+        """Actualiza las métricas tras un paso de dt que llevó al robot desde (previous_x, previous_y)"""
+        x, y = robot.x, robot.y
+        self.time += dt
+        self.steps += 1
+        self.path_length += math.hypot(x - previous_x, y - previous_y)
+        left, right = robot.left_voltage, robot.right_voltage
+        self.energy += (left * left + right * right) * dt
+
+        mode = robot.control_mode
+        target = robot.target_position if mode != "MANUAL" else None
+        # Comparar primero por identidad: el objetivo suele ser el mismo objeto en cada paso
+        if mode != self._mode or (target is not self._target and target != self._target):
+            # El control pasa al siguiente punto (o a MANUAL) en el mismo paso en que llega:
+            # comprobar la llegada del tramo saliente con la pose de este paso antes de cerrarlo
+            if self._target is not None:
+                self._check_reached(x, y, robot.position_tolerance)
+            self._end_leg()
+            if target:
+                self._mode, self._target = mode, target
+                self._leg_start = (previous_x, previous_y)
+                self._leg_time = self.time - dt
+                self._leg_reached = False
+                self._leg_overshoot = 0.0
+        if self._target is None:
+            return
+
+        # Tramo de referencia: inicio del tramo → objetivo, o el segmento activo de la ruta
+        target_x, target_y = target[0], target[1]
+        if mode == "AUTO_PURSUIT" and 0 < robot.current_path_index < len(robot.path):
+            ax, ay = robot.path.xy[robot.current_path_index - 1].tolist()
+            bx, by = robot.path.xy[robot.current_path_index].tolist()
+        else:
+            (ax, ay), bx, by = self._leg_start, target_x, target_y
+        dx, dy = bx - ax, by - ay
+        length = math.hypot(dx, dy)
+        distance = math.hypot(target_x - x, target_y - y)
+
+        if length > 1e-9:
+            ux, uy = dx / length, dy / length
+            along = (x - ax) * ux + (y - ay) * uy
+            if along < 0.0:
+                across = math.hypot(x - ax, y - ay)
+            elif along > length:
+                across = math.hypot(x - bx, y - by)
+            else:
+                across = abs((x - ax) * uy - (y - ay) * ux)
+            self.tracking_error.add(across)
+
+            # Sobrepaso: avance más allá del objetivo en la dirección de llegada
+            if along - length > self._leg_overshoot and mode != "AUTO_PURSUIT":
+                self._leg_overshoot = along - length
+
+            # Rumbo sólo mientras se avanza hacia el objetivo (no al girar en el sitio ni al orientarse al final)
+            if distance >= robot.position_tolerance and abs(robot.linear_velocity) > 1e-3:
+                error = (math.atan2(uy, ux) - robot.theta + math.pi) % TWO_PI - math.pi
+                self.heading_error.add(abs(error))
+
+        self._check_reached(x, y, robot.position_tolerance)
+
+    def _check_reached(self, x, y, tolerance):
+        if not self._leg_reached and math.hypot(self._target[0] - x, self._target[1] - y) < tolerance:
+            self._leg_reached = True
+            self.time_to_target.add(self.time - self._leg_time)
+
+    def _end_leg(self):
+        if self._target is not None:
+            self.overshoot.add(self._leg_overshoot)
+            self.legs += 1
+        self._mode = self._target = None
+
+    def summary(self):
+        """Resumen de la ejecución (incluye el tramo en curso)"""
+        overshoot = self.overshoot.copy()
+        if self._target is not None:
+            overshoot.add(self._leg_overshoot)
+        return {
+            "time": self.time,
+            "steps": self.steps,
+            "path_length": self.path_length,
+            "energy": self.energy,
+            "legs": self.legs + (self._target is not None),
+            "targets_reached": self.time_to_target.count,
+            "time_to_target": self.time_to_target.as_dict(),
+            "tracking_error": self.tracking_error.as_dict(),
+            "heading_error": self.heading_error.as_dict(),
+            "overshoot": overshoot.as_dict(),
+        }
+
+    def report(self):
+        """Resumen en líneas de texto legibles"""
+        summary = self.summary()
+        lines = [f"Tiempo: {summary['time']:.2f} s | Recorrido: {summary['path_length']:.2f} m | "
+                 f"Energía: {summary['energy']:.1f} V²·s"]
+        stats = summary["time_to_target"]
+        if stats["count"]:
+            lines.append(f"Objetivos alcanzados: {stats['count']} | Tiempo medio: {stats['mean']:.2f} s "
+                         f"(máx {stats['max']:.2f} s)")
+        stats = summary["tracking_error"]
+        if stats["count"]:
+            lines.append(f"Error de seguimiento: media {stats['mean']:.3f} m, máx {stats['max']:.3f} m")
+        stats = summary["heading_error"]
+        if stats["count"]:
+            lines.append(f"Error de rumbo: media {math.degrees(stats['mean']):.1f}°, "
+                         f"desv. {math.degrees(stats['std']):.1f}°")
+        stats = summary["overshoot"]
+        if stats["count"]:
+            lines.append(f"Sobrepaso: máx {stats['max']:.3f} m en {stats['count']} tramos")
+        return lines
+
+
+def self_check(dt=0.01, max_time=60.0):
+    """Comprobación de regresión: cada misión de referencia debe contar todos sus objetivos alcanzados
+
+    Devuelve una lista de (nombre, alcanzados, esperados).
+    """
+    # Importación diferida: robot_simulador importa este módulo
+    from robot_simulador import DifferentialRobot
+
+    missions = (
+        ("un punto de ruta", lambda robot: robot.set_path([(3.0, 0.0, 0.0)]), 1),
+        ("dos puntos colineales", lambda robot: robot.set_path([(2.0, 0.0, 0.0), (4.0, 0.0, 0.0)]), 2),
+        ("objetivo", lambda robot: robot.set_target_position(2.0, 1.0, 0.5), 1),
+        ("persecución", lambda robot: robot.follow_path([(1.0, 0.0, 0.0), (3.0, 1.0, 0.0), (5.0, 1.0, 0.0)]), 1),
+    )
+    results = []
+    for name, start, expected in missions:
+        robot = DifferentialRobot()
+        robot.analytics = analytics = TrajectoryAnalytics()
+        start(robot)
+        for _ in range(int(max_time / dt)):
+            robot.update(dt)
+            if robot.control_mode == "MANUAL" or analytics.time_to_target.count >= expected:
+                break
+        # Unos pasos más para cerrar el último tramo
+        for _ in range(10):
+            robot.update(dt)
+        results.append((name, analytics.summary()["targets_reached"], expected))
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    failed = False
+    for name, reached, expected in self_check():
+        print(f"{name}: {reached}/{expected} objetivos alcanzados")
+        failed |= reached != expected
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,260 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import numpy as np
+
+from robot_simulador import DifferentialRobot
+from simulador_headless import HeadlessRunner
+from flota import RobotFleet
+from evasion import ReciprocalAvoidance
+from obstaculos import ObstacleWorld, CircleObstacle
+from lidar import Lidar
+from localizacion import ParticleFilter
+
+
+def best_time(func, repeat=5):
+    """Mejor tiempo (s) de varias ejecuciones de func()"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_update(integrator, steps=20000):
+    robot = DifferentialRobot()
+    robot.integrator = integrator
+    robot.left_voltage = 5.0
+    robot.right_voltage = 4.0
+
+    def run():
+        for _ in range(steps):
+            robot.update(0.01)
+    return steps / best_time(run), "pasos/s"
+
+
+def bench_move_to_target(calls=20000):
+    robot = DifferentialRobot()
+    robot.set_target_position(5.0, 3.0, 1.0)
+    robot.theta = 0.5
+
+    def run():
+        for _ in range(calls):
+            robot.move_to_target()
+    return best_time(run) / calls * 1e6, "us/llamada"
+
+
+def bench_trail_append(length, appends=50000):
+    robot = DifferentialRobot()
+    robot.max_trail_length = length
+    trail = robot.trail
+    # Llenar el buffer para medir el caso estacionario (descartando puntos)
+    for i in range(min(length, 200000)):
+        trail.append(i, i)
+
+    def run():
+        for i in range(appends):
+            trail.append(i, -i)
+    return best_time(run) / appends * 1e9, "ns/punto"
+
+
+def bench_headless(steps=20000):
+    """Misión con ruta en el ejecutor sin ventana: pasos de simulación por segundo"""
+    def run():
+        robot = DifferentialRobot()
+        robot.set_path([(3.0, 1.0, 0.0), (3.0, 4.0, math.pi / 2), (-2.0, 3.0, math.pi)])
+        HeadlessRunner(robot, dt=0.01).run(max_steps=steps, stop_when=None)
+    return steps / best_time(run, repeat=3), "pasos/s"
+
+
+def bench_fleet(count, steps=100, avoidance=False):
+    rng = np.random.default_rng(0)
+    fleet = RobotFleet(count)
+    fleet.x[:] = rng.uniform(-10, 10, count)
+    fleet.y[:] = rng.uniform(-10, 10, count)
+    fleet.set_target_positions(np.arange(count), rng.uniform(-10, 10, count), rng.uniform(-10, 10, count))
+    if avoidance:
+        fleet.avoidance = ReciprocalAvoidance()
+
+    def run():
+        for _ in range(steps):
+            fleet.update(0.01)
+    return count * steps / best_time(run, repeat=3), "robots·paso/s"
+
+
+def bench_lidar(count, obstacles=2000, repeat=3):
+    """Escaneos de 360 haces de count robots contra obstáculos y entre sí"""
+    rng = np.random.default_rng(0)
+    world = ObstacleWorld([CircleObstacle(*rng.uniform(-20, 20, 2), 0.3) for _ in range(obstacles)])
+    x, y, theta = rng.uniform(-18, 18, count), rng.uniform(-18, 18, count), rng.uniform(0, 2 * math.pi, count)
+    lidar = Lidar(beams=360)
+
+    def run():
+        lidar.scan_many(x, y, theta, world, footprint=(0.48, 0.32))
+    return best_time(run, repeat) * 1000.0, "ms/escaneo"
+
+
+def bench_localization(particles=10000, steps=2000, dt=0.001):
+    """Coste medio del filtro de partículas por paso de física a 1 kHz (predicción y corrección a su ritmo)"""
+    rng = np.random.default_rng(0)
+    world = ObstacleWorld([CircleObstacle(*rng.uniform(-10, 10, 2), 0.3) for _ in range(200)])
+    lidar = Lidar(beams=360, seed=0)
+    robot = DifferentialRobot()
+    robot.obstacles = world
+    scan = lidar.scan_robot(robot)
+    localizer = ParticleFilter(particles, world, lidar, seed=0)
+    localizer.initialize(0.0, 0.0, 0.0)
+
+    def run():
+        for _ in range(steps):
+            localizer.predict(10.0, 9.0, robot.wheel_radius, robot.wheel_distance, dt)
+            localizer.correct(scan)
+    return best_time(run, repeat=3) / steps * 1e6, "us/paso"
+
+
+def bench_draw(frames=200):
+    """Tiempo de dibujo por cuadro (cuadrícula + robot); None si no hay contexto OpenGL"""
+    try:
+        import pygame
+        from pygame.locals import DOUBLEBUF, OPENGL, HIDDEN
+        from OpenGL.GL import (glFinish, glClear, glGetString, GL_COLOR_BUFFER_BIT,
+                               GL_DEPTH_BUFFER_BIT, GL_VERSION)
+        from OpenGL.contextdata import getContext
+        from OpenGL.error import Error as GLError
+        import robot_simulador
+    except ImportError:
+        return None
+
+    # Sólo la creación del contexto puede fallar sin que sea un error del dibujo
+    pygame.init()
+    try:
+        pygame.display.set_mode((robot_simulador.SCREEN_WIDTH, robot_simulador.SCREEN_HEIGHT),
+                                DOUBLEBUF | OPENGL | HIDDEN)
+        # PyOpenGL debe ver el contexto creado por SDL (si no, los arreglos de vértices fallan)
+        getContext()
+        version = glGetString(GL_VERSION)
+    except (pygame.error, GLError):
+        version = None
+    if not version:
+        pygame.quit()
+        return None
+
+    simulator = object.__new__(robot_simulador.Simulator)
+    simulator.robot = simulator.state = DifferentialRobot()
+    simulator.camera_mode = "FIXED"
+    simulator.camera_distance = 10.0
+    simulator.camera_height = 8.0
+    simulator.camera_angle = 0.0
+    robot = simulator.robot
+    robot.set_path([(float(i % 7), float(i // 7), 0.0) for i in range(50)])
+    robot.left_voltage, robot.right_voltage = 5.0, 4.0
+    for _ in range(robot.max_trail_length):
+        robot.update(0.01)
+
+    def run():
+        for _ in range(frames):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            simulator.update_camera()
+            simulator.draw_grid()
+            robot.draw()
+        glFinish()
+
+    try:
+        run()
+        elapsed = best_time(run, repeat=3)
+    finally:
+        pygame.quit()
+    return elapsed / frames * 1000.0, "ms/cuadro"
+
+
+# Métricas donde un valor mayor es mejor (el resto son tiempos: menor es mejor)
+HIGHER_IS_BETTER = ("pasos/s", "robots·paso/s")
+
+
+def run_suite(quick=False):
+    scale = 0.2 if quick else 1.0
+    results = {}
+
+    def add(name, measurement):
+        if measurement is None:
+            print(f"{name:<32} (omitido)")
+            return
+        value, unit = measurement
+        results[name] = {"value": value, "unit": unit}
+        print(f"{name:<32} {value:>14.2f} {unit}")
+
+    add("update.euler", bench_update("EULER", int(20000 * scale)))
+    add("update.exact", bench_update("EXACT", int(20000 * scale)))
+    add("move_to_target", bench_move_to_target(int(20000 * scale)))
+    for length in (1000, 10000, 100000, 1000000):
+        add(f"trail_append.{length}", bench_trail_append(length, int(50000 * scale)))
+    add("headless.path_mission", bench_headless(int(20000 * scale)))
+    for count in (100, 10000):
+        add(f"fleet.update.{count}", bench_fleet(count, max(10, int(100 * scale))))
+    add("fleet.avoidance.1000", bench_fleet(1000, max(10, int(100 * scale)), avoidance=True))
+    add("lidar.scan.200x360", bench_lidar(200))
+    add("localization.step.10000", bench_localization(10000, max(500, int(2000 * scale))))
+    add("draw.frame", bench_draw(max(20, int(200 * scale))))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Imprime las diferencias con una ejecución anterior y devuelve las regresiones"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or previous["value"] == 0:
+            continue
+        ratio = current["value"] / previous["value"]
+        # Normalizar para que ratio > 1 signifique siempre "más lento"
+        slowdown = 1 / ratio if current["unit"] in HIGHER_IS_BETTER else ratio
+        flag = ""
+        if slowdown > 1 + threshold:
+            flag = "  <-- REGRESIÓN"
+            regressions.append(name)
+        print(f"{name:<32} {previous['value']:>14.2f} -> {current['value']:>14.2f} "
+              f"{current['unit']} ({(slowdown - 1) * 100:+.1f}% tiempo){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los bucles críticos del simulador")
+    parser.add_argument("--out", default="benchmark.json", help="Archivo JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento relativo tolerado antes de marcar regresión")
+    parser.add_argument("--quick", action="store_true", help="Cargas de trabajo reducidas")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regresión(es): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
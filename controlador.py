@@ -0,0 +1,25 @@
+class ControlGains:
+    """Ganancias del controlador de move_to_target (los valores por defecto son los de siempre)"""
+
+    FIELDS = ("align_voltage", "turn_voltage", "heading_gate", "turn_slowdown_angle",
+              "base_voltage", "steering_gain", "slowdown_distance", "min_speed_factor")
+
+    def __init__(self, **values):
+        self.align_voltage = 2.0  # voltios al girar en el sitio para la orientación final
+        self.turn_voltage = 3.0  # voltios al girar en el sitio hacia el objetivo
+        self.heading_gate = 0.1  # radianes de error de rumbo a partir de los cuales se gira en el sitio
+        self.turn_slowdown_angle = 0.5  # radianes bajo los que el giro en el sitio se atenúa
+        self.base_voltage = 10.0  # voltios de avance
+        self.steering_gain = 2.0  # voltios por radián de error de rumbo al avanzar
+        self.slowdown_distance = 1.0  # metros a partir de los que se frena al acercarse
+        self.min_speed_factor = 0.3  # fracción mínima del voltaje de avance al frenar
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Ganancia desconocida: {name!r}")
+            setattr(self, name, float(value))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def copy(self):
+        return ControlGains(**self.as_dict())
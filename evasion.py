@@ -0,0 +1,259 @@
+import numpy as np
+
+from flota import wrap_angle, MODE_MANUAL, CONTROL_MODES
+
+
+def neighbor_pairs(x, y, radius):
+    """Pares (i, j), i != j, de puntos a menos de radius, con una rejilla uniforme de celda radius
+
+    La rejilla se reconstruye en cada llamada ordenando los puntos por celda, y
+    cada punto sólo examina sus 9 celdas vecinas: el coste es O(N·k) con k el
+    número medio de vecinos, en lugar de O(N^2).
+    """
+    count = len(x)
+    if count < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    cell_x = np.floor(x / radius).astype(np.int64)
+    cell_y = np.floor(y / radius).astype(np.int64)
+    cell_x -= cell_x.min() - 1
+    cell_y -= cell_y.min() - 1
+    # Margen de una celda por cada lado para que los desplazamientos no se solapen entre columnas
+    rows = cell_y.max() + 2
+    keys = cell_x * rows + cell_y
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    first = []
+    second = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            neighbor_keys = keys + dx * rows + dy
+            start = np.searchsorted(sorted_keys, neighbor_keys, side="left")
+            end = np.searchsorted(sorted_keys, neighbor_keys, side="right")
+            counts = end - start
+            total = counts.sum()
+            if total == 0:
+                continue
+            # Expandir los rangos [start, end) de cada punto en una sola pasada
+            owners = np.repeat(np.arange(count), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            first.append(owners)
+            second.append(order[np.repeat(start, counts) + offsets])
+
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+    dx = x[j] - x[i]
+    dy = y[j] - y[i]
+    keep = (i != j) & (dx * dx + dy * dy < radius * radius)
+    return i[keep], j[keep]
+
+
+class ReciprocalAvoidance:
+    """Evasión recíproca entre robots (ORCA) aplicada sobre los voltajes ya calculados
+
+    Cada robot convierte sus voltajes (los de move_to_target() o los manuales)
+    en una velocidad preferida, se construyen los semiplanos ORCA frente a los
+    vecinos cercanos y la velocidad se corrige con unas pocas pasadas de
+    proyección vectorizadas. Sólo se modifican los voltajes de los robots cuya
+    velocidad cambia; el resto conserva el comando original.
+
+    Con neighbor_distance=None el radio de búsqueda de vecinos se deduce en
+    cada paso del horizonte y del límite de velocidad: dos robots que se
+    acercan de frente a max_speed pueden chocar dentro de time_horizon desde
+    2·time_horizon·max_speed más la suma de sus radios, y un radio menor los
+    ignoraría aun estando en conflicto.
+    """
+
+    def __init__(self, time_horizon=2.0, neighbor_distance=None, margin=0.05,
+                 iterations=8, heading_time=0.5, side_bias=0.3):
+        self.time_horizon = time_horizon
+        self.neighbor_distance = neighbor_distance  # None: deducido de time_horizon y max_speed
+        self.margin = margin
+        self.iterations = iterations
+        self.heading_time = heading_time  # segundos para corregir el error de rumbo
+        self.side_bias = side_bias  # radianes que se gira a la derecha la velocidad preferida al haber conflicto
+        self.pairs = 0  # pares de vecinos del último paso (diagnóstico)
+
+    def neighbor_radius(self, max_speed, radius):
+        """Distancia a la que se consideran vecinos dos robots (neighbor_distance si se fijó)"""
+        if self.neighbor_distance is not None:
+            return self.neighbor_distance
+        return 2.0 * self.time_horizon * np.max(max_speed, initial=0.0) + 2.0 * np.max(radius, initial=0.0)
+
+    def orca_lines(self, px, py, vx, vy, radius, share, i, j, dt):
+        """Semiplanos ORCA de cada par (i, j): punto y normal, permitido si n·(v - punto) >= 0
+
+        share es la fracción de la maniobra que asume i en cada par (0.5 recíproca).
+        """
+        rel_x = px[j] - px[i]
+        rel_y = py[j] - py[i]
+        rvx = vx[i] - vx[j]
+        rvy = vy[i] - vy[j]
+        dist_sq = rel_x * rel_x + rel_y * rel_y
+        combined = radius[i] + radius[j]
+        combined_sq = combined * combined
+        inv_tau = 1.0 / self.time_horizon
+
+        # Sin colisión: el cono de velocidades truncado en el horizonte temporal
+        w_x = rvx - inv_tau * rel_x
+        w_y = rvy - inv_tau * rel_y
+        w_len = np.maximum(np.hypot(w_x, w_y), 1e-12)
+        dot = w_x * rel_x + w_y * rel_y
+        cutoff = (dot < 0.0) & (dot * dot > combined_sq * w_len * w_len)
+
+        # Región del círculo de corte: normal en la dirección de w
+        cut_nx, cut_ny = w_x / w_len, w_y / w_len
+        cut_scale = combined * inv_tau - w_len
+        cut_ux, cut_uy = cut_scale * cut_nx, cut_scale * cut_ny
+
+        # Región de las piernas del cono: proyectar la velocidad relativa sobre la pierna más cercana
+        leg = np.sqrt(np.maximum(dist_sq - combined_sq, 0.0))
+        safe_dist_sq = np.maximum(dist_sq, 1e-12)
+        left = rel_x * w_y - rel_y * w_x > 0.0
+        dir_x = np.where(left, rel_x * leg - rel_y * combined, rel_x * leg + rel_y * combined) / safe_dist_sq
+        dir_y = np.where(left, rel_x * combined + rel_y * leg, -rel_x * combined + rel_y * leg) / safe_dist_sq
+        dir_x = np.where(left, dir_x, -dir_x)
+        dir_y = np.where(left, dir_y, -dir_y)
+        along = rvx * dir_x + rvy * dir_y
+        leg_ux = along * dir_x - rvx
+        leg_uy = along * dir_y - rvy
+        leg_nx, leg_ny = -dir_y, dir_x
+
+        # Ya en colisión: separarse en un solo paso de simulación
+        inv_dt = 1.0 / dt
+        c_x = rvx - inv_dt * rel_x
+        c_y = rvy - inv_dt * rel_y
+        c_len = np.maximum(np.hypot(c_x, c_y), 1e-12)
+        col_nx, col_ny = c_x / c_len, c_y / c_len
+        col_scale = combined * inv_dt - c_len
+        col_ux, col_uy = col_scale * col_nx, col_scale * col_ny
+
+        colliding = dist_sq <= combined_sq
+        ux = np.where(colliding, col_ux, np.where(cutoff, cut_ux, leg_ux))
+        uy = np.where(colliding, col_uy, np.where(cutoff, cut_uy, leg_uy))
+        nx = np.where(colliding, col_nx, np.where(cutoff, cut_nx, leg_nx))
+        ny = np.where(colliding, col_ny, np.where(cutoff, cut_ny, leg_ny))
+
+        return vx[i] + share * ux, vy[i] + share * uy, nx, ny
+
+    def solve(self, vx, vy, max_speed, i, point_x, point_y, nx, ny):
+        """Aproxima la velocidad más cercana a la preferida que cumple los semiplanos de cada robot"""
+        count = len(vx)
+        vx = vx.copy()
+        vy = vy.copy()
+        for _ in range(self.iterations):
+            slack = nx * (vx[i] - point_x) + ny * (vy[i] - point_y)
+            violated = slack < 0.0
+            if not violated.any():
+                break
+            push = np.where(violated, -slack, 0.0)
+            hits = np.bincount(i, weights=violated, minlength=count)
+            scale = 1.0 / np.maximum(hits, 1.0)
+            vx += np.bincount(i, weights=push * nx, minlength=count) * scale
+            vy += np.bincount(i, weights=push * ny, minlength=count) * scale
+
+            # Respetar la velocidad máxima de cada robot
+            speed = np.hypot(vx, vy)
+            limit = np.where(speed > max_speed, max_speed / np.maximum(speed, 1e-12), 1.0)
+            vx *= limit
+            vy *= limit
+        return vx, vy
+
+    def apply(self, fleet, dt):
+        """Corrige los voltajes de una RobotFleet (o de cualquier objeto con sus mismos arreglos)"""
+        x, y, theta = fleet.x, fleet.y, fleet.theta
+        radius = 0.5 * np.hypot(1.2 * fleet.wheel_distance, 0.8 * fleet.wheel_distance) + self.margin
+
+        # Velocidad preferida: la rapidez que piden los voltajes comandados, dirigida hacia el
+        # objetivo si lo hay (un robot que gira en el sitio también quiere avanzar)
+        wheel_left = np.clip(fleet.motor_constant * fleet.left_voltage, -fleet.max_wheel_velocity, fleet.max_wheel_velocity)
+        wheel_right = np.clip(fleet.motor_constant * fleet.right_voltage, -fleet.max_wheel_velocity, fleet.max_wheel_velocity)
+        preferred = (np.abs(wheel_right) + np.abs(wheel_left)) * fleet.wheel_radius / 2
+        heading = theta.copy()
+        targeted = fleet.has_target & (fleet.control_mode != MODE_MANUAL)
+        heading[targeted] = np.arctan2(fleet.target_position[targeted, 1] - y[targeted],
+                                       fleet.target_position[targeted, 0] - x[targeted])
+        pref_x = preferred * np.cos(heading)
+        pref_y = preferred * np.sin(heading)
+
+        # Velocidad actual (la que ven los vecinos)
+        cur_x = fleet.linear_velocity * np.cos(theta)
+        cur_y = fleet.linear_velocity * np.sin(theta)
+
+        max_speed = fleet.max_wheel_velocity * fleet.wheel_radius
+        i, j = neighbor_pairs(x, y, self.neighbor_radius(max_speed, radius))
+        self.pairs = len(i)
+        if len(i) == 0:
+            return 0
+
+        # Los robots en modo manual no evitan: el otro asume toda la maniobra
+        active = fleet.control_mode != MODE_MANUAL
+        share = np.where(active[j], 0.5, 1.0)
+        point_x, point_y, nx, ny = self.orca_lines(x, y, cur_x, cur_y, radius, share, i, j, dt)
+        mine = active[i]
+        i, point_x, point_y, nx, ny = i[mine], point_x[mine], point_y[mine], nx[mine], ny[mine]
+        if len(i) == 0:
+            return 0
+
+        # Desempate hacia la derecha en los robots cuya velocidad preferida viola alguna restricción
+        # (sin él, los cruces simétricos se bloquean en el centro)
+        slack = nx * (pref_x[i] - point_x) + ny * (pref_y[i] - point_y)
+        blocked = np.bincount(i[slack < 0.0], minlength=len(x)) > 0
+        bias = np.where(blocked, -self.side_bias, 0.0)
+        start_x = pref_x * np.cos(bias) - pref_y * np.sin(bias)
+        start_y = pref_x * np.sin(bias) + pref_y * np.cos(bias)
+
+        new_x, new_y = self.solve(start_x, start_y, max_speed, i, point_x, point_y, nx, ny)
+
+        changed = np.flatnonzero(np.hypot(new_x - start_x, new_y - start_y) + np.abs(bias) > 1e-6)
+        if len(changed) == 0:
+            return 0
+
+        # Volver a comandos de rueda: avanzar según la proyección sobre el rumbo y girar hacia la nueva dirección
+        theta_c = theta[changed]
+        speed = np.hypot(new_x[changed], new_y[changed])
+        heading_error = wrap_angle(np.arctan2(new_y[changed], new_x[changed]) - theta_c)
+        linear = speed * np.cos(heading_error)
+        r = fleet.wheel_radius[changed]
+        L = fleet.wheel_distance[changed]
+        old_angular = (wheel_right[changed] - wheel_left[changed]) * r / L
+        angular = np.where(speed > 1e-6, heading_error / self.heading_time, old_angular)
+
+        right = (linear + angular * L / 2) / r
+        left = (linear - angular * L / 2) / r
+        limit = fleet.max_wheel_velocity[changed]
+        scale = np.maximum(1.0, np.maximum(np.abs(left), np.abs(right)) / limit)
+        fleet.left_voltage[changed] = left / scale / fleet.motor_constant[changed]
+        fleet.right_voltage[changed] = right / scale / fleet.motor_constant[changed]
+        return len(changed)
+
+
+class _RobotArrays:
+    """Vista en arreglos de una lista de DifferentialRobot con la interfaz que usa apply()"""
+
+    def __init__(self, robots):
+        def gather(name):
+            return np.fromiter((getattr(robot, name) for robot in robots), dtype=np.float64, count=len(robots))
+        for name in ("x", "y", "theta", "linear_velocity", "left_voltage", "right_voltage",
+                     "wheel_radius", "wheel_distance", "motor_constant", "max_wheel_velocity"):
+            setattr(self, name, gather(name))
+        self.control_mode = np.array([CONTROL_MODES.index(robot.control_mode)
+                                      if robot.control_mode in CONTROL_MODES else len(CONTROL_MODES)
+                                      for robot in robots])
+        self.has_target = np.array([robot.target_position is not None for robot in robots], dtype=bool)
+        self.target_position = np.array([robot.target_position or (0.0, 0.0, 0.0) for robot in robots],
+                                        dtype=np.float64).reshape(-1, 3)
+
+
+def avoid_robots(robots, dt, avoidance=None):
+    """Aplica la evasión recíproca a una lista de DifferentialRobot tras su update()"""
+    avoidance = avoidance or ReciprocalAvoidance()
+    arrays = _RobotArrays(robots)
+    changed = avoidance.apply(arrays, dt)
+    if changed:
+        for robot, left, right in zip(robots, arrays.left_voltage, arrays.right_voltage):
+            robot.left_voltage = float(left)
+            robot.right_voltage = float(right)
+    return changed
@@ -0,0 +1,213 @@
+import argparse
+import json
+import math
+import time
+import numpy as np
+
+from obstaculos import ObstacleWorld
+from grabacion import TrajectoryRecorder
+from ruta import ArrayPath
+
+# Teclas de control manual como bits de una máscara (W, S, A, D)
+KEY_FORWARD = 1
+KEY_BACKWARD = 2
+KEY_LEFT = 4
+KEY_RIGHT = 8
+
+VOLTAGE_STEP = 0.1  # voltios por cuadro con una tecla pulsada
+VOLTAGE_DECAY = 0.95  # factor por cuadro sin teclas pulsadas
+
+
+def apply_manual_control(robot, mask):
+    """Control manual de un cuadro a partir de la máscara de teclas pulsadas (sólo en modo MANUAL)"""
+    if robot.control_mode != "MANUAL":
+        return
+
+    # Control de motores
+    if mask & KEY_FORWARD:
+        robot.left_voltage += VOLTAGE_STEP
+        robot.right_voltage += VOLTAGE_STEP
+    if mask & KEY_BACKWARD:
+        robot.left_voltage -= VOLTAGE_STEP
+        robot.right_voltage -= VOLTAGE_STEP
+    if mask & KEY_LEFT:
+        robot.left_voltage -= VOLTAGE_STEP
+        robot.right_voltage += VOLTAGE_STEP
+    if mask & KEY_RIGHT:
+        robot.left_voltage += VOLTAGE_STEP
+        robot.right_voltage -= VOLTAGE_STEP
+
+    # Limitar voltajes
+    robot.left_voltage = max(min(robot.left_voltage, robot.max_voltage), -robot.max_voltage)
+    robot.right_voltage = max(min(robot.right_voltage, robot.max_voltage), -robot.max_voltage)
+
+    # Reducir voltajes gradualmente si no se presionan teclas
+    if not mask:
+        robot.left_voltage *= VOLTAGE_DECAY
+        robot.right_voltage *= VOLTAGE_DECAY
+
+        # Si los voltajes son muy pequeños, establecerlos a cero
+        if abs(robot.left_voltage) < 0.1:
+            robot.left_voltage = 0.0
+        if abs(robot.right_voltage) < 0.1:
+            robot.right_voltage = 0.0
+
+
+def apply_command(robot, kind, data=None):
+    """Aplica al robot una orden del usuario: "reset", "target" (x, y, theta o None) o "path" [(x, y, theta), ...] o ArrayPath"""
+    if kind == "reset":
+        robot.x = 0.0
+        robot.y = 0.0
+        robot.theta = 0.0
+        robot.trail.clear()
+    elif kind == "target":
+        robot.set_target_position(*data)
+    elif kind == "path":
+        # Las rutas importadas llegan ya como ArrayPath: no convertirlas punto a punto
+        robot.set_path(data if isinstance(data, ArrayPath) else [tuple(point) for point in data])
+    else:
+        raise ValueError(f"Orden desconocida: {kind!r}")
+
+
+class InputRecorder:
+    """Graba la entrada de una sesión interactiva para poder re-simularla sin ventana
+
+    Cada lectura de la entrada (tick) guarda el paso de simulación en el
+    que ocurrió y la máscara de teclas de control manual; las órdenes
+    discretas (clics, diálogos, reinicio) se guardan ya resueltas a
+    coordenadas del mundo, con el paso en que se aplicaron y el número de
+    ticks anteriores (su orden respecto a las lecturas). Si el paso de
+    simulación es variable (física al ritmo del dibujo) también se guarda
+    cada dt.
+    """
+
+    def __init__(self, path, robot, header=None):
+        self.path = path
+        self.header = dict(header or {})
+        self.header.update(start=(robot.x, robot.y, robot.theta), integrator=robot.integrator)
+        self._tick_steps = []
+        self._tick_masks = []
+        self._dts = []
+        self.commands = []  # (paso, ticks anteriores, orden, datos)
+
+    def command(self, kind, data, step):
+        """Anota una orden aplicada antes del paso step (llamar con el robot bloqueado, al aplicarla)"""
+        self.commands.append((step, len(self._tick_steps), kind, data))
+
+    def tick(self, step, mask):
+        self._tick_steps.append(step)
+        self._tick_masks.append(mask)
+
+    def step(self, dt):
+        """Anota el dt de un paso de simulación (sólo con paso variable)"""
+        self._dts.append(dt)
+
+    def save(self, robot, steps, fixed_dt=None):
+        """Escribe la sesión junto al estado final (para comprobar la re-simulación)"""
+        header = dict(self.header, steps=steps, fixed_dt=fixed_dt,
+                      final=(robot.x, robot.y, robot.theta), commands=self.commands)
+        # Las rutas en ArrayPath se guardan como listas de puntos
+        header = json.dumps(header, default=lambda value: np.asarray(value).tolist())
+        np.savez_compressed(self.path, header=np.array(header),
+                            tick_steps=np.array(self._tick_steps, dtype=np.int64),
+                            tick_masks=np.array(self._tick_masks, dtype=np.uint8),
+                            dts=np.array(self._dts, dtype=np.float64))
+
+
+class InputLog:
+    """Sesión grabada con InputRecorder"""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.header = json.loads(str(data["header"]))
+            self.tick_steps = data["tick_steps"]
+            self.tick_masks = data["tick_masks"]
+            self.dts = data["dts"]
+        self.steps = self.header["steps"]
+        self.fixed_dt = self.header["fixed_dt"]
+        self.commands = self.header["commands"]
+        if self.commands and len(self.commands[0]) == 3:
+            # Formato anterior (tick, orden, datos): la orden se aplicaba en el paso de su tick
+            self.commands = [(int(self.tick_steps[tick]) if tick < len(self.tick_steps) else self.steps,
+                              tick, kind, data) for tick, kind, data in self.commands]
+
+    def dt(self, step):
+        return self.fixed_dt if self.fixed_dt is not None else float(self.dts[step])
+
+
+def resimulate(log, robot=None, obstacles=None):
+    """Repite una sesión grabada con la cinemática de paso fijo, sin ventana y sin esperas
+
+    Aplica las órdenes y el control manual de cada tick antes del paso en
+    que ocurrieron y en el mismo orden que en la sesión, así que el
+    resultado coincide bit a bit con la original (también con la física en
+    su propio hilo). Devuelve el robot.
+    """
+    # Importación diferida: robot_simulador importa este módulo
+    from robot_simulador import DifferentialRobot
+
+    if robot is None:
+        robot = DifferentialRobot()
+    robot.x, robot.y, robot.theta = log.header["start"]
+    robot.integrator = log.header["integrator"]
+    if obstacles is not None:
+        robot.obstacles = obstacles
+
+    commands = log.commands
+    command_index = 0
+    tick_steps = log.tick_steps.tolist()
+    tick_masks = log.tick_masks.tolist()
+    tick = 0
+    ticks = len(tick_steps)
+    for step in range(log.steps + 1):
+        while True:
+            # Una orden va antes del tick que aún no se había leído al aplicarla
+            if (command_index < len(commands) and commands[command_index][0] == step
+                    and commands[command_index][1] <= tick):
+                _, _, kind, data = commands[command_index]
+                apply_command(robot, kind, data)
+                command_index += 1
+            elif tick < ticks and tick_steps[tick] == step:
+                apply_manual_control(robot, tick_masks[tick])
+                tick += 1
+            else:
+                break
+        if step < log.steps:
+            robot.update(log.dt(step))
+    return robot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-simulación sin ventana de una sesión interactiva grabada")
+    parser.add_argument("session", help="Archivo .npz grabado con robot_simulador.py --record-input")
+    parser.add_argument("--scene", default=None,
+                        help="Escena JSON de obstáculos (por defecto, la de la sesión)")
+    parser.add_argument("--record", default=None, metavar="DIRECTORIO",
+                        help="Grabar la trayectoria re-simulada (grabacion.TrajectoryRecorder)")
+    args = parser.parse_args(argv)
+
+    from robot_simulador import DifferentialRobot, GRID_SPACING
+
+    log = InputLog(args.session)
+    scene = args.scene or log.header.get("scene")
+    obstacles = ObstacleWorld.load(scene, GRID_SPACING) if scene else None
+    robot = DifferentialRobot()
+    if args.record:
+        robot.recorder = TrajectoryRecorder(args.record)
+
+    start = time.perf_counter()
+    resimulate(log, robot, obstacles)
+    elapsed = time.perf_counter() - start
+    if robot.recorder is not None:
+        robot.recorder.close()
+
+    simulated = robot.last_update_time
+    print(f"Pasos: {log.steps} | Tiempo simulado: {simulated:.2f} s | "
+          f"Tiempo real: {elapsed:.2f} s (x{simulated / max(elapsed, 1e-9):.0f})")
+    print(f"Posición final: ({robot.x:.3f}, {robot.y:.3f}) | Orientación: {math.degrees(robot.theta):.1f}°")
+    identical = tuple(log.header["final"]) == (robot.x, robot.y, robot.theta)
+    print("Idéntica a la sesión grabada" if identical else "Difiere de la sesión grabada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+class RobotSnapshot:
+    """Copia consistente del estado del robot que el renderizador puede leer sin bloqueos"""
+
+    __slots__ = ("x", "y", "theta", "v_left", "v_right", "linear_velocity", "angular_velocity",
+                 "left_voltage", "right_voltage", "control_mode", "target_position", "path",
+                 "current_path_index", "trail_points", "scan", "particles", "estimated_pose",
+                 "time", "step")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def capture(self, robot, step):
+        """Copia el estado actual del robot (debe llamarse con el robot bloqueado)"""
+        self.x = robot.x
+        self.y = robot.y
+        self.theta = robot.theta
+        self.v_left = robot.v_left
+        self.v_right = robot.v_right
+        self.linear_velocity = robot.linear_velocity
+        self.angular_velocity = robot.angular_velocity
+        self.left_voltage = robot.left_voltage
+        self.right_voltage = robot.right_voltage
+        self.control_mode = robot.control_mode
+        self.target_position = robot.target_position
+        self.path = robot.path
+        self.current_path_index = robot.current_path_index
+        # La trayectoria no se copia en cada paso: PhysicsThread.snapshot() la sincroniza al leer
+        self.trail_points = None
+        # update() sustituye el arreglo del escaneo en lugar de modificarlo
+        self.scan = robot.scan
+        self.particles = robot.particles
+        self.estimated_pose = robot.estimated_pose
+        self.time = robot.last_update_time
+        self.step = step
+
+    def copy_from(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+
+
+class PhysicsThread(threading.Thread):
+    """Ejecuta física y control a una frecuencia fija en un hilo propio.
+
+    El estado se publica en un doble buffer: el hilo escribe siempre en el
+    buffer trasero y lo intercambia al terminar cada paso, de modo que el
+    renderizador (a 60 Hz) siempre lee un estado completo y un cuadro lento
+    nunca altera el paso de la física.
+    """
+
+    def __init__(self, robot, rate_hz=1000.0, max_catch_up=50):
+        super().__init__(name="fisica", daemon=True)
+        self.robot = robot
+        self.rate_hz = rate_hz
+        self.dt = 1.0 / rate_hz
+        self.max_catch_up = max_catch_up
+
+        # Protege al robot frente a los comandos del hilo principal (entrada del usuario)
+        self.lock = threading.Lock()
+
+        # Doble buffer de estado
+        self._buffers = [RobotSnapshot(), RobotSnapshot()]
+        # Copia de la trayectoria para el lector, puesta al día con los puntos nuevos en cada snapshot()
+        self._trail = type(robot.trail)(robot.trail.capacity)
+        self._trail_seen = (None, 0)
+        self._front = 0
+        self._swap_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self.steps = 0
+        self.dropped_steps = 0
+        with self.lock:
+            self._publish()
+
+    def run(self):
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            if now < next_time:
+                time.sleep(next_time - now)
+                continue
+
+            # Ejecutar los pasos pendientes; si vamos demasiado atrasados, descartar tiempo
+            pending = int((now - next_time) / self.dt) + 1
+            if pending > self.max_catch_up:
+                self.dropped_steps += pending - self.max_catch_up
+                pending = self.max_catch_up
+                next_time = now - (pending - 1) * self.dt
+
+            for _ in range(pending):
+                with self.lock:
+                    self.robot.update(self.dt)
+                    self.steps += 1
+                    self._publish()
+                next_time += self.dt
+
+    def _publish(self):
+        """Escribe el estado en el buffer trasero y lo intercambia con el delantero"""
+        back = 1 - self._front
+        self._buffers[back].capture(self.robot, self.steps)
+        with self._swap_lock:
+            self._front = back
+
+    def snapshot(self, out=None):
+        """Devuelve una copia del último estado publicado
+
+        Con el robot bloqueado el último estado publicado coincide con la
+        trayectoria actual, así que basta con copiar los puntos añadidos desde
+        la llamada anterior (unos pocos por cuadro). trail_points es una vista
+        de la copia del lector: vale hasta la siguiente llamada.
+        """
+        out = out if out is not None else RobotSnapshot()
+        with self.lock:
+            with self._swap_lock:
+                out.copy_from(self._buffers[self._front])
+            self._trail_seen = self._trail.sync_from(self.robot.trail, self._trail_seen)
+        out.trail_points = self._trail.view()
+        return out
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,297 @@
+import math
+import numpy as np
+
+from controlador import ControlGains
+
+# Códigos numéricos de los modos de control (mismo orden que DifferentialRobot.control_mode)
+MODE_MANUAL = 0
+MODE_AUTO_POSITION = 1
+MODE_AUTO_PATH = 2
+CONTROL_MODES = ("MANUAL", "AUTO_POSITION", "AUTO_PATH")
+
+TWO_PI = 2 * math.pi
+
+
+def wrap_angle(angle):
+    """Normaliza ángulos (escalares o arreglos) al intervalo (-pi, pi]"""
+    angle = np.mod(angle, TWO_PI)
+    return np.where(angle > math.pi, angle - TWO_PI, angle)
+
+
+def arc_step(x, y, theta, linear_velocity, angular_velocity, dt):
+    """Versión vectorizada de robot_simulador.arc_step (arco exacto con velocidades constantes)"""
+    half_turn = angular_velocity * dt / 2
+    small = np.abs(half_turn) < 1e-6
+    safe = np.where(small, 1.0, half_turn)
+    chord = np.where(small, 1.0 - half_turn * half_turn / 6, np.sin(safe) / safe)
+    distance = linear_velocity * dt * chord
+    heading = theta + half_turn
+    return (x + distance * np.cos(heading),
+            y + distance * np.sin(heading),
+            theta + 2 * half_turn)
+
+
+class RobotFleet:
+    """Flota de robots diferenciales con el estado guardado en arreglos de NumPy.
+
+    Usa la misma cinemática y el mismo controlador que DifferentialRobot,
+    pero avanza todos los robots en un único paso vectorizado.
+    """
+
+    def __init__(self, count, wheel_radius=0.1, wheel_distance=0.4, max_wheel_velocity=6.0,
+                 motor_constant=0.6, max_voltage=12.0, position_tolerance=0.1, angle_tolerance=0.05):
+        self.count = count
+
+        # Parámetros físicos (uno por robot para permitir flotas heterogéneas)
+        self.wheel_radius = np.full(count, wheel_radius, dtype=np.float64)
+        self.wheel_distance = np.full(count, wheel_distance, dtype=np.float64)
+        self.max_wheel_velocity = np.full(count, max_wheel_velocity, dtype=np.float64)
+        self.motor_constant = np.full(count, motor_constant, dtype=np.float64)
+        self.max_voltage = np.full(count, max_voltage, dtype=np.float64)
+
+        # Estado
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        self.theta = np.zeros(count)
+
+        # Velocidades
+        self.v_left = np.zeros(count)
+        self.v_right = np.zeros(count)
+        self.linear_velocity = np.zeros(count)
+        self.angular_velocity = np.zeros(count)
+
+        # Voltajes
+        self.left_voltage = np.zeros(count)
+        self.right_voltage = np.zeros(count)
+
+        # Modo de control y objetivos
+        self.control_mode = np.full(count, MODE_MANUAL, dtype=np.int8)
+        self.has_target = np.zeros(count, dtype=bool)
+        self.target_position = np.zeros((count, 3))
+
+        # Parámetros de control
+        self.position_tolerance = np.full(count, position_tolerance, dtype=np.float64)
+        self.angle_tolerance = np.full(count, angle_tolerance, dtype=np.float64)
+        self.gains = ControlGains()  # comunes a toda la flota
+
+        # Rutas: todas concatenadas en un solo arreglo con desplazamientos por robot
+        self._paths = [None] * count
+        self.path_points = np.zeros((0, 3))
+        self.path_start = np.zeros(count, dtype=np.int64)
+        self.path_length = np.zeros(count, dtype=np.int64)
+        self.current_path_index = np.zeros(count, dtype=np.int64)
+
+        # Integrador: "EULER" o "EXACT" (arco exacto, sin subpasos; usar dt pequeño en modos AUTO_*)
+        self.integrator = "EULER"
+
+        # Evasión entre robots (evasion.ReciprocalAvoidance) aplicada tras el control; None la desactiva
+        self.avoidance = None
+
+    @classmethod
+    def from_robots(cls, robots):
+        """Crea una flota copiando el estado de una lista de DifferentialRobot
+
+        El controlador vectorizado sólo recorre rutas punto a punto: un robot
+        en AUTO_PURSUIT (follow_path o track_waypoints) produce un ValueError.
+        Las ganancias son comunes a toda la flota, así que también da
+        ValueError si los robots no tienen las mismas ControlGains.
+        """
+        fleet = cls(len(robots))
+        for i, robot in enumerate(robots):
+            if robot.control_mode not in CONTROL_MODES:
+                raise ValueError(f"Robot {i}: el modo {robot.control_mode} no está soportado por RobotFleet "
+                                 f"(sólo {', '.join(CONTROL_MODES)}); usar set_path en lugar de follow_path "
+                                 f"o track_waypoints")
+            fleet.wheel_radius[i] = robot.wheel_radius
+            fleet.wheel_distance[i] = robot.wheel_distance
+            fleet.max_wheel_velocity[i] = robot.max_wheel_velocity
+            fleet.motor_constant[i] = robot.motor_constant
+            fleet.max_voltage[i] = robot.max_voltage
+            fleet.position_tolerance[i] = robot.position_tolerance
+            fleet.angle_tolerance[i] = robot.angle_tolerance
+            if i == 0:
+                fleet.gains = robot.gains.copy()
+            elif robot.gains.as_dict() != fleet.gains.as_dict():
+                differing = [name for name, value in robot.gains.as_dict().items()
+                             if getattr(fleet.gains, name) != value]
+                raise ValueError(f"Robot {i}: sus ganancias ({', '.join(differing)}) difieren de las del "
+                                 f"robot 0 y RobotFleet usa unas ControlGains comunes")
+
+            fleet.x[i] = robot.x
+            fleet.y[i] = robot.y
+            fleet.theta[i] = robot.theta
+            fleet.v_left[i] = robot.v_left
+            fleet.v_right[i] = robot.v_right
+            fleet.linear_velocity[i] = robot.linear_velocity
+            fleet.angular_velocity[i] = robot.angular_velocity
+            fleet.left_voltage[i] = robot.left_voltage
+            fleet.right_voltage[i] = robot.right_voltage
+
+            fleet.control_mode[i] = CONTROL_MODES.index(robot.control_mode)
+            if robot.target_position:
+                fleet.has_target[i] = True
+                fleet.target_position[i] = robot.target_position
+            if robot.path:
+                fleet._paths[i] = np.asarray(robot.path, dtype=np.float64).reshape(-1, 3)
+            fleet.current_path_index[i] = robot.current_path_index
+
+        fleet._rebuild_paths()
+        return fleet
+
+    def apply_to_robots(self, robots):
+        """Copia el estado de la flota de vuelta a una lista de DifferentialRobot"""
+        for i, robot in enumerate(robots):
+            robot.x = float(self.x[i])
+            robot.y = float(self.y[i])
+            robot.theta = float(self.theta[i])
+            robot.v_left = float(self.v_left[i])
+            robot.v_right = float(self.v_right[i])
+            robot.linear_velocity = float(self.linear_velocity[i])
+            robot.angular_velocity = float(self.angular_velocity[i])
+            robot.left_voltage = float(self.left_voltage[i])
+            robot.right_voltage = float(self.right_voltage[i])
+            robot.control_mode = CONTROL_MODES[self.control_mode[i]]
+            if self.has_target[i]:
+                robot.target_position = tuple(float(v) for v in self.target_position[i])
+            robot.current_path_index = int(self.current_path_index[i])
+
+    def set_target_positions(self, indices, x, y, theta=None):
+        """Establece posiciones objetivo y activa el modo automático en los robots indicados"""
+        indices = np.atleast_1d(indices)
+        x = np.broadcast_to(np.asarray(x, dtype=np.float64), indices.shape)
+        y = np.broadcast_to(np.asarray(y, dtype=np.float64), indices.shape)
+        if theta is None:
+            # Si no se especifica theta, calcular ángulo hacia el objetivo
+            theta = np.arctan2(y - self.y[indices], x - self.x[indices])
+        theta = np.broadcast_to(np.asarray(theta, dtype=np.float64), indices.shape)
+
+        self.target_position[indices, 0] = x
+        self.target_position[indices, 1] = y
+        self.target_position[indices, 2] = theta
+        self.has_target[indices] = True
+        self.control_mode[indices] = MODE_AUTO_POSITION
+
+    def set_path(self, index, path):
+        """Establece una ruta (lista o arreglo de (x, y, theta)) para un robot"""
+        self.set_paths([index], [path])
+
+    def set_paths(self, indices, paths):
+        """Establece rutas para varios robots a la vez"""
+        for index, path in zip(indices, paths):
+            points = np.asarray(path, dtype=np.float64).reshape(-1, 3)
+            self._paths[index] = points
+            self.current_path_index[index] = 0
+            self.control_mode[index] = MODE_AUTO_PATH
+        self._rebuild_paths()
+
+    def _rebuild_paths(self):
+        """Reconstruye el arreglo concatenado de rutas"""
+        lengths = np.array([0 if p is None else len(p) for p in self._paths], dtype=np.int64)
+        self.path_length = lengths
+        self.path_start = np.concatenate(([0], np.cumsum(lengths)[:-1])) if self.count else lengths
+        parts = [p for p in self._paths if p is not None and len(p)]
+        self.path_points = np.concatenate(parts) if parts else np.zeros((0, 3))
+
+    def update(self, dt):
+        """Avanza todos los robots un paso de tiempo dt"""
+        # Actualizar velocidades de las ruedas basadas en voltajes y limitarlas
+        self.v_left = np.clip(self.motor_constant * self.left_voltage,
+                              -self.max_wheel_velocity, self.max_wheel_velocity)
+        self.v_right = np.clip(self.motor_constant * self.right_voltage,
+                               -self.max_wheel_velocity, self.max_wheel_velocity)
+
+        # Calcular velocidades de los robots
+        self.linear_velocity = (self.v_right + self.v_left) * self.wheel_radius / 2
+        self.angular_velocity = (self.v_right - self.v_left) * self.wheel_radius / self.wheel_distance
+
+        # Actualizar posición y orientación
+        if self.integrator == "EXACT":
+            self.x, self.y, self.theta = arc_step(self.x, self.y, self.theta,
+                                                  self.linear_velocity, self.angular_velocity, dt)
+        else:
+            self.x += self.linear_velocity * np.cos(self.theta) * dt
+            self.y += self.linear_velocity * np.sin(self.theta) * dt
+            self.theta += self.angular_velocity * dt
+        self.theta %= TWO_PI
+
+        self.update_control()
+        if self.avoidance is not None:
+            self.avoidance.apply(self, dt)
+
+    def update_control(self):
+        """Ejecuta el control automático de todos los robots en modo AUTO_*"""
+        # Modo posición: perseguir el objetivo fijo
+        position = (self.control_mode == MODE_AUTO_POSITION) & self.has_target
+        if position.any():
+            idx = np.flatnonzero(position)
+            self.move_to_target(idx, self.target_position[idx])
+
+        # Modo ruta: perseguir el punto actual de la ruta
+        path_mode = (self.control_mode == MODE_AUTO_PATH) & (self.path_length > 0)
+        if not path_mode.any():
+            return
+        idx = np.flatnonzero(path_mode)
+        following = self.current_path_index[idx] < self.path_length[idx]
+
+        # Robots que ya terminaron la ruta vuelven a modo manual
+        done = idx[~following]
+        idx = idx[following]
+        if len(idx):
+            targets = self.path_points[self.path_start[idx] + self.current_path_index[idx]]
+            self.target_position[idx] = targets
+            self.has_target[idx] = True
+            reached = self.move_to_target(idx, targets)
+            arrived = idx[reached]
+            self.current_path_index[arrived] += 1
+            done = np.concatenate((done, arrived[self.current_path_index[arrived] >= self.path_length[arrived]]))
+
+        self.control_mode[done] = MODE_MANUAL
+        self.left_voltage[done] = 0.0
+        self.right_voltage[done] = 0.0
+
+    def move_to_target(self, indices, targets):
+        """Versión vectorizada de DifferentialRobot.move_to_target
+
+        Ajusta los voltajes de los robots indicados hacia sus objetivos (x, y, theta)
+        y devuelve un arreglo booleano con los que ya llegaron.
+        """
+        gains = self.gains
+        x = self.x[indices]
+        y = self.y[indices]
+        theta = self.theta[indices]
+
+        # Calcular distancia y ángulo al objetivo
+        dx = targets[:, 0] - x
+        dy = targets[:, 1] - y
+        distance = np.sqrt(dx * dx + dy * dy)
+        near = distance < self.position_tolerance[indices]
+
+        # Cerca del objetivo: ajustar la orientación final
+        angle_diff = wrap_angle(targets[:, 2] - theta)
+        reached = near & (np.abs(angle_diff) < self.angle_tolerance[indices])
+        direction = np.where(angle_diff > 0, 1.0, -1.0)
+        factor = np.minimum(1.0, np.abs(angle_diff) / gains.turn_slowdown_angle)
+        near_right = np.where(reached, 0.0, gains.align_voltage * direction * factor)
+        near_left = -near_right
+
+        # Lejos del objetivo: orientarse primero y luego avanzar
+        heading_diff = wrap_angle(np.arctan2(dy, dx) - theta)
+        turning = np.abs(heading_diff) > gains.heading_gate
+        direction = np.where(heading_diff > 0, 1.0, -1.0)
+        factor = np.minimum(1.0, np.abs(heading_diff) / gains.turn_slowdown_angle)
+        turn_right = gains.turn_voltage * direction * factor
+
+        # Avance con ajuste proporcional y reducción al acercarse
+        base_voltage = gains.base_voltage
+        steering = heading_diff * gains.steering_gain
+        slow = np.where(distance < gains.slowdown_distance,
+                        np.maximum(gains.min_speed_factor, distance / gains.slowdown_distance), 1.0)
+        drive_left = (base_voltage - steering) * slow
+        drive_right = (base_voltage + steering) * slow
+
+        far_left = np.where(turning, -turn_right, drive_left)
+        far_right = np.where(turning, turn_right, drive_right)
+
+        self.left_voltage[indices] = np.where(near, near_left, far_left)
+        self.right_voltage[indices] = np.where(near, near_right, far_right)
+        return reached
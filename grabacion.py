@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import numpy as np
+
+# Columnas de cada registro: una por archivo, de ancho fijo, en el orden en que se graban
+COLUMNS = (
+    ("t", np.float64),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("theta", np.float64),
+    ("v_left", np.float64),
+    ("v_right", np.float64),
+    ("left_voltage", np.float64),
+    ("right_voltage", np.float64),
+    ("control_mode", np.uint8),
+)
+
+CONTROL_MODES = ("MANUAL", "AUTO_POSITION", "AUTO_PATH", "AUTO_PURSUIT")
+
+
+class TrajectoryRecorder:
+    """Graba cada estado del robot en un directorio con un archivo binario por columna
+
+    Los registros se acumulan en bloques de chunk_size filas en memoria y se
+    añaden al final de cada archivo de columna, así que grabar no depende
+    de la longitud de la ejecución. Cada keyframe_every registros se anota
+    el tiempo en keyframes.f64 para poder buscar cualquier instante sin
+    recorrer el archivo.
+    """
+
+    def __init__(self, path, chunk_size=4096, keyframe_every=1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.keyframe_every = keyframe_every
+        os.makedirs(path, exist_ok=True)
+        self._buffers = {name: np.empty(chunk_size, dtype=dtype) for name, dtype in COLUMNS}
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name, _ in COLUMNS}
+        self._keyframes = open(os.path.join(path, "keyframes.f64"), "wb")
+        self._pending = []
+        self._filled = 0
+        self.count = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {"columns": [[name, np.dtype(dtype).str] for name, dtype in COLUMNS],
+                "control_modes": CONTROL_MODES, "keyframe_every": self.keyframe_every, "count": self.count}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def record(self, robot):
+        """Añade el estado actual del robot (se llama tras cada paso de update)"""
+        i = self._filled
+        buffers = self._buffers
+        buffers["t"][i] = robot.last_update_time
+        buffers["x"][i] = robot.x
+        buffers["y"][i] = robot.y
+        buffers["theta"][i] = robot.theta
+        buffers["v_left"][i] = robot.v_left
+        buffers["v_right"][i] = robot.v_right
+        buffers["left_voltage"][i] = robot.left_voltage
+        buffers["right_voltage"][i] = robot.right_voltage
+        buffers["control_mode"][i] = CONTROL_MODES.index(robot.control_mode)
+        if self.count % self.keyframe_every == 0:
+            self._pending.append(robot.last_update_time)
+        self._filled = i + 1
+        self.count += 1
+        if self._filled == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Escribe en disco el bloque en curso"""
+        if self._filled:
+            for name, _ in COLUMNS:
+                self._buffers[name][:self._filled].tofile(self._files[name])
+            self._filled = 0
+        if self._pending:
+            np.array(self._pending, dtype=np.float64).tofile(self._keyframes)
+            self._pending = []
+        for f in self._files.values():
+            f.flush()
+        self._keyframes.flush()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._keyframes.close()
+        self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryLog:
+    """Lectura de una grabación mapeando cada columna en memoria (sin cargarla)
+
+    Las columnas son np.memmap, así que abrir un registro de varios GB es
+    inmediato y sólo se leen las páginas que se tocan. seek() busca primero
+    en los keyframes (en memoria) y después dentro de un solo intervalo
+    entre keyframes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.keyframe_every = meta["keyframe_every"]
+        self.control_modes = tuple(meta["control_modes"])
+        columns = [(name, np.dtype(dtype)) for name, dtype in meta["columns"]]
+        # Si la grabación no se cerró, vale lo que haya llegado al disco de todas las columnas
+        sizes = [os.path.getsize(os.path.join(path, f"{name}.bin")) // dtype.itemsize for name, dtype in columns]
+        self.count = min(sizes)
+        self.columns = {}
+        for name, dtype in columns:
+            if self.count:
+                self.columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype,
+                                               mode="r", shape=(self.count,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+        keyframes = np.fromfile(os.path.join(path, "keyframes.f64"), dtype=np.float64)
+        self.keyframes = keyframes[:math.ceil(self.count / self.keyframe_every)]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def start_time(self):
+        return float(self.columns["t"][0]) if self.count else 0.0
+
+    @property
+    def end_time(self):
+        return float(self.columns["t"][-1]) if self.count else 0.0
+
+    def seek(self, time):
+        """Índice del último registro con t <= time (0 si time es anterior al inicio)"""
+        if not self.count:
+            raise IndexError("La grabación está vacía")
+        block = max(0, int(np.searchsorted(self.keyframes, time, side="right")) - 1)
+        start = block * self.keyframe_every
+        stop = min(self.count, start + self.keyframe_every)
+        offset = int(np.searchsorted(self.columns["t"][start:stop], time, side="right"))
+        return max(0, start + offset - 1)
+
+    def state(self, index):
+        """Diccionario con todas las columnas del registro index"""
+        state = {name: column[index].item() for name, column in self.columns.items()}
+        state["control_mode"] = self.control_modes[state["control_mode"]]
+        return state
+
+    def positions(self, start, stop):
+        """Puntos (n, 2) de la trayectoria entre los registros [start, stop)"""
+        return np.column_stack((self.columns["x"][start:stop], self.columns["y"][start:stop]))
+
+
+class Replay:
+    """Reproducción de una TrajectoryLog a velocidad arbitraria, con pausa y saltos"""
+
+    def __init__(self, log, speed=1.0):
+        self.log = log
+        self.speed = speed
+        self.paused = False
+        self.time = log.start_time
+        self.index = 0
+
+    def advance(self, dt):
+        """Avanza el reloj de reproducción dt segundos reales"""
+        if not self.paused:
+            self.seek(self.time + dt * self.speed)
+
+    def seek(self, time):
+        self.time = min(max(time, self.log.start_time), self.log.end_time)
+        self.index = self.log.seek(self.time)
+
+    def apply(self, robot):
+        """Copia el registro actual al robot y rellena su trayectoria con los puntos anteriores"""
+        state = self.log.state(self.index)
+        for name, value in state.items():
+            if name != "t":
+                setattr(robot, name, value)
+        robot.last_update_time = state["t"]
+        robot.linear_velocity = (robot.v_right + robot.v_left) * robot.wheel_radius / 2
+        robot.angular_velocity = (robot.v_right - robot.v_left) * robot.wheel_radius / robot.wheel_distance
+        robot.trail.clear()
+        robot.trail.extend(self.log.positions(max(0, self.index + 1 - robot.trail.capacity), self.index + 1))
@@ -0,0 +1,168 @@
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import numpy as np
+
+from ruta import ArrayPath
+
+COLUMN_NAMES = ("x", "y", "theta")
+NPY_MAGIC = b"\x93NUMPY"
+CSV_BLOCK_ROWS = 4096  # líneas de CSV convertidas de una vez
+
+
+def _sniff_format(data, name=None):
+    """Formato de un documento por la extensión del archivo o, si no la hay, por su contenido"""
+    extension = os.path.splitext(name or "")[1].lower()
+    if extension in (".csv", ".txt"):
+        return "csv"
+    if extension in (".json", ".npy"):
+        return extension[1:]
+    if data.startswith(NPY_MAGIC):
+        return "npy"
+    if data.lstrip()[:1] in (b"[", b"{"):
+        return "json"
+    return "csv"
+
+
+def _parse_csv(data):
+    """Texto con columnas x, y[, theta] separadas por comas o espacios; admite cabecera y comentarios (#)
+
+    Se convierte por bloques de CSV_BLOCK_ROWS líneas: np.loadtxt no suelta
+    el GIL mientras lee, y un solo bloque de cientos de miles de líneas
+    congelaría el hilo de dibujo durante toda la lectura.
+    """
+    # Línea a línea (y no con decode().splitlines()) para no retener el GIL con todo el documento
+    lines = [line for line in io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig")
+             if line.strip() and not line.lstrip().startswith("#")]
+    if not lines:
+        return np.empty((0, 3))
+    delimiter = "," if "," in lines[0] else None
+    fields = [field.strip().lower() for field in lines[0].split(delimiter)]
+    columns = None
+    if fields[0][:1].isalpha():
+        # Con cabecera: las columnas se buscan por nombre, en cualquier orden
+        missing = [name for name in COLUMN_NAMES[:2] if name not in fields]
+        if missing:
+            raise ValueError(f"Faltan columnas en la cabecera: {', '.join(missing)}")
+        columns = [fields.index(name) for name in COLUMN_NAMES if name in fields]
+        del lines[0]
+    if not lines:
+        return np.empty((0, 3))
+    blocks = [np.loadtxt(lines[start:start + CSV_BLOCK_ROWS], delimiter=delimiter, comments="#",
+                         usecols=columns, ndmin=2)
+              for start in range(0, len(lines), CSV_BLOCK_ROWS)]
+    points = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+    return points if columns else points[:, :3]
+
+
+def _parse_json(data):
+    """Lista de puntos [x, y(, theta)] o {"x": .., "y": .., "theta": ..}, o un objeto {"path": [...]} / {"target": [...]}"""
+    document = json.loads(data)
+    kind = None
+    if isinstance(document, dict):
+        if "target" in document:
+            kind, document = "target", [document["target"]]
+        elif "path" in document:
+            kind, document = "path", document["path"]
+        else:
+            document = [document]
+    if document and isinstance(document[0], dict):
+        # theta en todos los puntos o en ninguno: mezclar descartaría orientaciones en silencio
+        has_theta = "theta" in document[0]
+        for index, point in enumerate(document):
+            if ("theta" in point) != has_theta:
+                raise ValueError(f"El punto {index} {'no tiene' if has_theta else 'tiene'} theta "
+                                 f"y el punto 0 {'sí' if has_theta else 'no'}: debe estar en todos o en ninguno")
+        document = [[point[name] for name in COLUMN_NAMES[:2 + has_theta]] for point in document]
+    return np.array(document, dtype=np.float64), kind
+
+
+def parse_points(data, name=None):
+    """Convierte un documento CSV, JSON o NPY (en bytes) en (puntos (n, 2|3), tipo)
+
+    tipo es "target" o "path" si el documento lo indica y None si no; las
+    orientaciones están en radianes.
+    """
+    fmt = _sniff_format(data, name)
+    kind = None
+    if fmt == "npy":
+        points = np.load(io.BytesIO(data), allow_pickle=False)
+    elif fmt == "json":
+        points, kind = _parse_json(data)
+    else:
+        points = _parse_csv(data)
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim == 1:
+        points = points.reshape(1, -1)
+    if points.ndim != 2 or points.shape[1] not in (2, 3) or len(points) == 0:
+        raise ValueError(f"Se esperaban puntos (n, 2) o (n, 3) y se leyó un arreglo {points.shape}")
+    if not np.isfinite(points).all():
+        raise ValueError("La ruta contiene valores no finitos")
+    return points, kind
+
+
+def to_command(points, kind=None):
+    """Orden para apply_command: un objetivo si hay un solo punto (o el documento lo pide), una ruta si no
+
+    La ruta se devuelve ya construida como ArrayPath (con su índice de
+    tramos), que es la parte costosa en rutas de cientos de miles de puntos.
+    """
+    if kind == "target" or (kind is None and len(points) == 1):
+        x, y = float(points[0, 0]), float(points[0, 1])
+        theta = float(points[0, 2]) if points.shape[1] == 3 else None
+        return "target", (x, y, theta)
+    return "path", ArrayPath(points)
+
+
+def read_source(source):
+    """Bytes de un archivo, o de la entrada estándar si source es "-" """
+    if source == "-":
+        return sys.stdin.buffer.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def load_command(source):
+    """Lee y convierte un archivo (o "-" para la entrada estándar) en una orden (tipo, datos)"""
+    name = None if source == "-" else source
+    return to_command(*parse_points(read_source(source), name))
+
+
+class PathImporter:
+    """Importa objetivos y rutas en hilos de fondo sin detener el bucle de dibujo
+
+    submit() lanza la lectura y la conversión (incluida la construcción de
+    la ArrayPath) en un hilo; el bucle principal llama a poll() en cada
+    cuadro, que sólo vacía una cola, y aplica las órdenes que ya estén
+    listas. Los errores llegan por la misma cola como ("error", mensaje).
+    """
+
+    def __init__(self):
+        self._results = queue.SimpleQueue()
+        self.pending = 0
+
+    def submit(self, source):
+        self.pending += 1
+        threading.Thread(target=self._load, args=(source,), daemon=True,
+                         name=f"importar {source}").start()
+
+    def _load(self, source):
+        try:
+            kind, data = load_command(source)
+        except Exception as e:
+            kind, data = "error", f"No se pudo importar {source}: {e}"
+        self._results.put((source, kind, data))
+
+    def poll(self):
+        """Órdenes terminadas desde la última llamada: lista de (origen, tipo, datos)"""
+        done = []
+        while True:
+            try:
+                done.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= len(done)
+        return done
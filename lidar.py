@@ -0,0 +1,260 @@
+import math
+import numpy as np
+
+from obstaculos import CircleObstacle
+
+# Tipos de primitiva para el trazado de rayos
+SEGMENT = 0
+CIRCLE = 1
+
+
+def cells_for_boxes(min_x, min_y, max_x, max_y, cell_size):
+    """Celdas (cx, cy) que toca cada caja y el índice de la caja a la que pertenecen"""
+    x0 = np.floor(min_x / cell_size).astype(np.int64)
+    y0 = np.floor(min_y / cell_size).astype(np.int64)
+    span_x = np.floor(max_x / cell_size).astype(np.int64) - x0 + 1
+    span_y = np.floor(max_y / cell_size).astype(np.int64) - y0 + 1
+    counts = span_x * span_y
+    owner = np.repeat(np.arange(len(x0)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return x0[owner] + local // span_y[owner], y0[owner] + local % span_y[owner], owner
+
+
+class _Primitives:
+    """Segmentos y círculos en arreglos con su índice de celdas (formato CSR ordenado por celda)"""
+
+    def __init__(self, kind, data, owner, cell_size):
+        self.kind = kind
+        self.data = data
+        # Robot al que pertenece cada primitiva (-1 para obstáculos de la escena)
+        self.owner = owner
+        self.cell_size = cell_size
+
+        is_circle = kind == CIRCLE
+        min_x = np.where(is_circle, data[:, 0] - data[:, 2], np.minimum(data[:, 0], data[:, 2]))
+        max_x = np.where(is_circle, data[:, 0] + data[:, 2], np.maximum(data[:, 0], data[:, 2]))
+        min_y = np.where(is_circle, data[:, 1] - data[:, 2], np.minimum(data[:, 1], data[:, 3]))
+        max_y = np.where(is_circle, data[:, 1] + data[:, 2], np.maximum(data[:, 1], data[:, 3]))
+        cell_x, cell_y, prim = cells_for_boxes(min_x, min_y, max_x, max_y, cell_size)
+        if len(prim):
+            self.origin = (cell_x.min(), cell_y.min())
+            self.rows = cell_y.max() - self.origin[1] + 1
+            self.columns = cell_x.max() - self.origin[0] + 1
+        else:
+            self.origin, self.rows, self.columns = (0, 0), 0, 0
+        keys = (cell_x - self.origin[0]) * self.rows + (cell_y - self.origin[1])
+        order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[order]
+        self.cell_prims = prim[order]
+
+    @classmethod
+    def from_world(cls, world):
+        kinds, data = [], []
+        for obstacle in world:
+            if isinstance(obstacle, CircleObstacle):
+                kinds.append([CIRCLE])
+                data.append([[obstacle.x, obstacle.y, obstacle.radius, 0.0]])
+            else:
+                vertices = obstacle.outline()
+                kinds.append(np.full(len(vertices), SEGMENT))
+                data.append(np.hstack((vertices, np.roll(vertices, -1, axis=0))))
+        kind = np.concatenate(kinds).astype(np.int8) if kinds else np.zeros(0, dtype=np.int8)
+        data = np.concatenate(data).astype(np.float64) if data else np.zeros((0, 4))
+        return kind, data
+
+    def lookup(self, cell_x, cell_y):
+        """Rangos [start, end) de primitivas de cada celda consultada"""
+        local_x = cell_x - self.origin[0]
+        local_y = cell_y - self.origin[1]
+        inside = (local_x >= 0) & (local_x < self.columns) & (local_y >= 0) & (local_y < self.rows)
+        keys = np.where(inside, local_x * self.rows + local_y, -1)
+        start = np.searchsorted(self.sorted_keys, keys, side="left")
+        end = np.where(inside, np.searchsorted(self.sorted_keys, keys, side="right"), start)
+        return start, end
+
+
+def footprint_segments(x, y, theta, length, width):
+    """Los 4 lados (4R, 4) del rectángulo de cada robot"""
+    c, s = np.cos(theta), np.sin(theta)
+    local = np.array([[-length / 2, -width / 2], [length / 2, -width / 2],
+                      [length / 2, width / 2], [-length / 2, width / 2]])
+    corner_x = x[:, None] + local[:, 0] * c[:, None] - local[:, 1] * s[:, None]
+    corner_y = y[:, None] + local[:, 0] * s[:, None] + local[:, 1] * c[:, None]
+    return np.stack((corner_x, corner_y, np.roll(corner_x, -1, axis=1),
+                     np.roll(corner_y, -1, axis=1)), axis=-1).reshape(-1, 4)
+
+
+def ray_distances(ox, oy, dx, dy, kind, data):
+    """Distancia a lo largo de cada rayo (o + t·d) a su primitiva emparejada (inf si no la corta)"""
+    t = np.full(len(ox), np.inf)
+
+    segment = kind == SEGMENT
+    if segment.any():
+        sx, sy, sdx, sdy = ox[segment], oy[segment], dx[segment], dy[segment]
+        ax, ay, bx, by = data[segment].T
+        ex, ey = bx - ax, by - ay
+        wx, wy = ax - sx, ay - sy
+        denom = sdx * ey - sdy * ex
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ts = (wx * ey - wy * ex) / denom
+            us = (wx * sdy - wy * sdx) / denom
+        hit = (np.abs(denom) > 1e-12) & (ts >= 0.0) & (us >= 0.0) & (us <= 1.0)
+        t[segment] = np.where(hit, ts, np.inf)
+
+    circle = ~segment
+    if circle.any():
+        cx, cy, radius, _ = data[circle].T
+        wx, wy = cx - ox[circle], cy - oy[circle]
+        projection = wx * dx[circle] + wy * dy[circle]
+        dist_sq = wx * wx + wy * wy
+        disc = radius * radius - (dist_sq - projection * projection)
+        tc = projection - np.sqrt(np.maximum(disc, 0.0))
+        # Origen dentro del círculo: distancia cero
+        tc = np.where(dist_sq <= radius * radius, 0.0, tc)
+        t[circle] = np.where((disc >= 0.0) & (tc >= 0.0), tc, np.inf)
+    return t
+
+
+class Lidar:
+    """Lidar 2D simulado: beams haces repartidos en fov (radianes) centrados en el eje X del robot
+
+    scan_many() recorre a la vez todos los haces de todos los robots con DDA
+    sobre una rejilla uniforme (celdas de GRID_SPACING, las del hash espacial
+    del ObstacleWorld): en cada iteración cada haz activo sólo prueba las
+    primitivas de su celda actual, y se detiene al encontrar un impacto
+    dentro de ella o al superar max_range.
+    """
+
+    def __init__(self, beams=360, fov=2 * math.pi, max_range=8.0, noise_std=0.01, scan_interval=0.1, seed=None):
+        self.beams = beams
+        self.fov = fov
+        self.max_range = max_range
+        self.noise_std = noise_std
+        # Periodo entre escaneos (s) de un DifferentialRobot; 0 escanea en cada paso
+        self.scan_interval = scan_interval
+        self.rng = np.random.default_rng(seed)
+        if fov >= 2 * math.pi - 1e-9:
+            self.angles = np.linspace(-math.pi, math.pi, beams, endpoint=False)
+        else:
+            self.angles = np.linspace(-fov / 2, fov / 2, beams)
+        # Otros robots visibles para el lidar (DifferentialRobot); el propio se ignora
+        self.robots = []
+        self._static = None
+        self._static_source = None
+
+    def _static_primitives(self, world):
+        """Primitivas de la escena, recalculadas sólo si cambia el ObstacleWorld"""
+        source = (id(world), world.version)
+        if self._static_source != source:
+            self._static = _Primitives.from_world(world)
+            self._static_source = source
+        return self._static
+
+    def scan(self, x, y, theta, world=None, others=None):
+        """Distancias (beams,) medidas desde una pose"""
+        return self.scan_many(np.array([x]), np.array([y]), np.array([theta]), world, others)[0]
+
+    def scan_robot(self, robot):
+        """Escanea desde la pose de un DifferentialRobot contra sus obstáculos y self.robots"""
+        others = [other for other in self.robots if other is not robot]
+        if others:
+            length, width = robot.footprint()
+            others = (np.array([o.x for o in others]), np.array([o.y for o in others]),
+                      np.array([o.theta for o in others]), length, width)
+        else:
+            others = None
+        return self.scan(robot.x, robot.y, robot.theta, robot.obstacles, others)
+
+    def scan_many(self, x, y, theta, world=None, others=None, footprint=None):
+        """Distancias (R, beams) para R robots
+
+        others: (ox, oy, otheta, length, width) con robots que sólo son obstáculos.
+        footprint: (length, width) para que los propios R robots se vean entre sí.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        theta = np.asarray(theta, dtype=np.float64)
+        count = len(x)
+        cell_size = world.cell_size if world is not None else 1.0
+
+        # Reunir las primitivas: escena (en caché) + rectángulos de los robots de este instante
+        kinds, datas, owners = [], [], []
+        if world is not None and len(world):
+            kind, data = self._static_primitives(world)
+            kinds.append(kind)
+            datas.append(data)
+            owners.append(np.full(len(kind), -1))
+        if footprint is not None and count > 1:
+            segments = footprint_segments(x, y, theta, *footprint)
+            kinds.append(np.full(len(segments), SEGMENT, dtype=np.int8))
+            datas.append(segments)
+            owners.append(np.repeat(np.arange(count), 4))
+        if others is not None:
+            ox, oy, otheta, length, width = others
+            segments = footprint_segments(np.atleast_1d(ox), np.atleast_1d(oy), np.atleast_1d(otheta),
+                                          length, width)
+            kinds.append(np.full(len(segments), SEGMENT, dtype=np.int8))
+            datas.append(segments)
+            owners.append(np.full(len(segments), -1))
+
+        ranges = np.full(count * self.beams, self.max_range)
+        if kinds:
+            prims = _Primitives(np.concatenate(kinds), np.concatenate(datas), np.concatenate(owners), cell_size)
+            self._march(prims, x, y, theta, ranges)
+        ranges = ranges.reshape(count, self.beams)
+
+        if self.noise_std > 0.0:
+            hit = ranges < self.max_range
+            noisy = ranges + self.rng.normal(0.0, self.noise_std, ranges.shape)
+            ranges = np.where(hit, np.clip(noisy, 0.0, self.max_range), ranges)
+        return ranges
+
+    def _march(self, prims, x, y, theta, best):
+        """DDA vectorizado sobre todos los haces; deja en best la distancia al primer impacto"""
+        h = prims.cell_size
+        robot = np.repeat(np.arange(len(x)), self.beams)
+        angles = (theta[:, None] + self.angles[None, :]).ravel()
+        ox, oy = x[robot], y[robot]
+        dx, dy = np.cos(angles), np.sin(angles)
+
+        cell_x = np.floor(ox / h).astype(np.int64)
+        cell_y = np.floor(oy / h).astype(np.int64)
+        step_x = np.where(dx > 0, 1, -1)
+        step_y = np.where(dy > 0, 1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            next_x = np.where(dx != 0, ((cell_x + (dx > 0)) * h - ox) / dx, np.inf)
+            next_y = np.where(dy != 0, ((cell_y + (dy > 0)) * h - oy) / dy, np.inf)
+            delta_x = np.where(dx != 0, h / np.abs(dx), np.inf)
+            delta_y = np.where(dy != 0, h / np.abs(dy), np.inf)
+
+        active = np.arange(len(ox))
+        while len(active):
+            # Probar las primitivas de la celda actual de cada haz activo
+            start, end = prims.lookup(cell_x[active], cell_y[active])
+            counts = end - start
+            total = counts.sum()
+            if total:
+                ray = np.repeat(active, counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                prim = prims.cell_prims[np.repeat(start, counts) + offsets]
+                own = prims.owner[prim] != robot[ray]
+                ray, prim = ray[own], prim[own]
+                t = ray_distances(ox[ray], oy[ray], dx[ray], dy[ray], prims.kind[prim], prims.data[prim])
+                np.minimum.at(best, ray, t)
+
+            # Terminar los haces con impacto dentro de la celda o fuera de alcance; avanzar el resto
+            exit_t = np.minimum(next_x[active], next_y[active])
+            done = (best[active] <= exit_t) | (exit_t >= self.max_range)
+            active = active[~done]
+            along_x = next_x[active] < next_y[active]
+            move_x, move_y = active[along_x], active[~along_x]
+            cell_x[move_x] += step_x[move_x]
+            next_x[move_x] += delta_x[move_x]
+            cell_y[move_y] += step_y[move_y]
+            next_y[move_y] += delta_y[move_y]
+        np.minimum(best, self.max_range, out=best)
+
+    def hit_points(self, x, y, theta, ranges):
+        """Puntos (beams, 2) donde terminan los haces de un escaneo"""
+        angles = theta + self.angles
+        return np.column_stack((x + ranges * np.cos(angles), y + ranges * np.sin(angles)))
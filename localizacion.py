@@ -0,0 +1,277 @@
+import math
+import numpy as np
+
+from obstaculos import CircleObstacle, segment_distance
+from flota import arc_step
+
+TWO_PI = 2 * math.pi
+
+
+class OdometryNoise:
+    """Ruido de odometría de las ruedas: deslizamiento proporcional más un término fijo
+
+    Cada muestra de velocidad de rueda es v·(1 + N(0, slip)) + N(0, floor) en
+    rad/s; de ahí la cinemática diferencial da el avance y el giro.
+    """
+
+    def __init__(self, slip=0.05, floor=0.05):
+        self.slip = slip
+        self.floor = floor
+
+    def sample_wheels(self, v_left, v_right, size, rng):
+        left = v_left * (1.0 + rng.normal(0.0, self.slip, size)) + rng.normal(0.0, self.floor, size)
+        right = v_right * (1.0 + rng.normal(0.0, self.slip, size)) + rng.normal(0.0, self.floor, size)
+        return left, right
+
+    def sample_motion(self, v_left, v_right, wheel_radius, wheel_distance, size, rng):
+        """Velocidades lineal y angular (size,) con ruido de odometría"""
+        left, right = self.sample_wheels(v_left, v_right, size, rng)
+        return (right + left) * wheel_radius / 2, (right - left) * wheel_radius / wheel_distance
+
+
+def window_obstacles(world, bounds, margin=0.0):
+    """Obstáculos del mundo cuya caja envolvente puede tocar bounds ampliada en margin (por el hash espacial)"""
+    min_x, min_y, max_x, max_y = bounds
+    indices = world.candidates(min_x - margin, min_y - margin, max_x + margin, max_y + margin)
+    return [world.obstacles[index] for index in sorted(indices)]
+
+
+class LikelihoodField:
+    """Distancia (recortada a max_distance) desde cada celda al borde del obstáculo más cercano
+
+    Sólo se calculan las celdas dentro de la caja envolvente de cada obstáculo
+    ampliada en max_distance; fuera de ellas el campo vale max_distance.
+    Con bounds (min_x, min_y, max_x, max_y) el campo cubre sólo esa ventana
+    y sólo usa los obstáculos cercanos a ella, así que su coste no depende
+    del tamaño del mundo cargado.
+    """
+
+    def __init__(self, world, resolution=0.05, max_distance=1.0, bounds=None):
+        self.resolution = resolution
+        self.max_distance = max_distance
+        self.version = world.version
+        self.bounds = bounds
+        obstacles = list(world) if bounds is None else window_obstacles(world, bounds, max_distance)
+        # Identidad de los obstáculos usados: si no cambia, el campo sigue valiendo aunque cambie el mundo
+        self.obstacle_ids = frozenset(map(id, obstacles))
+        boxes = np.array([obstacle.aabb() for obstacle in obstacles]).reshape(-1, 4)
+        if bounds is not None:
+            self.origin = np.array(bounds[:2], dtype=np.float64)
+            upper = np.array(bounds[2:], dtype=np.float64)
+        elif len(boxes):
+            self.origin = boxes[:, :2].min(axis=0) - max_distance
+            upper = boxes[:, 2:].max(axis=0) + max_distance
+        else:
+            self.origin = upper = np.zeros(2)
+        shape = np.ceil((upper - self.origin) / resolution).astype(int) + 1
+        self.field = np.full(shape, max_distance)
+        for obstacle, (min_x, min_y, max_x, max_y) in zip(obstacles, boxes):
+            low = np.floor((np.array([min_x, min_y]) - max_distance - self.origin) / resolution).astype(int)
+            high = np.ceil((np.array([max_x, max_y]) + max_distance - self.origin) / resolution).astype(int)
+            low = np.maximum(low, 0)
+            high = np.minimum(high, shape - 1)
+            if (low > high).any():
+                continue
+            cx = self.origin[0] + (np.arange(low[0], high[0] + 1) + 0.5) * resolution
+            cy = self.origin[1] + (np.arange(low[1], high[1] + 1) + 0.5) * resolution
+            px, py = np.meshgrid(cx, cy, indexing="ij")
+            if isinstance(obstacle, CircleObstacle):
+                distance = np.abs(np.hypot(px - obstacle.x, py - obstacle.y) - obstacle.radius)
+            else:
+                distance = segment_distance(px, py, obstacle.outline())
+            window = (slice(low[0], high[0] + 1), slice(low[1], high[1] + 1))
+            self.field[window] = np.minimum(self.field[window], np.minimum(distance, max_distance))
+
+        # Borde de una celda a max_distance: los puntos fuera del mapa se recortan sobre él
+        self.field = np.pad(self.field, 1, constant_values=max_distance)
+        self.origin = self.origin - resolution
+
+    def indices(self, x, y):
+        """Índices planos de las celdas de los puntos (x, y), recortados al borde del mapa"""
+        return self.cell_indices((x - self.origin[0]) / self.resolution, (y - self.origin[1]) / self.resolution)
+
+    def cell_indices(self, cell_x, cell_y):
+        """Índices planos a partir de coordenadas ya expresadas en celdas"""
+        rows, columns = self.field.shape
+        ix = np.clip(cell_x, 0, rows - 1).astype(np.intp)
+        iy = np.clip(cell_y, 0, columns - 1).astype(np.intp)
+        return ix * columns + iy
+
+    def lookup(self, x, y):
+        """Distancia al obstáculo más cercano en los puntos (x, y) (max_distance fuera del mapa)"""
+        return np.take(self.field, self.indices(x, y))
+
+
+def systematic_resample(weights, rng):
+    """Índices de remuestreo sistemático: un solo número aleatorio y N posiciones equiespaciadas"""
+    count = len(weights)
+    positions = (rng.random() + np.arange(count)) / count
+    cumulative = np.cumsum(weights)
+    cumulative[-1] = 1.0
+    return np.searchsorted(cumulative, positions)
+
+
+class ParticleFilter:
+    """Filtro de partículas de la pose (x, y, theta) a partir de odometría y del lidar
+
+    Las partículas viven en arreglos de NumPy: predicción con ruido de
+    odometría, pesos con un campo de verosimilitud y remuestreo sistemático,
+    sin bucles por partícula. Los arreglos se sustituyen (no se modifican)
+    en cada paso, así que una instantánea puede guardarlos por referencia.
+
+    predict() sólo acumula la odometría de cada paso de física; las
+    partículas avanzan una vez cada prediction_interval (y antes de cada
+    corrección) con la velocidad media de las ruedas en ese intervalo.
+    """
+
+    def __init__(self, count=10000, world=None, lidar=None, noise=None, sigma_hit=0.1,
+                 random_weight=0.05, max_beams=30, correction_interval=0.1, prediction_interval=0.02,
+                 field_margin=2.0, seed=None):
+        self.count = count
+        self.world = world
+        self.lidar = lidar
+        self.noise = noise if noise is not None else OdometryNoise()
+        self.sigma_hit = sigma_hit
+        self.random_weight = random_weight  # peso de lecturas espurias en el modelo de medida
+        self.max_beams = max_beams
+        # La corrección corre a la frecuencia del sensor y la predicción se agrupa por intervalos (s)
+        self.correction_interval = correction_interval
+        self._since_correction = math.inf
+        self.prediction_interval = prediction_interval
+        self._left_travel = 0.0  # giro acumulado de cada rueda desde la última predicción (rad)
+        self._right_travel = 0.0
+        self._pending_time = 0.0
+        self._wheels = None  # (radio, separación) de las ruedas
+        self.rng = np.random.default_rng(seed)
+        # El campo de verosimilitud cubre una ventana alrededor de la estimación (alcance del lidar
+        # + field_margin) y se recalcula al alejarse la estimación más de field_margin de su centro
+        self.field_margin = field_margin
+        self._field = None
+        self._log_likelihood = None
+
+        self.particles = np.zeros((count, 3))
+        self.weights = np.full(count, 1.0 / count)
+        self.estimate = (0.0, 0.0, 0.0)
+        self.effective_size = float(count)
+
+    def initialize(self, x, y, theta, spread=(0.2, 0.2, 0.1)):
+        """Distribuye las partículas con ruido gaussiano alrededor de una pose"""
+        particles = np.empty((self.count, 3))
+        particles[:, 0] = self.rng.normal(x, spread[0], self.count)
+        particles[:, 1] = self.rng.normal(y, spread[1], self.count)
+        particles[:, 2] = np.mod(self.rng.normal(theta, spread[2], self.count), TWO_PI)
+        self.particles = particles
+        self.weights = np.full(self.count, 1.0 / self.count)
+        self._left_travel = self._right_travel = self._pending_time = 0.0
+        self._update_estimate()
+
+    def field(self):
+        if self.world is None or not len(self.world):
+            return None
+        x, y, _ = self.estimate
+        max_distance = 3 * self.sigma_hit + 0.5
+        field = self._field
+        if field is not None:
+            min_x, min_y, max_x, max_y = field.bounds
+            center_x, center_y = (min_x + max_x) / 2, (min_y + max_y) / 2
+            if abs(x - center_x) > self.field_margin or abs(y - center_y) > self.field_margin:
+                field = None
+            elif field.version != self.world.version:
+                # Cargar o descartar trozos lejanos (mundo.ChunkedWorld) no toca los obstáculos de la ventana
+                obstacles = window_obstacles(self.world, field.bounds, max_distance)
+                if frozenset(map(id, obstacles)) == field.obstacle_ids:
+                    field.version = self.world.version
+                else:
+                    field = None
+        if field is None:
+            half = (self.lidar.max_range if self.lidar is not None else 0.0) + self.field_margin
+            self._field = LikelihoodField(self.world, max_distance=max_distance,
+                                          bounds=(x - half, y - half, x + half, y + half))
+            # Tabla de log-verosimilitud por celda (mezcla gaussiana + uniforme) para no evaluar exp/log por haz
+            hit = np.exp(-0.5 * (self._field.field / self.sigma_hit) ** 2)
+            self._log_likelihood = np.log((1.0 - self.random_weight) * hit + self.random_weight).astype(np.float32)
+        return self._field
+
+    def predict(self, v_left, v_right, wheel_radius, wheel_distance, dt):
+        """Acumula las velocidades de rueda medidas en un paso; cada prediction_interval mueve las partículas"""
+        self._left_travel += v_left * dt
+        self._right_travel += v_right * dt
+        self._pending_time += dt
+        self._since_correction += dt
+        self._wheels = (wheel_radius, wheel_distance)
+        if self._pending_time >= self.prediction_interval:
+            self.flush_prediction()
+
+    def flush_prediction(self):
+        """Avanza las partículas con la odometría acumulada y ruido de odometría"""
+        elapsed = self._pending_time
+        if elapsed <= 0.0:
+            return
+        linear, angular = self.noise.sample_motion(self._left_travel / elapsed, self._right_travel / elapsed,
+                                                   *self._wheels, self.count, self.rng)
+        x, y, theta = arc_step(self.particles[:, 0], self.particles[:, 1], self.particles[:, 2],
+                               linear, angular, elapsed)
+        self.particles = np.column_stack((x, y, np.mod(theta, TWO_PI)))
+        self._left_travel = self._right_travel = self._pending_time = 0.0
+        self._update_estimate()
+
+    def correct(self, scan):
+        """Repondera las partículas con un escaneo del lidar y remuestrea si hace falta"""
+        if self.lidar is None or scan is None or self._since_correction < self.correction_interval - 1e-9:
+            return
+        self._since_correction = 0.0
+        # Las partículas deben estar en la pose del escaneo antes de pesarlas (y el campo centrado en ella)
+        self.flush_prediction()
+        field = self.field()
+        if field is None:
+            return
+
+        # Subconjunto de haces equiespaciados; los que no tocaron nada no aportan
+        step = max(1, len(scan) // self.max_beams)
+        ranges = scan[::step]
+        angles = self.lidar.angles[::step]
+        valid = ranges < self.lidar.max_range
+        if not valid.any():
+            return
+        ranges, angles = ranges[valid], angles[valid]
+
+        # Punto final de cada haz para cada partícula (N, M), en unidades de celda: rotar los
+        # desplazamientos de los haces con el seno y coseno de cada partícula evita N·M evaluaciones trigonométricas
+        # (float32: sobra precisión para indexar celdas y la mitad de memoria acelera el acceso)
+        scale = 1.0 / field.resolution
+        beam_x = (ranges * np.cos(angles) * scale).astype(np.float32)
+        beam_y = (ranges * np.sin(angles) * scale).astype(np.float32)
+        cos_t = np.cos(self.particles[:, 2]).astype(np.float32)[:, None]
+        sin_t = np.sin(self.particles[:, 2]).astype(np.float32)[:, None]
+        base_x = ((self.particles[:, 0] - field.origin[0]) * scale).astype(np.float32)[:, None]
+        base_y = ((self.particles[:, 1] - field.origin[1]) * scale).astype(np.float32)[:, None]
+        cell_x = base_x + cos_t * beam_x - sin_t * beam_y
+        cell_y = base_y + sin_t * beam_x + cos_t * beam_y
+
+        # Verosimilitudes sumadas en escala logarítmica para no perder precisión
+        log_likelihood = np.take(self._log_likelihood, field.cell_indices(cell_x, cell_y)).sum(axis=1, dtype=np.float64)
+        log_weights = np.log(self.weights) + log_likelihood
+        log_weights -= log_weights.max()
+        weights = np.exp(log_weights)
+        weights /= weights.sum()
+
+        self.effective_size = 1.0 / np.sum(weights * weights)
+        if self.effective_size < self.count / 2:
+            indices = systematic_resample(weights, self.rng)
+            self.particles = self.particles[indices]
+            weights = np.full(self.count, 1.0 / self.count)
+        self.weights = weights
+        self._update_estimate()
+
+    def _update_estimate(self):
+        w = self.weights
+        x = float(np.dot(w, self.particles[:, 0]))
+        y = float(np.dot(w, self.particles[:, 1]))
+        theta = math.atan2(np.dot(w, np.sin(self.particles[:, 2])), np.dot(w, np.cos(self.particles[:, 2])))
+        self.estimate = (x, y, theta % TWO_PI)
+
+    def error(self, x, y, theta):
+        """Error de posición (m) y de orientación (rad) de la estimación frente a una pose real"""
+        ex, ey, etheta = self.estimate
+        angle = (etheta - theta + math.pi) % TWO_PI - math.pi
+        return math.hypot(ex - x, ey - y), abs(angle)
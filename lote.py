@@ -0,0 +1,268 @@
+import argparse
+import copy
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from robot_simulador import DifferentialRobot, GRID_SPACING
+from controlador import ControlGains
+from obstaculos import ObstacleWorld
+from simulador_headless import mission_complete
+from analitica import TrajectoryAnalytics
+
+# Resultado de cada misión: una fila por escenario en memoria compartida
+RESULT_DTYPE = np.dtype([
+    ("reached", np.bool_),
+    ("time", np.float64),  # tiempo hasta cumplir la misión (NaN si se agotó max_time)
+    ("final_error", np.float64),  # distancia de la pose final a la meta (m)
+    ("heading_error", np.float64),  # error de orientación final (rad)
+    ("path_length", np.float64),  # distancia recorrida (m)
+    ("energy", np.float64),  # ∫ (V_izq² + V_der²) dt (V²·s)
+    ("tracking_error", np.float64),  # error medio respecto al tramo activo (m)
+    ("overshoot", np.float64),  # mayor sobrepaso de un objetivo (m)
+    ("steps", np.int64),
+    ("collisions", np.int64),
+])
+
+MODES = ("path", "pursuit", "smooth")
+
+
+def apply_params(robot, params):
+    """Fija atributos de DifferentialRobot o de sus ControlGains a partir de un diccionario"""
+    for name, value in params.items():
+        if name in ControlGains.FIELDS:
+            setattr(robot.gains, name, value)
+        elif hasattr(robot, name):
+            setattr(robot, name, value)
+        else:
+            raise ValueError(f"Parámetro de robot desconocido: {name!r}")
+
+
+class Scenario:
+    """Misión para simular sin ventana: pose inicial, objetivo o ruta y parámetros del robot
+
+    params sobrescribe atributos de DifferentialRobot (motor_constant,
+    max_voltage, position_tolerance, ...) o ganancias de ControlGains
+    (base_voltage, steering_gain, ...). mode indica cómo recorrer la ruta:
+    "path" punto a punto, "pursuit" con punto adelantado o "smooth" por una
+    spline con perfil de velocidad.
+    """
+
+    def __init__(self, start=(0.0, 0.0, 0.0), target=None, path=None, params=None, mode="path",
+                 max_time=120.0, dt=0.01, integrator="EULER", scene=None):
+        if target is None and not path:
+            raise ValueError("El escenario necesita target o path")
+        if mode not in MODES:
+            raise ValueError(f"Modo de ruta desconocido: {mode!r}")
+        self.start = tuple(start)
+        self.target = tuple(target) if target is not None else None
+        self.path = [tuple(point) for point in path] if path else None
+        self.params = dict(params or {})
+        self.mode = mode
+        self.max_time = max_time
+        self.dt = dt
+        self.integrator = integrator
+        self.scene = scene
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def with_params(self, params):
+        """Copia del escenario con parámetros del robot adicionales (tienen prioridad)"""
+        scenario = copy.copy(self)
+        scenario.params = {**self.params, **params}
+        return scenario
+
+    def goal(self):
+        """Pose (x, y, theta o None) que debe alcanzar el robot al terminar"""
+        if self.path:
+            return self.path[-1]
+        return self.target if len(self.target) == 3 else (self.target[0], self.target[1], None)
+
+    def make_robot(self, obstacles=None):
+        robot = DifferentialRobot()
+        robot.integrator = self.integrator
+        apply_params(robot, self.params)
+        robot.x, robot.y = self.start[0], self.start[1]
+        robot.theta = self.start[2] if len(self.start) > 2 else 0.0
+        robot.obstacles = obstacles
+        if self.path and self.mode == "smooth":
+            robot.track_waypoints(self.path)
+        elif self.path and self.mode == "pursuit":
+            robot.follow_path(self.path)
+        elif self.path:
+            robot.set_path(list(self.path))
+        else:
+            robot.set_target_position(*self.target)
+        return robot
+
+
+def load_scenarios(path):
+    """Lee una lista de escenarios de un archivo JSON: [{"start": [...], "target": [...], ...}, ...]"""
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("scenarios", [])
+    return [Scenario.from_dict(item) for item in data]
+
+
+def random_scenarios(count, radius=5.0, seed=None):
+    """Misiones al azar de ida a un objetivo, para pruebas y benchmarks"""
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(-radius, radius, (count, 2))
+    targets = rng.uniform(-radius, radius, (count, 2))
+    headings = rng.uniform(-math.pi, math.pi, (count, 2))
+    return [Scenario(start=(sx, sy, a), target=(tx, ty, b))
+            for (sx, sy), (tx, ty), (a, b) in zip(starts.tolist(), targets.tolist(), headings.tolist())]
+
+
+def simulate(scenario, obstacles=None):
+    """Simula un escenario con paso fijo; devuelve una fila de RESULT_DTYPE como tupla"""
+    robot = scenario.make_robot(obstacles)
+    robot.analytics = analytics = TrajectoryAnalytics()
+    dt = scenario.dt
+    limit = int(math.ceil(scenario.max_time / dt - 1e-9))
+    steps = 0
+    reached = False
+    while steps < limit:
+        robot.update(dt)
+        steps += 1
+        if mission_complete(robot):
+            reached = True
+            break
+
+    goal_x, goal_y, goal_theta = scenario.goal()
+    heading_error = 0.0
+    if goal_theta is not None:
+        heading_error = abs((robot.theta - goal_theta + math.pi) % (2 * math.pi) - math.pi)
+    summary = analytics.summary()
+    return (reached, steps * dt if reached else math.nan, math.hypot(goal_x - robot.x, goal_y - robot.y),
+            heading_error, analytics.path_length, analytics.energy, summary["tracking_error"].get("mean", 0.0),
+            summary["overshoot"].get("max", 0.0), steps, robot.collisions)
+
+
+# Estado de cada proceso trabajador (se fija una sola vez en _init_worker)
+_worker = {}
+
+
+def _init_worker(scenarios, name, count):
+    memory = shared_memory.SharedMemory(name=name)
+    _worker["memory"] = memory
+    _worker["results"] = np.ndarray(count, dtype=RESULT_DTYPE, buffer=memory.buf)
+    _worker["scenarios"] = scenarios
+    _worker["scenes"] = {}
+
+
+def _scene(path):
+    """Escena cargada una sola vez por proceso"""
+    scenes = _worker["scenes"]
+    if path not in scenes:
+        scenes[path] = ObstacleWorld.load(path, GRID_SPACING)
+    return scenes[path]
+
+
+def _run_range(start, stop):
+    """Simula los escenarios [start, stop) y escribe sus filas en la memoria compartida"""
+    results = _worker["results"]
+    for index in range(start, stop):
+        scenario = _worker["scenarios"][index]
+        obstacles = _scene(scenario.scene) if scenario.scene else None
+        results[index] = simulate(scenario, obstacles)
+    return stop - start
+
+
+def run_batch(scenarios, workers=None, chunk_size=None, progress=None):
+    """Simula todos los escenarios en un grupo de procesos y devuelve un arreglo de RESULT_DTYPE
+
+    Los escenarios se reparten en bloques de índices; cada trabajador
+    escribe sus resultados directamente en un arreglo estructurado en
+    memoria compartida, así que sólo viajan entre procesos los límites de
+    cada bloque. progress(hechos, total) se llama al terminar cada bloque.
+    """
+    count = len(scenarios)
+    results = np.zeros(count, dtype=RESULT_DTYPE)
+    if count == 0:
+        return results
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Bloques pequeños frente al total para repartir bien misiones de duración muy distinta
+        chunk_size = max(1, min(256, count // (workers * 8)))
+
+    memory = shared_memory.SharedMemory(create=True, size=max(1, count * RESULT_DTYPE.itemsize))
+    try:
+        shared = np.ndarray(count, dtype=RESULT_DTYPE, buffer=memory.buf)
+        shared[:] = results
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(scenarios, memory.name, count)) as pool:
+            futures = [pool.submit(_run_range, start, min(start + chunk_size, count))
+                       for start in range(0, count, chunk_size)]
+            for future in futures:
+                done += future.result()
+                if progress is not None:
+                    progress(done, count)
+        results[:] = shared
+        del shared
+    finally:
+        memory.close()
+        memory.unlink()
+    return results
+
+
+def summarize(results):
+    """Resumen de un lote: tasa de éxito y estadísticas de las misiones cumplidas"""
+    reached = results[results["reached"]]
+    summary = {"missions": len(results), "reached": int(len(reached)),
+               "collisions": int(results["collisions"].sum())}
+    if len(reached):
+        summary.update(mean_time=float(reached["time"].mean()),
+                       p95_time=float(np.percentile(reached["time"], 95)),
+                       mean_error=float(reached["final_error"].mean()),
+                       mean_path_length=float(reached["path_length"].mean()))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluación por lotes de misiones del robot en varios procesos")
+    parser.add_argument("scenarios", nargs="?", default=None,
+                        help="Archivo JSON con la lista de escenarios")
+    parser.add_argument("--random", type=int, default=None, metavar="N",
+                        help="Generar N misiones al azar en lugar de leer un archivo")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de las misiones al azar")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Escenarios por bloque de trabajo")
+    parser.add_argument("--out", default=None, help="Archivo .npy donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    if args.random is not None:
+        scenarios = random_scenarios(args.random, seed=args.seed)
+    elif args.scenarios:
+        scenarios = load_scenarios(args.scenarios)
+    else:
+        parser.error("Se necesita un archivo de escenarios o --random N")
+
+    start = time.perf_counter()
+    results = run_batch(scenarios, workers=args.workers, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    print(f"Misiones: {summary['missions']} | Cumplidas: {summary['reached']} | "
+          f"Tiempo real: {elapsed:.1f} s ({len(results) / elapsed:.0f} misiones/s)")
+    if summary["reached"]:
+        print(f"Tiempo medio: {summary['mean_time']:.2f} s | p95: {summary['p95_time']:.2f} s | "
+              f"Error final medio: {summary['mean_error']:.3f} m | "
+              f"Recorrido medio: {summary['mean_path_length']:.2f} m")
+    if summary["collisions"]:
+        print(f"Pasos revertidos por colisión: {summary['collisions']}")
+    if args.out:
+        np.save(args.out, results)
+        print(f"Resultados guardados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
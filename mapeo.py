@@ -0,0 +1,136 @@
+import math
+import numpy as np
+
+
+def probability(log_odds):
+    """Probabilidad de ocupación a partir de log-odds"""
+    return 1.0 / (1.0 + np.exp(-log_odds))
+
+
+class OccupancyMap:
+    """Mapa de ocupación en log-odds guardado en baldosas dispersas
+
+    El plano se divide en baldosas de tile_size × tile_size celdas de lado
+    resolution; cada baldosa es un bloque float32 que sólo se reserva la
+    primera vez que un haz la observa, así que la memoria crece con el área
+    explorada y no con el tamaño del mundo. Las celdas desconocidas valen 0
+    (probabilidad 0.5). dirty guarda las baldosas modificadas desde la
+    última vez que alguien las consumió (p. ej. para volver a subir su textura).
+    """
+
+    def __init__(self, resolution=0.05, tile_size=64, hit=0.85, miss=-0.4, clamp=(-4.0, 4.0),
+                 update_interval=0.1):
+        self.resolution = resolution
+        self.tile_size = tile_size
+        self.hit = hit  # log-odds sumado a la celda donde termina un haz
+        self.miss = miss  # log-odds sumado a cada celda que atraviesa
+        self.clamp = clamp
+        # Frecuencia de integración de escaneos (s): el lidar puede escanear más a menudo
+        self.update_interval = update_interval
+        self._last_time = -math.inf
+        self.tiles = {}
+        self.dirty = set()
+        self.scans = 0
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def memory_bytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+    def cell_of(self, x, y):
+        """Índices enteros globales de las celdas que contienen los puntos (x, y)"""
+        return (np.floor(np.asarray(x) / self.resolution).astype(np.int64),
+                np.floor(np.asarray(y) / self.resolution).astype(np.int64))
+
+    def tile_origin(self, key):
+        """Esquina inferior izquierda (m) de una baldosa"""
+        extent = self.tile_size * self.resolution
+        return key[0] * extent, key[1] * extent
+
+    def observe(self, time, x, y, theta, ranges, angles, max_range):
+        """Integra un escaneo si pasó update_interval desde el anterior; devuelve si lo hizo"""
+        if ranges is None or time - self._last_time < self.update_interval - 1e-9:
+            return False
+        self._last_time = time
+        self.insert_scan(x, y, theta, ranges, angles, max_range)
+        return True
+
+    def insert_scan(self, x, y, theta, ranges, angles, max_range):
+        """Actualiza el mapa con un escaneo completo tomado desde (x, y, theta)
+
+        Todos los haces se muestrean a la vez cada media celda; cada celda
+        cambia como mucho una vez por escaneo (ocupada si algún haz termina
+        en ella, libre si sólo la atraviesan) y las actualizaciones se
+        agrupan por baldosa.
+        """
+        ranges = np.minimum(np.asarray(ranges, dtype=np.float64), max_range)
+        heading = theta + np.asarray(angles)
+        cos_a, sin_a = np.cos(heading), np.sin(heading)
+        step = 0.5 * self.resolution
+
+        # Puntos libres: muestras a lo largo de cada haz antes del impacto (haces, muestras)
+        t = np.arange(0.0, ranges.max(), step)
+        free = t[None, :] < (ranges[:, None] - step)
+        free_x, free_y = self.cell_of(x + t[None, :] * cos_a[:, None], y + t[None, :] * sin_a[:, None])
+        free_x, free_y = free_x[free], free_y[free]
+
+        # Puntos ocupados: extremo de los haces que tocaron algo
+        hit = ranges < max_range
+        hit_x, hit_y = self.cell_of(x + ranges[hit] * cos_a[hit], y + ranges[hit] * sin_a[hit])
+        if not len(free_x) and not len(hit_x):
+            return
+
+        # Ventana densa local al escaneo: marcar libre (1) y después ocupado (2), así cada celda
+        # cambia una sola vez por escaneo y un impacto prevalece sobre los haces que la cruzan
+        all_x = np.concatenate((free_x, hit_x))
+        all_y = np.concatenate((free_y, hit_y))
+        x0, x1 = int(all_x.min()), int(all_x.max())
+        y0, y1 = int(all_y.min()), int(all_y.max())
+        flags = np.zeros((x1 - x0 + 1, y1 - y0 + 1), dtype=np.int8)
+        flags[free_x - x0, free_y - y0] = 1
+        flags[hit_x - x0, hit_y - y0] = 2
+        delta = np.array([0.0, self.miss, self.hit], dtype=np.float32)[flags]
+
+        # Repartir la ventana entre las baldosas que toca (sólo un puñado por escaneo)
+        size = self.tile_size
+        low, high = self.clamp
+        for tx in range(x0 // size, x1 // size + 1):
+            for ty in range(y0 // size, y1 // size + 1):
+                wx = slice(max(tx * size, x0) - x0, min((tx + 1) * size, x1 + 1) - x0)
+                wy = slice(max(ty * size, y0) - y0, min((ty + 1) * size, y1 + 1) - y0)
+                if not flags[wx, wy].any():
+                    continue
+                tile = self.tiles.get((tx, ty))
+                if tile is None:
+                    tile = self.tiles[(tx, ty)] = np.zeros((size, size), dtype=np.float32)
+                window = (slice(wx.start + x0 - tx * size, wx.stop + x0 - tx * size),
+                          slice(wy.start + y0 - ty * size, wy.stop + y0 - ty * size))
+                np.clip(tile[window] + delta[wx, wy], low, high, out=tile[window])
+                self.dirty.add((tx, ty))
+        self.scans += 1
+
+    def log_odds(self, x, y):
+        """Log-odds en los puntos (x, y) (0 en zonas sin explorar)"""
+        cell_x, cell_y = self.cell_of(x, y)
+        cell_x, cell_y = np.atleast_1d(cell_x), np.atleast_1d(cell_y)
+        size = self.tile_size
+        values = np.zeros(cell_x.shape, dtype=np.float32)
+        for i, (cx, cy) in enumerate(zip(cell_x.tolist(), cell_y.tolist())):
+            tile = self.tiles.get((cx // size, cy // size))
+            if tile is not None:
+                values[i] = tile[cx % size, cy % size]
+        return values
+
+    def take_dirty(self):
+        """Devuelve y vacía el conjunto de baldosas modificadas"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def tile_rgba(self, key):
+        """Imagen RGBA uint8 (filas = y) de una baldosa: libre claro, ocupado oscuro, desconocido transparente"""
+        p = probability(self.tiles[key].T)
+        rgba = np.empty(p.shape + (4,), dtype=np.uint8)
+        rgba[..., :3] = (255 * (1.0 - p))[..., None].astype(np.uint8)
+        rgba[..., 3] = (np.abs(p - 0.5) * 2 * 220).astype(np.uint8)
+        return rgba
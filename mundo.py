@@ -0,0 +1,159 @@
+import json
+import math
+import os
+from collections import OrderedDict
+import numpy as np
+
+from obstaculos import ObstacleWorld, CircleObstacle, BoxObstacle, obstacle_from_dict
+
+
+def directory_loader(directory):
+    """Cargador de trozos desde archivos chunk_<cx>_<cy>.json (formato de escena); sin archivo, trozo vacío"""
+    def load(cx, cy):
+        path = os.path.join(directory, f"chunk_{cx}_{cy}.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [obstacle_from_dict(item) for item in json.load(f).get("obstacles", [])]
+    return load
+
+
+def procedural_loader(seed=0, density=0.01, max_size=1.0, clear_radius=3.0):
+    """Cargador determinista: obstáculos aleatorios que dependen sólo de (seed, cx, cy)
+
+    density es el número medio de obstáculos por m²; se deja libre un círculo
+    de clear_radius alrededor del origen para que el robot pueda arrancar.
+    """
+    def load(cx, cy, chunk_size):
+        rng = np.random.default_rng([seed, cx & 0xFFFFFFFF, cy & 0xFFFFFFFF])
+        count = rng.poisson(density * chunk_size * chunk_size)
+        obstacles = []
+        for _ in range(count):
+            x = (cx + rng.random()) * chunk_size
+            y = (cy + rng.random()) * chunk_size
+            size = rng.uniform(0.2, max_size)
+            if math.hypot(x, y) < clear_radius + size:
+                continue
+            if rng.random() < 0.5:
+                obstacles.append(CircleObstacle(x, y, size / 2))
+            else:
+                obstacles.append(BoxObstacle(x, y, size, rng.uniform(0.2, max_size), rng.uniform(0, 180)))
+        return obstacles
+    load.wants_chunk_size = True
+    return load
+
+
+class ChunkedWorld(ObstacleWorld):
+    """Mundo sin límites dividido en trozos cuadrados que se cargan bajo demanda
+
+    Sólo se mantienen en memoria los trozos cercanos a los puntos de interés
+    (cámara, robots) y como mucho max_chunks; al superar ese número se
+    descartan los usados hace más tiempo (LRU). Las consultas de colisión
+    cargan automáticamente los trozos que tocan, así que el robot nunca
+    atraviesa un obstáculo de un trozo aún no cargado. Expone la misma
+    interfaz que ObstacleWorld sobre los obstáculos cargados.
+    """
+
+    def __init__(self, loader, chunk_size=16.0, max_chunks=64, load_radius=8.0, cell_size=1.0, margin=2.0):
+        super().__init__((), cell_size)
+        self.loader = loader
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.load_radius = load_radius
+        # Cada obstáculo pertenece al trozo de su centro: margin acota cuánto sobresale hacia los vecinos
+        self.margin = margin
+        self._chunks = OrderedDict()
+        # Posición en self.obstacles de cada obstáculo cargado (por id), para quitarlo del hash sin reconstruirlo
+        self._index = {}
+        # Llamada con la clave de cada trozo descartado o modificado (libera sus datos derivados, p. ej. display lists)
+        self.on_discard = None
+        self.loads = 0
+        self.evictions = 0
+
+    def chunk_key(self, x, y):
+        return (int(math.floor(x / self.chunk_size)), int(math.floor(y / self.chunk_size)))
+
+    def chunks(self):
+        """Pares (clave, lista de obstáculos) de los trozos cargados"""
+        return self._chunks.items()
+
+    def _load(self, key):
+        if getattr(self.loader, "wants_chunk_size", False):
+            obstacles = list(self.loader(key[0], key[1], self.chunk_size))
+        else:
+            obstacles = list(self.loader(*key))
+        self._chunks[key] = obstacles
+        for obstacle in obstacles:
+            self._insert(obstacle)
+        self.loads += 1
+        return obstacles
+
+    def _insert(self, obstacle):
+        index = ObstacleWorld.add(self, obstacle)
+        self._index[id(obstacle)] = index
+        return index
+
+    def _remove(self, obstacle):
+        """Quita un obstáculo de la lista y del hash; el último ocupa su posición para no dejar huecos"""
+        index = self._index.pop(id(obstacle))
+        xs, ys = self._cell_range(*obstacle.aabb())
+        for ix in xs:
+            for iy in ys:
+                cell = self._cells[(ix, iy)]
+                cell.remove(index)
+                if not cell:
+                    del self._cells[(ix, iy)]
+        last = len(self.obstacles) - 1
+        if index != last:
+            moved = self.obstacles[last]
+            self.obstacles[index] = moved
+            self._index[id(moved)] = index
+            xs, ys = self._cell_range(*moved.aabb())
+            for ix in xs:
+                for iy in ys:
+                    cell = self._cells[(ix, iy)]
+                    cell[cell.index(last)] = index
+        self.obstacles.pop()
+        self.version += 1
+
+    def ensure(self, points, radius=None):
+        """Carga (y marca como recientes) los trozos a menos de radius de los puntos (x, y)"""
+        radius = self.load_radius if radius is None else radius
+        needed = []
+        for x, y in points:
+            x0, y0 = self.chunk_key(x - radius, y - radius)
+            x1, y1 = self.chunk_key(x + radius, y + radius)
+            needed.extend((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+
+        for key in needed:
+            if key in self._chunks:
+                self._chunks.move_to_end(key)
+            else:
+                self._load(key)
+
+        # Descartar los menos recientes, sin tocar los que se acaban de pedir
+        keep = set(needed)
+        while len(self._chunks) > max(self.max_chunks, len(keep)):
+            key = next(iter(self._chunks))
+            if key in keep:
+                break
+            for obstacle in self._chunks.pop(key):
+                self._remove(obstacle)
+            self.evictions += 1
+            if self.on_discard is not None:
+                self.on_discard(key)
+
+    def add(self, obstacle):
+        """Añade un obstáculo al trozo que contiene el centro de su caja envolvente"""
+        min_x, min_y, max_x, max_y = obstacle.aabb()
+        key = self.chunk_key((min_x + max_x) / 2, (min_y + max_y) / 2)
+        if key not in self._chunks:
+            self._load(key)
+        self._chunks[key].append(obstacle)
+        if self.on_discard is not None:
+            self.on_discard(key)
+        return self._insert(obstacle)
+
+    def collision(self, x, y, theta, length, width):
+        self.ensure([(x, y)], 0.5 * math.hypot(length, width) + self.margin)
+        return super().collision(x, y, theta, length, width)
@@ -0,0 +1,276 @@
+import json
+import math
+import numpy as np
+
+
+def footprint_corners(x, y, theta, length, width):
+    """Esquinas (4, 2) del rectángulo del robot centrado en (x, y) y girado theta"""
+    c, s = math.cos(theta), math.sin(theta)
+    local = np.array([[-length / 2, -width / 2], [length / 2, -width / 2],
+                      [length / 2, width / 2], [-length / 2, width / 2]])
+    return np.column_stack((x + local[:, 0] * c - local[:, 1] * s,
+                            y + local[:, 0] * s + local[:, 1] * c))
+
+
+def points_in_polygon(px, py, vertices):
+    """Regla par-impar vectorizada: qué puntos (px, py) caen dentro del polígono"""
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    inside = np.zeros(np.broadcast(px, py).shape, dtype=bool)
+    x0, y0 = vertices[:, 0], vertices[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    for ax, ay, bx, by in zip(x0, y0, x1, y1):
+        crosses = (ay > py) != (by > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (px < x_cross)
+    return inside
+
+
+def segment_distance(px, py, vertices):
+    """Distancia mínima de los puntos (px, py) a los lados del polígono cerrado"""
+    px = np.asarray(px, dtype=np.float64)[..., None]
+    py = np.asarray(py, dtype=np.float64)[..., None]
+    ax, ay = vertices[:, 0], vertices[:, 1]
+    dx, dy = np.roll(ax, -1) - ax, np.roll(ay, -1) - ay
+    length_sq = np.maximum(dx * dx + dy * dy, 1e-12)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy)).min(axis=-1)
+
+
+def triangulate(vertices):
+    """Triangula un polígono simple por recorte de orejas; devuelve índices (m, 3)"""
+    n = len(vertices)
+    x, y = vertices[:, 0], vertices[:, 1]
+    # Trabajar siempre en sentido antihorario
+    order = list(range(n))
+    if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0:
+        order.reverse()
+
+    def cross(o, a, b):
+        return (x[a] - x[o]) * (y[b] - y[o]) - (y[a] - y[o]) * (x[b] - x[o])
+
+    triangles = []
+    guard = 0
+    while len(order) > 3 and guard < n * n:
+        guard += 1
+        for i in range(len(order)):
+            a, b, c = order[i - 1], order[i], order[(i + 1) % len(order)]
+            if cross(a, b, c) <= 0:
+                continue
+            others = [p for p in order if p not in (a, b, c)]
+            if any(cross(a, b, p) >= 0 and cross(b, c, p) >= 0 and cross(c, a, p) >= 0 for p in others):
+                continue
+            triangles.append((a, b, c))
+            order.pop(i)
+            break
+        else:
+            break
+    if len(order) == 3:
+        triangles.append(tuple(order))
+    return np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+
+class CircleObstacle:
+    kind = "circle"
+
+    def __init__(self, x, y, radius, height=0.5):
+        self.x = float(x)
+        self.y = float(y)
+        self.radius = float(radius)
+        self.height = float(height)
+
+    def aabb(self):
+        return (self.x - self.radius, self.y - self.radius, self.x + self.radius, self.y + self.radius)
+
+    def outline(self, segments=24):
+        angles = np.linspace(0.0, 2 * math.pi, segments, endpoint=False)
+        return np.column_stack((self.x + self.radius * np.cos(angles),
+                                self.y + self.radius * np.sin(angles)))
+
+    def collides_footprint(self, x, y, theta, length, width):
+        # Centro del círculo en coordenadas del robot y punto más cercano del rectángulo
+        c, s = math.cos(theta), math.sin(theta)
+        dx, dy = self.x - x, self.y - y
+        local_x = dx * c + dy * s
+        local_y = -dx * s + dy * c
+        nearest_x = max(-length / 2, min(length / 2, local_x))
+        nearest_y = max(-width / 2, min(width / 2, local_y))
+        return (local_x - nearest_x) ** 2 + (local_y - nearest_y) ** 2 <= self.radius ** 2
+
+    def contains(self, px, py, inflate=0.0):
+        return np.hypot(px - self.x, py - self.y) <= self.radius + inflate
+
+    def to_dict(self):
+        return {"type": self.kind, "x": self.x, "y": self.y, "radius": self.radius, "height": self.height}
+
+
+class PolygonObstacle:
+    """Polígono simple (no necesariamente convexo) extruido hasta height"""
+    kind = "polygon"
+
+    def __init__(self, points, height=0.5):
+        self.vertices = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.height = float(height)
+
+    def aabb(self):
+        low = self.vertices.min(axis=0)
+        high = self.vertices.max(axis=0)
+        return (low[0], low[1], high[0], high[1])
+
+    def outline(self, segments=None):
+        return self.vertices
+
+    def collides_footprint(self, x, y, theta, length, width):
+        # Pasar el polígono a coordenadas del robot: el rectángulo queda alineado con los ejes
+        c, s = math.cos(theta), math.sin(theta)
+        dx = self.vertices[:, 0] - x
+        dy = self.vertices[:, 1] - y
+        local_x = dx * c + dy * s
+        local_y = -dx * s + dy * c
+        half_l, half_w = length / 2, width / 2
+
+        # 1) Algún vértice dentro del rectángulo
+        if np.any((np.abs(local_x) <= half_l) & (np.abs(local_y) <= half_w)):
+            return True
+
+        # 2) El rectángulo completamente dentro del polígono (basta con su centro)
+        if points_in_polygon(0.0, 0.0, np.column_stack((local_x, local_y))):
+            return True
+
+        # 3) Algún lado cruza el rectángulo (recorte de Liang-Barsky vectorizado)
+        x0, y0 = local_x, local_y
+        ex, ey = np.roll(x0, -1) - x0, np.roll(y0, -1) - y0
+        t_low = np.zeros(len(x0))
+        t_high = np.ones(len(x0))
+        for p, q in ((-ex, x0 + half_l), (ex, half_l - x0), (-ey, y0 + half_w), (ey, half_w - y0)):
+            parallel = np.abs(p) < 1e-12
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = q / p
+            t_low = np.where(~parallel & (p < 0), np.maximum(t_low, r), t_low)
+            t_high = np.where(~parallel & (p > 0), np.minimum(t_high, r), t_high)
+            t_high = np.where(parallel & (q < 0), -1.0, t_high)
+        return bool(np.any(t_low <= t_high))
+
+    def contains(self, px, py, inflate=0.0):
+        inside = points_in_polygon(px, py, self.vertices)
+        if inflate > 0.0:
+            inside |= segment_distance(px, py, self.vertices) <= inflate
+        return inside
+
+    def to_dict(self):
+        return {"type": self.kind, "points": self.vertices.tolist(), "height": self.height}
+
+
+class BoxObstacle(PolygonObstacle):
+    """Rectángulo centrado en (x, y) con ángulo en grados"""
+    kind = "box"
+
+    def __init__(self, x, y, width, height_y, angle=0.0, height=0.5):
+        self.x, self.y = float(x), float(y)
+        self.size = (float(width), float(height_y))
+        self.angle = float(angle)
+        corners = footprint_corners(self.x, self.y, math.radians(self.angle), width, height_y)
+        super().__init__(corners, height)
+
+    def to_dict(self):
+        return {"type": self.kind, "x": self.x, "y": self.y, "width": self.size[0],
+                "depth": self.size[1], "angle": self.angle, "height": self.height}
+
+
+def obstacle_from_dict(data):
+    """Crea un obstáculo a partir de una entrada del archivo de escena"""
+    kind = data.get("type")
+    height = data.get("height", 0.5)
+    if kind == "circle":
+        return CircleObstacle(data["x"], data["y"], data["radius"], height)
+    if kind == "box":
+        return BoxObstacle(data["x"], data["y"], data["width"], data["depth"], data.get("angle", 0.0), height)
+    if kind == "polygon":
+        return PolygonObstacle(data["points"], height)
+    raise ValueError(f"Tipo de obstáculo desconocido: {kind!r}")
+
+
+class ObstacleWorld:
+    """Obstáculos estáticos con una fase amplia de hash espacial y una fase exacta
+
+    Cada obstáculo se registra en las celdas (de lado cell_size, normalmente
+    GRID_SPACING) que toca su caja envolvente. Una consulta sólo examina los
+    obstáculos de las celdas que toca la huella del robot, así que el coste
+    por paso no depende del número total de obstáculos.
+    """
+
+    def __init__(self, obstacles=(), cell_size=1.0):
+        self.cell_size = cell_size
+        self.obstacles = []
+        self._cells = {}
+        # Se incrementa al cambiar los obstáculos (invalida geometría y mapas derivados)
+        self.version = 0
+        for obstacle in obstacles:
+            self.add(obstacle)
+
+    @classmethod
+    def load(cls, path, cell_size=1.0):
+        """Carga una escena JSON: {"obstacles": [{"type": "circle"|"box"|"polygon", ...}]}"""
+        with open(path) as f:
+            scene = json.load(f)
+        return cls([obstacle_from_dict(item) for item in scene.get("obstacles", [])], cell_size)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"obstacles": [obstacle.to_dict() for obstacle in self.obstacles]}, f, indent=2)
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def __iter__(self):
+        return iter(self.obstacles)
+
+    def _cell_range(self, min_x, min_y, max_x, max_y):
+        size = self.cell_size
+        return (range(int(math.floor(min_x / size)), int(math.floor(max_x / size)) + 1),
+                range(int(math.floor(min_y / size)), int(math.floor(max_y / size)) + 1))
+
+    def add(self, obstacle):
+        index = len(self.obstacles)
+        self.obstacles.append(obstacle)
+        xs, ys = self._cell_range(*obstacle.aabb())
+        for ix in xs:
+            for iy in ys:
+                self._cells.setdefault((ix, iy), []).append(index)
+        self.version += 1
+        return index
+
+    def candidates(self, min_x, min_y, max_x, max_y):
+        """Índices de los obstáculos registrados en las celdas que toca la caja dada"""
+        found = set()
+        xs, ys = self._cell_range(min_x, min_y, max_x, max_y)
+        for ix in xs:
+            for iy in ys:
+                found.update(self._cells.get((ix, iy), ()))
+        return found
+
+    def collision(self, x, y, theta, length, width):
+        """Primer obstáculo que toca la huella del robot, o None"""
+        half_diagonal = 0.5 * math.hypot(length, width)
+        for index in self.candidates(x - half_diagonal, y - half_diagonal,
+                                     x + half_diagonal, y + half_diagonal):
+            obstacle = self.obstacles[index]
+            if obstacle.collides_footprint(x, y, theta, length, width):
+                return obstacle
+        return None
+
+    def collides(self, x, y, theta, length, width):
+        return self.collision(x, y, theta, length, width) is not None
+
+    def occupancy_mask(self, grid, inflate=0.0):
+        """Máscara (n, n) de las celdas de una PlanningGrid cuyo centro queda dentro (o a menos de inflate) de un obstáculo"""
+        mask = np.zeros((grid.n, grid.n), dtype=bool)
+        cx, cy = grid.cell_centers()
+        for obstacle in self.obstacles:
+            min_x, min_y, max_x, max_y = obstacle.aabb()
+            ix0, iy0 = grid.world_to_cell(min_x - inflate, min_y - inflate)
+            ix1, iy1 = grid.world_to_cell(max_x + inflate, max_y + inflate)
+            window = (slice(ix0, ix1 + 1), slice(iy0, iy1 + 1))
+            mask[window] |= obstacle.contains(cx[window], cy[window], inflate)
+        return mask
@@ -0,0 +1,118 @@
+import csv
+import json
+import time
+import numpy as np
+
+# Fases del bucle principal de Simulator.run() en el orden en que se ejecutan
+FRAME_PHASES = ("handle_input", "robot.update", "update_camera", "draw_grid",
+                "draw_obstacles", "draw_map", "robot.draw", "draw_info", "display.flip")
+
+
+class _NullSection:
+    """Sección que no mide nada (perfilador desactivado)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    def __init__(self, profiler, index):
+        self.profiler = profiler
+        self.index = index
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.index, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """Mide el tiempo de cada fase del cuadro en buffers circulares por fase.
+
+    Con el perfilador desactivado, section() devuelve siempre el mismo objeto
+    vacío, así que el coste por fase es una llamada y una comprobación.
+    """
+
+    def __init__(self, phases=FRAME_PHASES, window=600, enabled=False):
+        self.phases = tuple(phases)
+        self.window = window
+        self.enabled = enabled
+        self._index = {name: i for i, name in enumerate(self.phases)}
+        self._samples = np.zeros((len(self.phases), window), dtype=np.float64)
+        self._sections = [_Section(self, i) for i in range(len(self.phases))]
+        self._next = np.zeros(len(self.phases), dtype=np.int64)
+        self._count = np.zeros(len(self.phases), dtype=np.int64)
+        self.frames = 0
+
+    def section(self, name):
+        """Context manager que mide una fase: with profiler.section("draw_grid"): ..."""
+        if not self.enabled:
+            return _NULL_SECTION
+        return self._sections[self._index[name]]
+
+    def end_frame(self):
+        if self.enabled:
+            self.frames += 1
+
+    def _record(self, index, seconds):
+        i = self._next[index]
+        self._samples[index, i] = seconds
+        self._next[index] = (i + 1) % self.window
+        self._count[index] += 1
+
+    def reset(self):
+        self._next[:] = 0
+        self._count[:] = 0
+        self.frames = 0
+
+    def stats(self):
+        """Devuelve {fase: {"mean", "p50", "p95", "p99", "max", "samples"}} en milisegundos"""
+        result = {}
+        for i, name in enumerate(self.phases):
+            n = min(self._count[i], self.window)
+            if n == 0:
+                continue
+            samples = self._samples[i, :n] * 1000.0
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            result[name] = {
+                "mean": float(samples.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(samples.max()),
+                "samples": int(self._count[i]),
+            }
+        return result
+
+    def overlay_lines(self):
+        """Líneas de texto para el panel del HUD"""
+        lines = ["Fase            p50    p95    p99 (ms)"]
+        total = 0.0
+        for name, s in self.stats().items():
+            total += s["p50"]
+            lines.append(f"{name:<14}{s['p50']:>6.2f} {s['p95']:>6.2f} {s['p99']:>6.2f}")
+        lines.append(f"{'total (p50)':<14}{total:>6.2f}")
+        return lines
+
+    def export(self, path):
+        """Exporta las estadísticas a CSV o JSON según la extensión del archivo"""
+        stats = self.stats()
+        if str(path).lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["phase", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "samples"])
+                for name, s in stats.items():
+                    writer.writerow([name, s["mean"], s["p50"], s["p95"], s["p99"], s["max"], s["samples"]])
+        else:
+            with open(path, "w") as f:
+                json.dump({"frames": self.frames, "window": self.window, "phases": stats}, f, indent=2)
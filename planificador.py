@@ -0,0 +1,372 @@
+import heapq
+import math
+import numpy as np
+
+SQRT2 = math.sqrt(2)
+
+# Tolerancia al comparar claves: h octil y costes acumulados difieren en redondeo
+KEY_EPS = 1e-9
+
+# Vecindad 8-conexa: (dx, dy, coste relativo)
+NEIGHBORS = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+             (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2))
+
+
+class PlanningGrid:
+    """Rejilla de ocupación sobre el mundo [-size*spacing, size*spacing]^2
+
+    resolution indica cuántas celdas de planificación hay por cada GRID_SPACING.
+    """
+
+    def __init__(self, size, spacing, resolution=1):
+        self.half_extent = size * spacing
+        self.cell_size = spacing / resolution
+        self.n = int(round(2 * self.half_extent / self.cell_size))
+        self.blocked = np.zeros((self.n, self.n), dtype=bool)
+        # Se incrementa con cada cambio de obstáculos (invalida cachés)
+        self.version = 0
+
+    def world_to_cell(self, x, y):
+        ix = int(math.floor((x + self.half_extent) / self.cell_size))
+        iy = int(math.floor((y + self.half_extent) / self.cell_size))
+        return min(max(ix, 0), self.n - 1), min(max(iy, 0), self.n - 1)
+
+    def cell_to_world(self, ix, iy):
+        return ((ix + 0.5) * self.cell_size - self.half_extent,
+                (iy + 0.5) * self.cell_size - self.half_extent)
+
+    def in_bounds(self, ix, iy):
+        return 0 <= ix < self.n and 0 <= iy < self.n
+
+    def is_free(self, ix, iy):
+        return self.in_bounds(ix, iy) and not self.blocked[ix, iy]
+
+    def cell_centers(self):
+        """Coordenadas del centro de todas las celdas como arreglos (n, n)"""
+        centers = (np.arange(self.n) + 0.5) * self.cell_size - self.half_extent
+        return np.meshgrid(centers, centers, indexing="ij")
+
+    def set_blocked(self, cells, blocked=True):
+        """Marca celdas (lista de (ix, iy)) como ocupadas o libres; devuelve las que cambiaron"""
+        changed = []
+        for ix, iy in cells:
+            if self.in_bounds(ix, iy) and self.blocked[ix, iy] != blocked:
+                self.blocked[ix, iy] = blocked
+                changed.append((ix, iy))
+        if changed:
+            self.version += 1
+        return changed
+
+    def edge_cost(self, ix, iy, dx, dy, cost):
+        """Coste de moverse de (ix, iy) a su vecino; inf si está bloqueado o corta una esquina"""
+        jx, jy = ix + dx, iy + dy
+        if not self.is_free(jx, jy) or self.blocked[ix, iy]:
+            return math.inf
+        if dx and dy and (self.blocked[ix + dx, iy] or self.blocked[ix, iy + dy]):
+            return math.inf
+        return cost * self.cell_size
+
+    def line_of_sight(self, a, b):
+        """Indica si el segmento entre los centros de dos celdas sólo atraviesa celdas libres"""
+        (ax, ay), (bx, by) = a, b
+        steps = max(abs(bx - ax), abs(by - ay)) * 4 + 1
+        t = np.linspace(0.0, 1.0, steps)
+        xs = ax + 0.5 + (bx - ax) * t
+        ys = ay + 0.5 + (by - ay) * t
+        # Muestrear las esquinas de un cuadrado de media celda alrededor de cada punto
+        # para no rozar obstáculos al recortar en diagonal
+        for ox, oy in ((-0.45, -0.45), (-0.45, 0.45), (0.45, -0.45), (0.45, 0.45)):
+            if self.blocked[np.floor(xs + ox).astype(int), np.floor(ys + oy).astype(int)].any():
+                return False
+        return True
+
+
+def octile(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return (dx + dy) + (SQRT2 - 2) * min(dx, dy)
+
+
+def astar(grid, start, goal):
+    """A* 8-conexo entre dos celdas; devuelve la lista de celdas o None si no hay camino"""
+    if not grid.is_free(*start) or not grid.is_free(*goal):
+        return None
+
+    g = {start: 0.0}
+    parent = {start: None}
+    open_heap = [(octile(start, goal) * grid.cell_size, 0.0, start)]
+    closed = set()
+    while open_heap:
+        _, cost, cell = heapq.heappop(open_heap)
+        if cell in closed:
+            continue
+        if cell == goal:
+            path = []
+            while cell is not None:
+                path.append(cell)
+                cell = parent[cell]
+            return path[::-1]
+        closed.add(cell)
+        ix, iy = cell
+        for dx, dy, step in NEIGHBORS:
+            edge = grid.edge_cost(ix, iy, dx, dy, step)
+            if edge == math.inf:
+                continue
+            neighbor = (ix + dx, iy + dy)
+            new_cost = cost + edge
+            if new_cost < g.get(neighbor, math.inf):
+                g[neighbor] = new_cost
+                parent[neighbor] = cell
+                heapq.heappush(open_heap, (new_cost + octile(neighbor, goal) * grid.cell_size,
+                                           new_cost, neighbor))
+    return None
+
+
+def dijkstra(grid, goal):
+    """Coste desde cada celda hasta goal (inf si no es alcanzable)"""
+    g = np.full((grid.n, grid.n), math.inf)
+    if not grid.is_free(*goal):
+        return g
+    g[goal] = 0.0
+    heap = [(0.0, goal)]
+    while heap:
+        cost, cell = heapq.heappop(heap)
+        if cost > g[cell]:
+            continue
+        ix, iy = cell
+        for dx, dy, step in NEIGHBORS:
+            edge = grid.edge_cost(ix, iy, dx, dy, step)
+            if edge == math.inf:
+                continue
+            neighbor = (ix + dx, iy + dy)
+            new_cost = cost + edge
+            if new_cost < g[neighbor]:
+                g[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+    return g
+
+
+class DStarLite:
+    """D* Lite con raíz en el objetivo sobre una PlanningGrid
+
+    g[celda] es el coste hasta el objetivo. Con start=None calcula el campo de
+    distancias completo (Dijkstra incremental); con start se detiene en cuanto
+    el coste de start es consistente. Cuando cambian obstáculos, update_cells()
+    repara sólo las celdas afectadas en lugar de recalcular desde cero.
+    """
+
+    def __init__(self, grid, goal):
+        self.grid = grid
+        self.goal = goal
+        self.g = np.full((grid.n, grid.n), math.inf)
+        self.rhs = np.full((grid.n, grid.n), math.inf)
+        self.rhs[goal] = 0.0
+        self.km = 0.0
+        self.last_start = None
+        self._heap = []
+        self._queued = {}
+        self._push(goal, self._key(goal, None))
+        self.version = grid.version
+
+    def compute_full(self):
+        """Calcula el campo completo con un Dijkstra directo (más rápido que propagar la cola)"""
+        self.g = dijkstra(self.grid, self.goal)
+        self.rhs = self.g.copy()
+        self._heap = []
+        self._queued = {}
+        self.last_start = None
+        self.version = self.grid.version
+        return self.g
+
+    def _heuristic(self, cell, start):
+        if start is None:
+            return 0.0
+        return octile(cell, start) * self.grid.cell_size
+
+    def _key(self, cell, start):
+        value = min(self.g[cell], self.rhs[cell])
+        return (value + self._heuristic(cell, start) + self.km, value)
+
+    def _push(self, cell, key):
+        self._queued[cell] = key
+        heapq.heappush(self._heap, (key, cell))
+
+    def _top(self):
+        # Cola con borrado perezoso: descartar entradas obsoletas
+        while self._heap:
+            key, cell = self._heap[0]
+            if self._queued.get(cell) == key:
+                return key, cell
+            heapq.heappop(self._heap)
+        return None, None
+
+    def _update_vertex(self, cell, start):
+        if cell != self.goal:
+            ix, iy = cell
+            best = math.inf
+            for dx, dy, step in NEIGHBORS:
+                edge = self.grid.edge_cost(ix, iy, dx, dy, step)
+                if edge != math.inf:
+                    best = min(best, edge + self.g[ix + dx, iy + dy])
+            self.rhs[cell] = best
+        self._queued.pop(cell, None)
+        if self.g[cell] != self.rhs[cell]:
+            self._push(cell, self._key(cell, start))
+
+    def compute(self, start=None):
+        """Propaga costes hasta que start (o todo el campo si start es None) sea consistente"""
+        if start is not None and self.last_start is not None and start != self.last_start:
+            self.km += octile(self.last_start, start) * self.grid.cell_size
+        self.last_start = start
+
+        while True:
+            key, cell = self._top()
+            if key is None:
+                break
+            if start is not None and self.rhs[start] == self.g[start]:
+                if key[0] > self._key(start, start)[0] + KEY_EPS:
+                    break
+            new_key = self._key(cell, start)
+            if key < new_key:
+                self._push(cell, new_key)
+                continue
+            heapq.heappop(self._heap)
+            del self._queued[cell]
+            ix, iy = cell
+            if self.g[cell] > self.rhs[cell]:
+                self.g[cell] = self.rhs[cell]
+            else:
+                self.g[cell] = math.inf
+                self._update_vertex(cell, start)
+            # Predecesores: en una rejilla no dirigida coinciden con los vecinos
+            for dx, dy, _ in NEIGHBORS:
+                neighbor = (ix + dx, iy + dy)
+                if self.grid.in_bounds(*neighbor):
+                    self._update_vertex(neighbor, start)
+        self.version = self.grid.version
+        return self.g
+
+    def update_cells(self, cells, start=None):
+        """Repara el campo tras cambiar la ocupación de las celdas indicadas"""
+        affected = set()
+        for ix, iy in cells:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    neighbor = (ix + dx, iy + dy)
+                    if self.grid.in_bounds(*neighbor):
+                        affected.add(neighbor)
+        for cell in affected:
+            self._update_vertex(cell, start if start is not None else self.last_start)
+        return self.compute(start if start is not None else self.last_start)
+
+    def extract_path(self, start, max_steps=None):
+        """Desciende por el campo de costes desde start hasta el objetivo"""
+        if self.g[start] == math.inf:
+            return None
+        path = [start]
+        cell = start
+        max_steps = max_steps or self.grid.n * self.grid.n
+        while cell != self.goal and len(path) <= max_steps:
+            ix, iy = cell
+            best, best_cost = None, math.inf
+            for dx, dy, step in NEIGHBORS:
+                edge = self.grid.edge_cost(ix, iy, dx, dy, step)
+                if edge == math.inf:
+                    continue
+                cost = edge + self.g[ix + dx, iy + dy]
+                if cost < best_cost:
+                    best, best_cost = (ix + dx, iy + dy), cost
+            if best is None:
+                return None
+            path.append(best)
+            cell = best
+        return path if cell == self.goal else None
+
+
+class GridPlanner:
+    """Planificador sobre el mundo del simulador con obstáculos estáticos
+
+    Los campos de distancias con raíz en cada objetivo se guardan en caché, de
+    modo que muchos robots que van al mismo objetivo comparten un único
+    cálculo; al cambiar los obstáculos se reparan de forma incremental.
+    """
+
+    def __init__(self, size, spacing, resolution=1, max_cached_fields=32):
+        self.grid = PlanningGrid(size, spacing, resolution)
+        self.max_cached_fields = max_cached_fields
+        self._fields = {}
+
+    def set_obstacle_cells(self, cells, blocked=True):
+        """Cambia la ocupación de celdas y repara los campos de distancias en caché"""
+        changed = self.grid.set_blocked(cells, blocked)
+        if changed:
+            for field in self._fields.values():
+                field.update_cells(changed)
+        return changed
+
+    def set_obstacles_from_mask(self, mask):
+        """Sustituye la ocupación por una máscara booleana (n, n)"""
+        changed_x, changed_y = np.nonzero(mask != self.grid.blocked)
+        to_block = [(ix, iy) for ix, iy in zip(changed_x, changed_y) if mask[ix, iy]]
+        to_free = [(ix, iy) for ix, iy in zip(changed_x, changed_y) if not mask[ix, iy]]
+        changed = self.set_obstacle_cells(to_block, True) + self.set_obstacle_cells(to_free, False)
+        return changed
+
+    def distance_field(self, goal_xy):
+        """Campo de costes hasta el objetivo (compartido entre todos los que lo pidan)"""
+        goal = self.grid.world_to_cell(*goal_xy)
+        field = self._fields.get(goal)
+        if field is None:
+            if len(self._fields) >= self.max_cached_fields:
+                self._fields.pop(next(iter(self._fields)))
+            field = DStarLite(self.grid, goal)
+            field.compute_full()
+            self._fields[goal] = field
+        return field
+
+    def plan(self, start_xy, goal_xy, goal_theta=None, method="field", simplify=True):
+        """Planifica una ruta y la devuelve como lista (x, y, theta) lista para set_path()
+
+        method="astar" usa A* directo; method="field" usa el campo de distancias
+        en caché del objetivo. Devuelve None si no hay camino.
+        """
+        start = self.grid.world_to_cell(*start_xy)
+        goal = self.grid.world_to_cell(*goal_xy)
+        if method == "astar":
+            cells = astar(self.grid, start, goal)
+        else:
+            cells = self.distance_field(goal_xy).extract_path(start)
+        if cells is None:
+            return None
+        if simplify:
+            cells = self.simplify(cells)
+        return self.to_waypoints(cells, goal_xy, goal_theta)
+
+    def simplify(self, cells):
+        """Elimina celdas intermedias cuando hay línea de visión entre sus extremos"""
+        if len(cells) <= 2:
+            return cells
+        result = [cells[0]]
+        anchor = 0
+        i = 2
+        while i < len(cells):
+            if not self.grid.line_of_sight(cells[anchor], cells[i]):
+                result.append(cells[i - 1])
+                anchor = i - 1
+            i += 1
+        result.append(cells[-1])
+        return result
+
+    def to_waypoints(self, cells, goal_xy, goal_theta=None):
+        points = [self.grid.cell_to_world(ix, iy) for ix, iy in cells[1:-1]]
+        points.append((float(goal_xy[0]), float(goal_xy[1])))
+        start = self.grid.cell_to_world(*cells[0])
+        waypoints = []
+        previous = start
+        for x, y in points:
+            waypoints.append((x, y, math.atan2(y - previous[1], x - previous[0])))
+            previous = (x, y)
+        if goal_theta is not None:
+            x, y, _ = waypoints[-1]
+            waypoints[-1] = (x, y, goal_theta)
+        return waypoints
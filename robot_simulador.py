@@ -1,12 +1,30 @@
 import pygame
 import sys
 import math
+import argparse
 import numpy as np
+from collections import OrderedDict
+from contextlib import nullcontext
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import tkinter as tk
-from tkinter import simpledialog
+from tkinter import simpledialog, filedialog
+
+from fisica_hilo import PhysicsThread
+from controlador import ControlGains
+from perfilador import FrameProfiler
+from obstaculos import ObstacleWorld, triangulate
+from lidar import Lidar
+from localizacion import ParticleFilter
+from mapeo import OccupancyMap
+from grabacion import TrajectoryRecorder, TrajectoryLog, Replay
+from analitica import TrajectoryAnalytics
+from eventos import (InputRecorder, apply_command, apply_manual_control,
+                     KEY_FORWARD, KEY_BACKWARD, KEY_LEFT, KEY_RIGHT)
+from mundo import ChunkedWorld, directory_loader, procedural_loader
+from ruta import ArrayPath, smooth_path, speed_profile
+from importador import PathImporter
 
 # Constantes
 SCREEN_WIDTH = 1200
@@ -14,6 +32,13 @@ SCREEN_HEIGHT = 800
 GRID_SIZE = 20
 GRID_SPACING = 1.0
 
+# Proyección de la cámara
+CAMERA_FOV = 45.0  # grados (vertical)
+CAMERA_NEAR = 0.1
+CAMERA_FAR = 50.0
+CAMERA_MIN_DISTANCE = 2.0
+CAMERA_MAX_DISTANCE = 2000.0
+
 # Colores
 WHITE = (1.0, 1.0, 1.0, 1.0)
 RED = (1.0, 0.0, 0.0, 1.0)
@@ -23,6 +48,236 @@ YELLOW = (1.0, 1.0, 0.0, 1.0)
 GRAY = (0.5, 0.5, 0.5, 1.0)
 BLACK = (0.0, 0.0, 0.0, 1.0)
 
+def arc_step(x, y, theta, linear_velocity, angular_velocity, dt):
+    """Solución exacta del uniciclo con velocidades constantes durante dt (arco de circunferencia)"""
+    half_turn = angular_velocity * dt / 2
+    # sin(a)/a con desarrollo en serie cerca de cero para evitar la división
+    if abs(half_turn) < 1e-6:
+        chord = 1.0 - half_turn * half_turn / 6
+    else:
+        chord = math.sin(half_turn) / half_turn
+    distance = linear_velocity * dt * chord
+    heading = theta + half_turn
+    return (x + distance * math.cos(heading),
+            y + distance * math.sin(heading),
+            theta + 2 * half_turn)
+
+def pick_ground_plane(screen_points, eye, target, fov, width, height):
+    """Intersecta con el plano z=0 los rayos de cámara que pasan por los puntos de pantalla.
+
+    Construye los rayos analíticamente a partir de la pose de la cámara (gluLookAt
+    con eje Z hacia arriba) y de la proyección en perspectiva, sin leer el buffer
+    de profundidad. Devuelve un arreglo (n, 3); los rayos que no tocan el suelo
+    quedan en NaN.
+    """
+    points = np.asarray(screen_points, dtype=np.float64).reshape(-1, 2)
+    eye = np.asarray(eye, dtype=np.float64)
+    
+    # Base de la cámara (igual que gluLookAt)
+    forward = np.asarray(target, dtype=np.float64) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, (0.0, 0.0, 1.0))
+    side /= np.linalg.norm(side)
+    up = np.cross(side, forward)
+    
+    # Coordenadas normalizadas de dispositivo (y de pantalla hacia abajo)
+    tan_half = math.tan(math.radians(fov) / 2)
+    ndc_x = (2 * points[:, 0] / width - 1) * tan_half * width / height
+    ndc_y = (1 - 2 * points[:, 1] / height) * tan_half
+    directions = forward + ndc_x[:, None] * side + ndc_y[:, None] * up
+    
+    # Intersección con z=0 (sólo rayos que bajan hacia el suelo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = -eye[2] / directions[:, 2]
+    t[~(t > 0)] = np.nan
+    world = eye + t[:, None] * directions
+    world[:, 2] = 0.0
+    return world
+
+class MeshCache:
+    """Compila geometría estática en display lists de OpenGL y la reutiliza en cada cuadro.
+
+    Las listas se identifican con una clave que incluye los parámetros de la
+    geometría, así que cambiar por ejemplo wheel_radius genera una lista nueva.
+    """
+    def __init__(self):
+        self._lists = {}
+    
+    def call(self, key, build):
+        """Dibuja la lista asociada a key, compilándola con build() la primera vez"""
+        list_id = self._lists.get(key)
+        if list_id is None:
+            list_id = glGenLists(1)
+            glNewList(list_id, GL_COMPILE)
+            build()
+            glEndList()
+            self._lists[key] = list_id
+        glCallList(list_id)
+    
+    def discard(self, key):
+        """Libera la lista asociada a key, si existe (geometría que ya no se va a dibujar)"""
+        list_id = self._lists.pop(key, None)
+        if list_id is not None:
+            glDeleteLists(list_id, 1)
+    
+    def clear(self):
+        """Libera todas las listas (necesario si se recrea el contexto OpenGL)"""
+        for list_id in self._lists.values():
+            glDeleteLists(list_id, 1)
+        self._lists = {}
+
+# Caché compartida de geometría estática del contexto OpenGL actual
+MESHES = MeshCache()
+
+class TextCache:
+    """Caché de textos del HUD rasterizados una vez y guardados como texturas OpenGL.
+
+    Los textos que no cambian (etiquetas, ayuda) se rasterizan una sola vez; los
+    valores numéricos sólo se rasterizan cuando cambian. Las entradas menos
+    usadas se liberan al superar max_entries.
+    """
+    def __init__(self, font, max_entries=256):
+        self.font = font
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+    
+    def get(self, text, color=(255, 255, 255)):
+        """Devuelve (textura, ancho, alto) del texto, rasterizándolo si no está en caché"""
+        key = (text, color)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        
+        surface = self.font.render(text, True, color)
+        width, height = surface.get_size()
+        data = pygame.image.tostring(surface, "RGBA", False)
+        
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        
+        entry = (texture, width, height)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            _, (old_texture, _, _) = self._entries.popitem(last=False)
+            glDeleteTextures([old_texture])
+        return entry
+    
+    def draw(self, text, x, y, color=(255, 255, 255)):
+        """Dibuja el texto como un quad texturizado en coordenadas de pantalla y devuelve su ancho"""
+        if not text:
+            return 0
+        texture, width, height = self.get(text, color)
+        
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(x, y)
+        glTexCoord2f(1, 0)
+        glVertex2f(x + width, y)
+        glTexCoord2f(1, 1)
+        glVertex2f(x + width, y + height)
+        glTexCoord2f(0, 1)
+        glVertex2f(x, y + height)
+        glEnd()
+        glDisable(GL_TEXTURE_2D)
+        return width
+    
+    def clear(self):
+        """Libera todas las texturas"""
+        if self._entries:
+            glDeleteTextures([texture for texture, _, _ in self._entries.values()])
+        self._entries = OrderedDict()
+
+class TrailBuffer:
+    """Buffer circular de tamaño fijo para la trayectoria (x, y) con inserción O(1).
+
+    Cada punto se escribe dos veces (en i y en i + capacidad), de modo que los
+    últimos puntos siempre forman un bloque contiguo que se puede pasar a
+    OpenGL en una sola llamada sin copiarlo.
+    """
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._data = np.zeros((2 * self.capacity, 2), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+        # Puntos añadidos en total y cambios que no son sólo añadir (vaciar, redimensionar):
+        # permiten a una copia sincronizarse copiando sólo los puntos nuevos
+        self.total = 0
+        self.version = 0
+    
+    def append(self, x, y):
+        """Añade un punto, descartando el más antiguo si el buffer está lleno"""
+        i = self._next
+        self._data[i] = self._data[i + self.capacity] = (x, y)
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        self.total += 1
+    
+    def view(self):
+        """Devuelve los puntos en orden cronológico como vista contigua de forma (n, 2)"""
+        start = self._next - self._size
+        if start < 0:
+            start += self.capacity
+        return self._data[start:start + self._size]
+    
+    def extend(self, points):
+        """Añade varios puntos (n, 2) de una vez"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)[-self.capacity:]
+        count = len(points)
+        index = (self._next + np.arange(count)) % self.capacity
+        self._data[index] = points
+        self._data[index + self.capacity] = points
+        self._next = (self._next + count) % self.capacity
+        self._size = min(self.capacity, self._size + count)
+        self.total += count
+    
+    def clear(self):
+        self._next = 0
+        self._size = 0
+        self.version += 1
+    
+    def resize(self, capacity):
+        """Cambia la capacidad conservando los puntos más recientes"""
+        points = self.view()[-max(1, int(capacity)):].copy()
+        version = self.version + 1
+        self.__init__(capacity)
+        self.extend(points)
+        self.version = version
+    
+    def sync_from(self, other, seen):
+        """Actualiza esta copia de other copiando sólo los puntos añadidos desde seen = (version, total)
+        
+        Devuelve el nuevo seen. Si other se vació, cambió de tamaño o añadió más
+        puntos de los que caben, se copia entero.
+        """
+        version, total = seen
+        new = other.total - total
+        if version != other.version or self.capacity != other.capacity or new > other.capacity or new < 0:
+            if self.capacity != other.capacity:
+                self.__init__(other.capacity)
+            self.clear()
+            self.extend(other.view())
+        elif new:
+            self.extend(other.view()[-new:])
+        return other.version, other.total
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        return iter(self.view().tolist())
+    
+    def __getitem__(self, index):
+        return self.view()[index]
+
 class DifferentialRobot:
     def __init__(self):
         # Parámetros físicos del robot
@@ -42,20 +297,28 @@ class DifferentialRobot:
         self.angular_velocity = 0.0  # velocidad angular (rad/s)
         
         # Trayectoria
-        self.trail = []
-        self.max_trail_length = 1000
+        self.trail = TrailBuffer(1000)
         
         # Modo de control
-        self.control_mode = "MANUAL"  # "MANUAL", "AUTO_POSITION", "AUTO_PATH"
+        self.control_mode = "MANUAL"  # "MANUAL", "AUTO_POSITION", "AUTO_PATH", "AUTO_PURSUIT"
         
         # Objetivos
         self.target_position = None  # (x, y, theta)
         self.path = []  # lista de posiciones (x, y, theta)
         self.current_path_index = 0
+        self._path_vertices_source = None
+        self._path_vertices_cache = None
         
         # Parámetros de control
         self.position_tolerance = 0.1  # metros
         self.angle_tolerance = 0.05  # radianes
+        self.gains = ControlGains()
+        
+        # Seguimiento con punto adelantado (AUTO_PURSUIT)
+        self.lookahead_distance = 0.5  # metros
+        self.pursuit_speed = 0.5  # m/s (si la ruta no tiene perfil de velocidad)
+        self.max_acceleration = 0.5  # m/s², para el perfil de velocidad de track_waypoints
+        self.path_progress = None  # longitud de arco recorrida sobre la ruta
         
         # Voltajes (simulación)
         self.left_voltage = 0.0  # voltios
@@ -65,10 +328,97 @@ class DifferentialRobot:
         # Constantes del motor (simuladas)
         self.motor_constant = 0.6  # rad/s por voltio
         
-        # Tiempo
-        self.last_update_time = pygame.time.get_ticks() / 1000.0
+        # Obstáculos estáticos (ObstacleWorld): un paso que choca se deshace
+        self.obstacles = None
+        self.collisions = 0  # pasos revertidos por colisión
+        
+        # Sensor de distancia (lidar.Lidar); scan guarda el último escaneo para los controladores
+        self.lidar = None
+        self.scan = None
+        self._since_scan = math.inf  # segundos desde el último escaneo
+        
+        # Estimador de la pose (localizacion.ParticleFilter) a partir de odometría y del lidar
+        self.localizer = None
+        
+        # Mapa de ocupación (mapeo.OccupancyMap) construido con los escaneos del lidar
+        self.mapper = None
+        
+        # Grabación de cada estado tras el paso (grabacion.TrajectoryRecorder)
+        self.recorder = None
+        
+        # Métricas de la ejecución calculadas en línea (analitica.TrajectoryAnalytics)
+        self.analytics = None
+        
+        # Integrador: "EULER" (Euler explícito) o "EXACT" (arco exacto con subpasos adaptativos)
+        self.integrator = "EULER"
+        self.max_substep = 0.05  # segundos
+        self.min_substep = 1e-4  # segundos
+        
+        # Tiempo de simulación (segundos acumulados en update, sin depender de pygame)
+        self.last_update_time = 0.0
     
     def update(self, dt):
+        previous_x, previous_y = self.x, self.y
+        
+        # Escaneo desde la pose al inicio del paso cada lidar.scan_interval; entre
+        # escaneos los controladores siguen viendo el último
+        if self.lidar is not None:
+            if self._since_scan >= self.lidar.scan_interval - 1e-9:
+                self._since_scan = 0.0
+                self.scan = self.lidar.scan_robot(self)
+                if self.localizer is not None:
+                    self.localizer.correct(self.scan)
+                if self.mapper is not None:
+                    self.mapper.observe(self.last_update_time, self.x, self.y, self.theta,
+                                        self.scan, self.lidar.angles, self.lidar.max_range)
+            self._since_scan += dt
+        
+        if self.integrator == "EXACT":
+            # Arco exacto con subpasos adaptativos: el controlador se ejecuta tras cada subpaso
+            remaining = dt
+            while remaining > 0.0:
+                step = self._substep_size(remaining)
+                self._integrate(step)
+                self._update_control()
+                remaining -= step
+        else:
+            self._integrate(dt)
+        
+        # Guardar posición en la trayectoria
+        self.trail.append(self.x, self.y)
+        
+        # Actualizar control automático
+        if self.integrator != "EXACT":
+            self._update_control()
+        
+        if self.analytics is not None:
+            self.analytics.observe(self, dt, previous_x, previous_y)
+        if self.recorder is not None:
+            self.recorder.record(self)
+    
+    @property
+    def trail_points(self):
+        """Vista contigua (n, 2) de la trayectoria reciente"""
+        return self.trail.view()
+    
+    @property
+    def particles(self):
+        """Partículas (N, 3) del estimador de pose, o None sin localizador"""
+        return self.localizer.particles if self.localizer is not None else None
+    
+    @property
+    def estimated_pose(self):
+        return self.localizer.estimate if self.localizer is not None else None
+    
+    @property
+    def max_trail_length(self):
+        return self.trail.capacity
+    
+    @max_trail_length.setter
+    def max_trail_length(self, length):
+        self.trail.resize(length)
+    
+    def _update_wheel_velocities(self):
         # Actualizar velocidades de las ruedas basadas en voltajes
         self.v_left = self.motor_constant * self.left_voltage
         self.v_right = self.motor_constant * self.right_voltage
@@ -80,21 +430,65 @@ class DifferentialRobot:
         # Calcular velocidades del robot
         self.linear_velocity = (self.v_right + self.v_left) * self.wheel_radius / 2
         self.angular_velocity = (self.v_right - self.v_left) * self.wheel_radius / self.wheel_distance
+    
+    def _integrate(self, dt):
+        """Integra la cinemática un paso dt con voltajes constantes"""
+        self._update_wheel_velocities()
+        previous_pose = (self.x, self.y, self.theta)
         
         # Actualizar posición y orientación
-        self.x += self.linear_velocity * math.cos(self.theta) * dt
-        self.y += self.linear_velocity * math.sin(self.theta) * dt
-        self.theta += self.angular_velocity * dt
+        if self.integrator == "EXACT":
+            self.x, self.y, self.theta = arc_step(self.x, self.y, self.theta,
+                                                  self.linear_velocity, self.angular_velocity, dt)
+        else:
+            self.x += self.linear_velocity * math.cos(self.theta) * dt
+            self.y += self.linear_velocity * math.sin(self.theta) * dt
+            self.theta += self.angular_velocity * dt
         
         # Normalizar ángulo
         self.theta = self.theta % (2 * math.pi)
-        
-        # Guardar posición en la trayectoria
-        self.trail.append((self.x, self.y))
-        if len(self.trail) > self.max_trail_length:
-            self.trail.pop(0)
-        
-        # Actualizar control automático
+        self.last_update_time += dt
+        
+        # Colisión con obstáculos: volver a la pose anterior y detener el robot (ruedas incluidas)
+        if self.obstacles is not None and self.obstacles.collides(self.x, self.y, self.theta, *self.footprint()):
+            self.x, self.y, self.theta = previous_pose
+            self.v_left = self.v_right = 0.0
+            self.linear_velocity = 0.0
+            self.angular_velocity = 0.0
+            self.collisions += 1
+        
+        # Las partículas avanzan con las velocidades de rueda medidas en este paso
+        if self.localizer is not None:
+            self.localizer.predict(self.v_left, self.v_right, self.wheel_radius, self.wheel_distance, dt)
+    
+    def footprint(self):
+        """Largo y ancho de la base del robot (la misma que dibuja _draw_robot_body)"""
+        return self.wheel_distance * 1.2, self.wheel_distance * 0.8
+    
+    def _substep_size(self, remaining):
+        """Elige el subpaso del integrador exacto según cuánto puede cambiar el controlador"""
+        # En modo manual los voltajes no cambian durante el paso: un único arco es exacto
+        if self.control_mode == "MANUAL":
+            return remaining
+        
+        self._update_wheel_velocities()
+        step = min(remaining, self.max_substep)
+        
+        # No avanzar más que una fracción de la distancia al objetivo
+        if self.target_position and abs(self.linear_velocity) > 1e-9:
+            dx = self.target_position[0] - self.x
+            dy = self.target_position[1] - self.y
+            distance = math.sqrt(dx*dx + dy*dy)
+            step = min(step, max(0.5 * distance, self.position_tolerance * 0.5) / abs(self.linear_velocity))
+        
+        # No girar más que la tolerancia angular en un subpaso
+        if abs(self.angular_velocity) > 1e-9:
+            step = min(step, self.angle_tolerance / abs(self.angular_velocity))
+        
+        return max(step, min(remaining, self.min_substep))
+    
+    def _update_control(self):
+        """Actualiza el control automático según el modo activo"""
         if self.control_mode == "AUTO_POSITION" and self.target_position:
             self.move_to_target()
         elif self.control_mode == "AUTO_PATH" and self.path:
@@ -111,10 +505,16 @@ class DifferentialRobot:
                 self.control_mode = "MANUAL"
                 self.left_voltage = 0.0
                 self.right_voltage = 0.0
+        elif self.control_mode == "AUTO_PURSUIT" and self.path:
+            if self.pursue_path():
+                self.control_mode = "MANUAL"
+                self.left_voltage = 0.0
+                self.right_voltage = 0.0
     
     def move_to_target(self):
         """Control para mover el robot a una posición objetivo (x, y, theta)"""
         target_x, target_y, target_theta = self.target_position
+        gains = self.gains
         
         # Calcular distancia y ángulo al objetivo
         dx = target_x - self.x
@@ -136,14 +536,14 @@ class DifferentialRobot:
             
             # Ajustar orientación
             if angle_diff > 0:
-                self.left_voltage = -2.0
-                self.right_voltage = 2.0
+                self.left_voltage = -gains.align_voltage
+                self.right_voltage = gains.align_voltage
             else:
-                self.left_voltage = 2.0
-                self.right_voltage = -2.0
+                self.left_voltage = gains.align_voltage
+                self.right_voltage = -gains.align_voltage
                 
             # Reducir voltaje para movimientos pequeños
-            factor = min(1.0, abs(angle_diff) / 0.5)
+            factor = min(1.0, abs(angle_diff) / gains.turn_slowdown_angle)
             self.left_voltage *= factor
             self.right_voltage *= factor
             
@@ -156,32 +556,32 @@ class DifferentialRobot:
             angle_diff -= 2 * math.pi
         
         # Ajustar orientación primero
-        if abs(angle_diff) > 0.1:
+        if abs(angle_diff) > gains.heading_gate:
             if angle_diff > 0:
-                self.left_voltage = -3.0
-                self.right_voltage = 3.0
+                self.left_voltage = -gains.turn_voltage
+                self.right_voltage = gains.turn_voltage
             else:
-                self.left_voltage = 3.0
-                self.right_voltage = -3.0
+                self.left_voltage = gains.turn_voltage
+                self.right_voltage = -gains.turn_voltage
                 
             # Reducir voltaje para movimientos pequeños
-            factor = min(1.0, abs(angle_diff) / 0.5)
+            factor = min(1.0, abs(angle_diff) / gains.turn_slowdown_angle)
             self.left_voltage *= factor
             self.right_voltage *= factor
         else:
             # Moverse hacia adelante
-            base_voltage = 10.0
+            base_voltage = gains.base_voltage
             self.left_voltage = base_voltage
             self.right_voltage = base_voltage
             
             # Ajuste proporcional para mantener la dirección
-            steering = angle_diff * 2.0
+            steering = angle_diff * gains.steering_gain
             self.left_voltage -= steering
             self.right_voltage += steering
             
             # Reducir velocidad al acercarse al objetivo
-            if distance < 1.0:
-                factor = max(0.3, distance)
+            if distance < gains.slowdown_distance:
+                factor = max(gains.min_speed_factor, distance / gains.slowdown_distance)
                 self.left_voltage *= factor
                 self.right_voltage *= factor
         
@@ -204,22 +604,201 @@ class DifferentialRobot:
         self.current_path_index = 0
         self.control_mode = "AUTO_PATH"
     
-    def draw(self):
-        """Dibuja el robot en OpenGL"""
-        # Dibujar trayectoria
-        glBegin(GL_LINE_STRIP)
-        glColor4f(*GRAY)
-        for x, y in self.trail:
-            glVertex3f(x, y, 0.01)
-        glEnd()
+    def follow_path(self, path, lookahead=None):
+        """Sigue una ruta larga con un punto adelantado en lugar de ir punto por punto"""
+        self.path = path if isinstance(path, ArrayPath) else ArrayPath(path)
+        if lookahead is not None:
+            self.lookahead_distance = lookahead
+        self.path_progress = None
+        self.current_path_index = 0
+        self.target_position = self.path[len(self.path) - 1]
+        self.control_mode = "AUTO_PURSUIT"
+    
+    def track_waypoints(self, waypoints, spacing=0.05):
+        """Recorre varios puntos sin detenerse en cada uno
+        
+        Ajusta una spline suave desde la posición actual que pasa por todos los
+        puntos, calcula un perfil de velocidad limitado por curvatura (respetando
+        max_wheel_velocity) y la sigue con punto adelantado. Sólo la pose final
+        se alcanza exactamente.
+        """
+        path = smooth_path(waypoints, start=(self.x, self.y), start_heading=self.theta, spacing=spacing)
+        speed_profile(path, self.max_wheel_velocity, self.wheel_radius, self.wheel_distance,
+                      max_acceleration=self.max_acceleration, initial_speed=abs(self.linear_velocity))
+        self.follow_path(path)
+    
+    def pursue_path(self):
+        """Control de persecución pura sobre una ArrayPath; devuelve True al llegar al final"""
+        path = self.path
+        
+        # Progreso sobre la ruta: búsqueda local alrededor del progreso anterior
+        window = max(2 * self.lookahead_distance, 1.0)
+        s, segment, _ = path.nearest(self.x, self.y, hint=self.path_progress, window=window)
+        self.path_progress = s
+        self.current_path_index = segment + 1
+        
+        # Cerca del final: llegar exactamente a la pose final
+        if path.total_length - s <= self.lookahead_distance:
+            self.target_position = path[len(path) - 1]
+            return self.move_to_target()
+        
+        # Punto adelantado sobre la ruta
+        goal_x, goal_y, _ = path.point_at(s + self.lookahead_distance)
+        dx = goal_x - self.x
+        dy = goal_y - self.y
+        alpha = (math.atan2(dy, dx) - self.theta) % (2 * math.pi)
+        if alpha > math.pi:
+            alpha -= 2 * math.pi
+        
+        # Si el punto queda detrás, girar en el sitio como en move_to_target
+        if abs(alpha) > math.pi / 2:
+            turn = self.gains.turn_voltage if alpha > 0 else -self.gains.turn_voltage
+            self.left_voltage = -turn
+            self.right_voltage = turn
+            return False
+        
+        curvature = 2 * math.sin(alpha) / max(math.sqrt(dx*dx + dy*dy), 1e-9)
+        speed = path.speed_at(s) if path.speeds is not None else self.pursuit_speed
+        self.drive_with_curvature(speed, curvature)
+        return False
+    
+    def drive_with_curvature(self, speed, curvature):
+        """Fija los voltajes para avanzar a speed (m/s) con la curvatura dada (1/m)
+        
+        Si alguna rueda supera max_wheel_velocity se reducen ambas en la misma
+        proporción, de modo que se conserva la curvatura.
+        """
+        angular = speed * curvature
+        half_track = angular * self.wheel_distance / 2
+        wheel_right = (speed + half_track) / self.wheel_radius
+        wheel_left = (speed - half_track) / self.wheel_radius
+        
+        scale = max(abs(wheel_left), abs(wheel_right)) / self.max_wheel_velocity
+        if scale > 1.0:
+            wheel_left /= scale
+            wheel_right /= scale
+        
+        self.left_voltage = wheel_left / self.motor_constant
+        self.right_voltage = wheel_right / self.motor_constant
+    
+    def draw(self, state=None):
+        """Dibuja el robot en OpenGL
+        
+        state permite dibujar una instantánea del estado (por ejemplo la publicada
+        por el hilo de física) en lugar del estado vivo del robot.
+        """
+        state = self if state is None else state
+        
+        # Dibujar trayectoria (una sola llamada con la vista contigua del buffer)
+        points = state.trail_points
+        if len(points) > 1:
+            glColor4f(*GRAY)
+            glPushMatrix()
+            glTranslatef(0, 0, 0.01)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(2, GL_DOUBLE, 0, points)
+            glDrawArrays(GL_LINE_STRIP, 0, len(points))
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glPopMatrix()
+        
+        # Haces del último escaneo del lidar
+        if self.lidar is not None and state.scan is not None:
+            self._draw_scan(state)
         
-        # Guardar matriz actual
+        # Nube de partículas y pose estimada
+        if self.localizer is not None and state.particles is not None:
+            self._draw_localization(state)
+        
+        # Cuerpo, ruedas y flecha: geometría estática compilada una sola vez
         glPushMatrix()
+        glTranslatef(state.x, state.y, 0.1)
+        glRotatef(state.theta * 180 / math.pi, 0, 0, 1)
+        MESHES.call(("robot", self.wheel_radius, self.wheel_distance), self._draw_robot_model)
+        glPopMatrix()
         
-        # Trasladar y rotar
-        glTranslatef(self.x, self.y, 0.1)
-        glRotatef(self.theta * 180 / math.pi, 0, 0, 1)
+        # Dibujar objetivo si existe
+        if state.target_position:
+            tx, ty, ttheta = state.target_position
+            glPushMatrix()
+            glTranslatef(tx, ty, 0.05)
+            glRotatef(ttheta * 180 / math.pi, 0, 0, 1)
+            MESHES.call(("target",), self._draw_target_marker)
+            glPopMatrix()
         
+        # Dibujar ruta si existe
+        if state.path and len(state.path) > 0:
+            points = self._path_vertices(state.path)
+            glPushMatrix()
+            glTranslatef(0, 0, 0.02)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(2, GL_DOUBLE, 0, points)
+            
+            glColor4f(*YELLOW)
+            glDrawArrays(GL_LINE_STRIP, 0, len(points))
+            
+            # Dibujar puntos de la ruta (el punto actual en verde)
+            glPointSize(5.0)
+            glDrawArrays(GL_POINTS, 0, len(points))
+            if state.current_path_index < len(points):
+                glColor4f(*GREEN)
+                glDrawArrays(GL_POINTS, state.current_path_index, 1)
+            
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glPopMatrix()
+    
+    def _draw_scan(self, state):
+        """Dibuja cada haz como un segmento desde el robot hasta el punto medido"""
+        hits = self.lidar.hit_points(state.x, state.y, state.theta, state.scan)
+        vertices = np.empty((2 * len(hits), 2))
+        vertices[0::2] = (state.x, state.y)
+        vertices[1::2] = hits
+        glColor4f(1.0, 0.3, 0.3, 0.35)
+        glPushMatrix()
+        glTranslatef(0, 0, 0.15)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_DOUBLE, 0, vertices)
+        glDrawArrays(GL_LINES, 0, len(vertices))
+        glColor4f(*RED)
+        glPointSize(3.0)
+        glVertexPointer(2, GL_DOUBLE, 0, np.ascontiguousarray(hits))
+        glDrawArrays(GL_POINTS, 0, len(hits))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPopMatrix()
+    
+    def _draw_localization(self, state):
+        """Dibuja las partículas como puntos y la pose estimada como un marcador naranja"""
+        glColor4f(0.2, 0.6, 1.0, 0.5)
+        glPointSize(2.0)
+        glPushMatrix()
+        glTranslatef(0, 0, 0.03)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_DOUBLE, 3 * 8, state.particles)
+        glDrawArrays(GL_POINTS, 0, len(state.particles))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glPopMatrix()
+        
+        ex, ey, etheta = state.estimated_pose
+        glPushMatrix()
+        glTranslatef(ex, ey, 0.04)
+        glRotatef(etheta * 180 / math.pi, 0, 0, 1)
+        glColor4f(1.0, 0.5, 0.0, 0.8)
+        self._draw_circle(0.12)
+        glBegin(GL_LINES)
+        glVertex3f(0, 0, 0.01)
+        glVertex3f(0.3, 0, 0.01)
+        glEnd()
+        glPopMatrix()
+    
+    def _path_vertices(self, path):
+        """Devuelve los puntos (x, y) de la ruta como arreglo contiguo, recalculado sólo si cambia la ruta"""
+        if self._path_vertices_source is not path:
+            points = np.asarray(path, dtype=np.float64).reshape(-1, 3)
+            self._path_vertices_cache = np.ascontiguousarray(points[:, :2])
+            self._path_vertices_source = path
+        return self._path_vertices_cache
+    
+    def _draw_robot_model(self):
+        """Dibuja el modelo del robot en coordenadas locales (se compila en una display list)"""
         # Dibujar cuerpo del robot
         glColor4f(*BLUE)
         self._draw_robot_body()
@@ -242,52 +821,24 @@ class DifferentialRobot:
         glVertex3f(0.25, 0.05, 0.2)
         glVertex3f(0.25, -0.05, 0.2)
         glEnd()
+    
+    def _draw_target_marker(self):
+        """Dibuja el marcador de objetivo orientado sobre el eje X local"""
+        # Círculo objetivo
+        glColor4f(*GREEN)
+        self._draw_circle(0.2)
         
-        # Restaurar matriz
-        glPopMatrix()
-        
-        # Dibujar objetivo si existe
-        if self.target_position:
-            tx, ty, ttheta = self.target_position
-            glPushMatrix()
-            glTranslatef(tx, ty, 0.05)
-            
-            # Círculo objetivo
-            glColor4f(*GREEN)
-            self._draw_circle(0.2)
-            
-            # Línea de orientación objetivo
-            glBegin(GL_LINES)
-            glVertex3f(0, 0, 0.05)
-            glVertex3f(0.3 * math.cos(ttheta), 0.3 * math.sin(ttheta), 0.05)
-            glEnd()
-            
-            glPopMatrix()
-        
-        # Dibujar ruta si existe
-        if self.path and len(self.path) > 0:
-            glBegin(GL_LINE_STRIP)
-            glColor4f(*YELLOW)
-            for x, y, _ in self.path:
-                glVertex3f(x, y, 0.02)
-            glEnd()
-            
-            # Dibujar puntos de la ruta
-            glPointSize(5.0)
-            glBegin(GL_POINTS)
-            for i, (x, y, _) in enumerate(self.path):
-                if i == self.current_path_index:
-                    glColor4f(*GREEN)
-                else:
-                    glColor4f(*YELLOW)
-                glVertex3f(x, y, 0.02)
-            glEnd()
+        # Línea de orientación objetivo
+        glBegin(GL_LINES)
+        glVertex3f(0, 0, 0.05)
+        glVertex3f(0.3, 0, 0.05)
+        glEnd()
     
     def _draw_robot_body(self):
         """Dibuja el cuerpo del robot"""
         # Base del robot
         glBegin(GL_QUADS)
-        w, l = self.wheel_distance * 0.8, self.wheel_distance * 1.2
+        l, w = self.footprint()
         glVertex3f(-l/2, -w/2, 0)
         glVertex3f(l/2, -w/2, 0)
         glVertex3f(l/2, w/2, 0)
@@ -348,7 +899,8 @@ class DifferentialRobot:
         glEnd()
 
 class Simulator:
-    def __init__(self):
+    def __init__(self, physics_rate=None, profile=False, profile_export=None, scene=None, lidar_beams=None, particles=None,
+                 world=None, mapping=False, record=None, replay=None, record_input=None, imports=()):
         # Inicializar pygame y OpenGL
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), DOUBLEBUF | OPENGL)
@@ -359,18 +911,61 @@ class Simulator:
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         
-        # Configurar vista
-        glMatrixMode(GL_PROJECTION)
-        gluPerspective(45, (SCREEN_WIDTH / SCREEN_HEIGHT), 0.1, 50.0)
-        
-        # Inicializar robot
+        # Inicializar robot y obstáculos de la escena (o un mundo por trozos sin límites)
         self.robot = DifferentialRobot()
+        if world is not None:
+            self.obstacles = world
+            # Los trozos pueden descartarse desde el hilo de física: sus listas se liberan al dibujar
+            self.discarded_chunks = []
+            world.on_discard = self.discarded_chunks.append
+            world.ensure([(self.robot.x, self.robot.y)])
+        else:
+            self.obstacles = ObstacleWorld.load(scene, GRID_SPACING) if scene else None
+        self.robot.obstacles = self.obstacles
+        if lidar_beams or mapping:
+            self.robot.lidar = Lidar(beams=lidar_beams or 360)
+        if mapping:
+            self.robot.mapper = OccupancyMap()
+        # Una textura por baldosa del mapa; sólo se vuelven a subir las que cambian
+        self.map_textures = {}
+        if particles:
+            self.robot.localizer = ParticleFilter(particles, self.obstacles, self.robot.lidar)
+            self.robot.localizer.initialize(self.robot.x, self.robot.y, self.robot.theta)
+        
+        # Grabar la ejecución, o reproducir una grabación en lugar de simular
+        if record:
+            self.robot.recorder = TrajectoryRecorder(record)
+        self.replay = Replay(TrajectoryLog(replay)) if replay else None
+        
+        # Física en un hilo propio a frecuencia fija (None: física al ritmo del dibujo)
+        self.physics = PhysicsThread(self.robot, physics_rate) if physics_rate and not self.replay else None
+        
+        # Métricas de la ejecución para el HUD y el resumen al salir
+        self.robot.analytics = TrajectoryAnalytics()
+        
+        # Grabación de la entrada para re-simular la sesión (eventos.resimulate)
+        self.steps = 0  # pasos de simulación en el bucle de dibujo
+        self.input_recorder = InputRecorder(record_input, self.robot, {"scene": scene}) if record_input else None
+        self.robot_lock = self.physics.lock if self.physics else nullcontext()
+        self.state = self.robot
         
         # Configurar cámara
         self.camera_distance = 10.0
         self.camera_height = 8.0
         self.camera_angle = 0.0
         self.camera_mode = "FIXED"  # "FIXED", "FOLLOW"
+        self.camera_eye = (self.camera_distance, 0.0, self.camera_height)
+        self.camera_target = (0.0, 0.0, 0.0)
+        self.camera_far = None
+        self.set_projection()
+        
+        # Puntos de pantalla de la ruta que se está dibujando con el botón derecho
+        self.drag_points = None
+        
+        # Rutas y objetivos leídos de archivos (o de la entrada estándar) en hilos de fondo
+        self.importer = PathImporter()
+        for source in imports:
+            self.importer.submit(source)
         
         # Reloj para control de tiempo
         self.clock = pygame.time.Clock()
@@ -379,15 +974,38 @@ class Simulator:
         # Fuente para texto
         pygame.font.init()
         self.font = pygame.font.SysFont('Arial', 18)
+        self.text_cache = TextCache(self.font)
         
         # Interfaz
         self.show_help = False
         self.show_info = True
         
+        # Perfilador de fases del cuadro (F3 lo activa y muestra el panel)
+        self.profiler = FrameProfiler(enabled=profile or profile_export is not None)
+        self.show_profiler = profile
+        self.profile_export = profile_export
+        
         # Inicializar Tkinter para diálogos
         self.root = tk.Tk()
         self.root.withdraw()  # Ocultar ventana principal
     
+    def set_projection(self):
+        """Ajusta el plano lejano a la distancia de la cámara para que el zoom no recorte la escena"""
+        far = max(CAMERA_FAR, 4.0 * math.hypot(self.camera_distance, self.camera_height))
+        if far == self.camera_far:
+            return
+        self.camera_far = far
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        gluPerspective(CAMERA_FOV, (SCREEN_WIDTH / SCREEN_HEIGHT), CAMERA_NEAR, far)
+    
+    def zoom_camera(self, factor):
+        """Acerca (factor < 1) o aleja la cámara manteniendo su inclinación"""
+        distance = min(max(self.camera_distance * factor, CAMERA_MIN_DISTANCE), CAMERA_MAX_DISTANCE)
+        self.camera_height *= distance / self.camera_distance
+        self.camera_distance = distance
+        self.set_projection()
+    
     def update_camera(self):
         """Actualiza la posición y orientación de la cámara"""
         glMatrixMode(GL_MODELVIEW)
@@ -395,17 +1013,19 @@ class Simulator:
         
         if self.camera_mode == "FOLLOW":
             # Cámara sigue al robot
-            eye_x = self.robot.x - self.camera_distance * math.cos(self.robot.theta)
-            eye_y = self.robot.y - self.camera_distance * math.sin(self.robot.theta)
+            eye_x = self.state.x - self.camera_distance * math.cos(self.state.theta)
+            eye_y = self.state.y - self.camera_distance * math.sin(self.state.theta)
             eye_z = self.camera_height
             
-            target_x = self.robot.x
-            target_y = self.robot.y
+            target_x = self.state.x
+            target_y = self.state.y
             target_z = 0
             
             up_x, up_y, up_z = 0, 0, 1
             
             gluLookAt(eye_x, eye_y, eye_z, target_x, target_y, target_z, up_x, up_y, up_z)
+            self.camera_eye = (eye_x, eye_y, eye_z)
+            self.camera_target = (target_x, target_y, target_z)
         else:
             # Cámara fija con rotación
             eye_x = self.camera_distance * math.cos(self.camera_angle)
@@ -419,8 +1039,37 @@ class Simulator:
             up_x, up_y, up_z = 0, 0, 1
             
             gluLookAt(eye_x, eye_y, eye_z, target_x, target_y, target_z, up_x, up_y, up_z)
+            self.camera_eye = (eye_x, eye_y, eye_z)
+            self.camera_target = (target_x, target_y, target_z)
+    
+    def grid_level(self):
+        """Nivel de detalle de la cuadrícula: cada nivel duplica la separación entre líneas"""
+        eye = np.array(self.camera_eye)
+        target = np.array(self.camera_target)
+        view_distance = float(np.linalg.norm(eye - target))
+        # Nivel 0 mientras la cuadrícula base cubra con holgura lo que se ve
+        return max(0, math.ceil(math.log2(max(view_distance / (0.75 * GRID_SIZE * GRID_SPACING), 1e-9))))
     
     def draw_grid(self):
+        """Dibuja la cuadrícula con detalle según la distancia de la cámara, y los ejes
+        
+        Siempre se usa la misma display list de 2·GRID_SIZE+1 líneas por eje:
+        se escala a la separación del nivel actual y se centra en el punto
+        al que mira la cámara (ajustado a la separación, para que las líneas
+        no se muevan al desplazarse), así que el coste de dibujo no depende
+        del tamaño del mundo.
+        """
+        scale = 2 ** self.grid_level()
+        spacing = GRID_SPACING * scale
+        glPushMatrix()
+        glTranslatef(round(self.camera_target[0] / spacing) * spacing,
+                     round(self.camera_target[1] / spacing) * spacing, 0)
+        glScalef(scale, scale, 1)
+        MESHES.call(("grid", GRID_SIZE, GRID_SPACING), self._draw_grid_geometry)
+        glPopMatrix()
+        MESHES.call(("axes", GRID_SIZE, GRID_SPACING), self._draw_axes_geometry)
+    
+    def _draw_grid_geometry(self):
         """Dibuja una cuadrícula en el plano XY"""
         glBegin(GL_LINES)
         glColor4f(0.5, 0.5, 0.5, 0.5)
@@ -436,8 +1085,9 @@ class Simulator:
             glVertex3f(i * GRID_SPACING, GRID_SIZE * GRID_SPACING, 0)
         
         glEnd()
-        
-        # Ejes principales
+    
+    def _draw_axes_geometry(self):
+        """Dibuja los ejes principales en el origen"""
         glBegin(GL_LINES)
         # Eje X (rojo)
         glColor4f(1.0, 0.0, 0.0, 1.0)
@@ -455,17 +1105,104 @@ class Simulator:
         glVertex3f(0, 0, 1)
         glEnd()
     
-    def render_text(self, text, position, color=(255, 255, 255)):
-        """Renderiza texto en la pantalla"""
-        text_surface = self.font.render(text, True, color)
-        self.screen.blit(text_surface, position)
+    def draw_obstacles(self):
+        """Dibuja los obstáculos de la escena (display list recompilada sólo si cambian)"""
+        if isinstance(self.obstacles, ChunkedWorld):
+            # Una lista por trozo: cargar o descartar un trozo no recompila los demás
+            with self.robot_lock:
+                chunks = list(self.obstacles.chunks())
+                discarded, self.discarded_chunks[:] = list(self.discarded_chunks), []
+            for key in discarded:
+                MESHES.discard(("chunk", id(self.obstacles), key))
+            for key, obstacles in chunks:
+                if obstacles:
+                    MESHES.call(("chunk", id(self.obstacles), key),
+                                lambda obstacles=obstacles: self._draw_obstacle_geometry(obstacles))
+            return
+        if not self.obstacles:
+            return
+        MESHES.call(("obstacles", id(self.obstacles), self.obstacles.version),
+                    lambda: self._draw_obstacle_geometry(self.obstacles))
     
-    def draw_info(self):
-        """Dibuja información del robot y controles en la pantalla"""
-        if not self.show_info:
+    def draw_map(self):
+        """Dibuja el mapa de ocupación como texturas semitransparentes sobre el suelo"""
+        mapper = self.robot.mapper
+        if mapper is None:
             return
+        with self.robot_lock:
+            images = {key: mapper.tile_rgba(key) for key in mapper.take_dirty()}
+        for key, image in images.items():
+            texture = self.map_textures.get(key)
+            size = mapper.tile_size
+            if texture is None:
+                texture = self.map_textures[key] = glGenTextures(1)
+                glBindTexture(GL_TEXTURE_2D, texture)
+                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, size, size, 0, GL_RGBA, GL_UNSIGNED_BYTE, image)
+            else:
+                glBindTexture(GL_TEXTURE_2D, texture)
+                glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, size, size, GL_RGBA, GL_UNSIGNED_BYTE, image)
+        
+        extent = mapper.tile_size * mapper.resolution
+        glEnable(GL_TEXTURE_2D)
+        glDepthMask(GL_FALSE)
+        glColor4f(1.0, 1.0, 1.0, 1.0)
+        for key, texture in self.map_textures.items():
+            x0, y0 = mapper.tile_origin(key)
+            glBindTexture(GL_TEXTURE_2D, texture)
+            glBegin(GL_QUADS)
+            for u, v in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                glTexCoord2f(u, v)
+                glVertex3f(x0 + u * extent, y0 + v * extent, 0.005)
+            glEnd()
+        glDepthMask(GL_TRUE)
+        glDisable(GL_TEXTURE_2D)
+    
+    def load_chunks(self):
+        """Carga los trozos del mundo alrededor del robot y, si la cámara lo sigue, del punto al que mira"""
+        if isinstance(self.obstacles, ChunkedWorld):
+            points = [(self.state.x, self.state.y)]
+            if self.camera_mode == "FOLLOW":
+                points.append(self.camera_target[:2])
+            with self.robot_lock:
+                self.obstacles.ensure(points)
+    
+    def _draw_obstacle_geometry(self, obstacles):
+        """Dibuja cada obstáculo como un prisma extruido desde el suelo"""
+        for obstacle in obstacles:
+            outline = obstacle.outline()
+            height = obstacle.height
             
-        # Guardar estado OpenGL
+            # Paredes laterales
+            glColor4f(0.6, 0.35, 0.2, 1.0)
+            glBegin(GL_QUAD_STRIP)
+            for x, y in np.vstack((outline, outline[:1])):
+                glVertex3f(x, y, 0)
+                glVertex3f(x, y, height)
+            glEnd()
+            
+            # Tapa superior (triangulada para admitir polígonos no convexos)
+            glColor4f(0.75, 0.5, 0.3, 1.0)
+            glBegin(GL_TRIANGLES)
+            for triangle in triangulate(outline):
+                for x, y in outline[triangle]:
+                    glVertex3f(x, y, height)
+            glEnd()
+    
+    def render_text(self, text, position, color=(255, 255, 255)):
+        """Renderiza texto en la pantalla (debe llamarse entre _begin_hud y _end_hud)"""
+        return self.text_cache.draw(text, position[0], position[1], color)
+    
+    def render_field(self, label, value, position, color=(255, 255, 255)):
+        """Renderiza 'etiqueta valor': la etiqueta fija y el valor se cachean por separado"""
+        width = self.render_text(label, position, color)
+        self.render_text(value, (position[0] + width, position[1]), color)
+    
+    def _begin_hud(self):
+        """Configura una proyección ortográfica en píxeles para dibujar el HUD"""
         glMatrixMode(GL_PROJECTION)
         glPushMatrix()
         glLoadIdentity()
@@ -476,41 +1213,126 @@ class Simulator:
         glLoadIdentity()
         
         glDisable(GL_DEPTH_TEST)
-        
-        # Dibujar fondo semitransparente para el panel de información
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glColor4f(0.0, 0.0, 0.0, 0.7)
-        
-        glBegin(GL_QUADS)
-        glVertex2f(10, 10)
-        glVertex2f(350, 10)
-        glVertex2f(350, 180)
-        glVertex2f(10, 180)
-        glEnd()
-        
-        # Restaurar estado OpenGL para renderizar texto
+    
+    def _end_hud(self):
+        """Restaura el estado OpenGL de la escena 3D"""
         glMatrixMode(GL_PROJECTION)
         glPopMatrix()
         glMatrixMode(GL_MODELVIEW)
         glPopMatrix()
         
         glEnable(GL_DEPTH_TEST)
-        
-        # Renderizar información del robot
-        info_lines = [
-            f"Posición: ({self.robot.x:.2f}, {self.robot.y:.2f})",
-            f"Orientación: {math.degrees(self.robot.theta):.1f}°",
-            f"Velocidad lineal: {self.robot.linear_velocity:.2f} m/s",
-            f"Velocidad angular: {math.degrees(self.robot.angular_velocity):.2f} °/s",
-            f"Voltaje izquierdo: {self.robot.left_voltage:.2f} V",
-            f"Voltaje derecho: {self.robot.right_voltage:.2f} V",
-            f"Modo de control: {self.robot.control_mode}",
-            f"Cámara: {self.camera_mode}"
+    
+    def _draw_panel(self, left, top, right, bottom):
+        """Dibuja un fondo semitransparente para un panel del HUD"""
+        glColor4f(0.0, 0.0, 0.0, 0.7)
+        glBegin(GL_QUADS)
+        glVertex2f(left, top)
+        glVertex2f(right, top)
+        glVertex2f(right, bottom)
+        glVertex2f(left, bottom)
+        glEnd()
+    
+    def info_fields(self):
+        """Devuelve los campos (etiqueta, valor) del panel de información"""
+        return [
+            ("Posición: ", f"({self.state.x:.2f}, {self.state.y:.2f})"),
+            ("Orientación: ", f"{math.degrees(self.state.theta):.1f}°"),
+            ("Velocidad lineal: ", f"{self.state.linear_velocity:.2f} m/s"),
+            ("Velocidad angular: ", f"{math.degrees(self.state.angular_velocity):.2f} °/s"),
+            ("Voltaje izquierdo: ", f"{self.state.left_voltage:.2f} V"),
+            ("Voltaje derecho: ", f"{self.state.right_voltage:.2f} V"),
+            ("Modo de control: ", self.state.control_mode),
+            ("Cámara: ", self.camera_mode)
+        ] + self.obstacle_fields() + self.localization_fields() + self.mapping_fields() + self.analytics_fields() + self.replay_fields() + self.import_fields() + self.physics_fields()
+    
+    def obstacle_fields(self):
+        """Campos del HUD sobre los obstáculos (vacío si la escena no tiene)"""
+        if not self.obstacles:
+            return []
+        return [
+            ("Obstáculos: ", f"{len(self.obstacles)}"),
+            ("Colisiones: ", f"{self.robot.collisions}")
+        ]
+    
+    def mapping_fields(self):
+        """Campos del HUD del mapa de ocupación (vacío si no se está mapeando)"""
+        mapper = self.robot.mapper
+        if mapper is None:
+            return []
+        return [
+            ("Mapa: ", f"{len(mapper)} baldosas ({mapper.memory_bytes() / 1e6:.1f} MB)")
         ]
+    
+    def localization_fields(self):
+        """Campos del HUD del estimador de pose (vacío sin filtro de partículas)"""
+        estimate = self.state.estimated_pose
+        if estimate is None:
+            return []
+        ex, ey, _ = estimate
+        error = math.hypot(ex - self.state.x, ey - self.state.y)
+        return [
+            ("Pose estimada: ", f"({ex:.2f}, {ey:.2f})"),
+            ("Error de estimación: ", f"{error:.3f} m")
+        ]
+    
+    def analytics_fields(self):
+        """Campos del HUD con las métricas de la ejecución (vacío en reproducción)"""
+        analytics = self.robot.analytics
+        if analytics is None or self.replay is not None:
+            return []
+        fields = [
+            ("Recorrido: ", f"{analytics.path_length:.2f} m"),
+            ("Energía: ", f"{analytics.energy:.0f} V²·s")
+        ]
+        if analytics.tracking_error.count:
+            fields.append(("Error de seguimiento: ", f"{analytics.tracking_error.mean:.3f} m "
+                                                     f"(máx {analytics.tracking_error.max:.3f})"))
+        if analytics.time_to_target.count:
+            fields.append(("Objetivos alcanzados: ", f"{analytics.time_to_target.count} "
+                                                    f"({analytics.time_to_target.mean:.1f} s de media)"))
+        return fields
+    
+    def replay_fields(self):
+        """Campos del HUD de la reproducción (vacío si se está simulando)"""
+        if self.replay is None:
+            return []
+        state = "en pausa" if self.replay.paused else f"x{self.replay.speed:g}"
+        return [
+            ("Reproducción: ", f"{self.replay.time:.1f} / {self.replay.log.end_time:.1f} s ({state})")
+        ]
+    
+    def import_fields(self):
+        """Campos del HUD de las importaciones en curso (vacío si no hay ninguna)"""
+        if not self.importer.pending:
+            return []
+        return [
+            ("Importando: ", f"{self.importer.pending} archivo(s)")
+        ]
+    
+    def physics_fields(self):
+        """Campos del HUD sobre el hilo de física (vacío si la física corre en el bucle de dibujo)"""
+        if not self.physics:
+            return []
+        return [
+            ("Física: ", f"{self.physics.rate_hz:.0f} Hz"),
+            ("Pasos descartados: ", f"{self.physics.dropped_steps}")
+        ]
+    
+    def draw_info(self):
+        """Dibuja información del robot y controles en la pantalla"""
+        if not self.show_info:
+            return
         
-        for i, line in enumerate(info_lines):
-            self.render_text(line, (20, 20 + i * 20))
+        self._begin_hud()
+        
+        # Panel de información del robot
+        info_fields = self.info_fields()
+        self._draw_panel(10, 10, 350, 20 + len(info_fields) * 20)
+        for i, (label, value) in enumerate(info_fields):
+            self.render_field(label, value, (20, 20 + i * 20))
         
         # Mostrar ayuda
         if self.show_help:
@@ -519,45 +1341,37 @@ class Simulator:
                 "W/S: Aumentar/disminuir voltaje de ambos motores",
                 "A/D: Girar izquierda/derecha",
                 "Q/E: Rotar cámara",
+                "Rueda del ratón: Acercar/alejar cámara",
                 "R: Reiniciar posición del robot",
                 "C: Cambiar modo de cámara",
                 "P: Establecer posición objetivo (X,Y,Theta)",
                 "L: Programar ruta",
+                "O / soltar archivo: Importar ruta u objetivo",
+                "Clic derecho + arrastrar: Dibujar ruta",
                 "H: Mostrar/ocultar ayuda",
                 "I: Mostrar/ocultar información",
+                "F3: Mostrar/ocultar perfilador",
                 "ESC: Salir"
             ]
             
-            # Dibujar fondo para ayuda
-            glMatrixMode(GL_PROJECTION)
-            glPushMatrix()
-            glLoadIdentity()
-            glOrtho(0, SCREEN_WIDTH, SCREEN_HEIGHT, 0, -1, 1)
-            
-            glMatrixMode(GL_MODELVIEW)
-            glPushMatrix()
-            glLoadIdentity()
-            
-            glDisable(GL_DEPTH_TEST)
-            glEnable(GL_BLEND)
-            
-            glColor4f(0.0, 0.0, 0.0, 0.7)
-            glBegin(GL_QUADS)
-            glVertex2f(SCREEN_WIDTH - 360, 10)
-            glVertex2f(SCREEN_WIDTH - 10, 10)
-            glVertex2f(SCREEN_WIDTH - 10, 10 + len(help_lines) * 20 + 10)
-            glVertex2f(SCREEN_WIDTH - 360, 10 + len(help_lines) * 20 + 10)
-            glEnd()
-            
-            glMatrixMode(GL_PROJECTION)
-            glPopMatrix()
-            glMatrixMode(GL_MODELVIEW)
-            glPopMatrix()
-            
-            glEnable(GL_DEPTH_TEST)
-            
+            self._draw_panel(SCREEN_WIDTH - 360, 10, SCREEN_WIDTH - 10, 10 + len(help_lines) * 20 + 10)
             for i, line in enumerate(help_lines):
                 self.render_text(line, (SCREEN_WIDTH - 350, 20 + i * 20))
+        
+        self._end_hud()
+    
+    def draw_profiler(self):
+        """Dibuja el panel con los percentiles de tiempo de cada fase del cuadro"""
+        if not self.show_profiler:
+            return
+        
+        lines = self.profiler.overlay_lines()
+        top = SCREEN_HEIGHT - 20 - len(lines) * 20
+        self._begin_hud()
+        self._draw_panel(10, top - 10, 380, SCREEN_HEIGHT - 10)
+        for i, line in enumerate(lines):
+            self.render_text(line, (20, top + i * 20))
+        self._end_hud()
     
     def handle_input(self):
         """Maneja la entrada del usuario"""
@@ -575,12 +1389,13 @@ class Simulator:
                 if event.key == pygame.K_i:
                     self.show_info = not self.show_info
                 
+                if event.key == pygame.K_F3:
+                    self.show_profiler = not self.show_profiler
+                    self.profiler.enabled = self.show_profiler or self.profile_export is not None
+                
                 if event.key == pygame.K_r:
                     # Reiniciar posición del robot
-                    self.robot.x = 0.0
-                    self.robot.y = 0.0
-                    self.robot.theta = 0.0
-                    self.robot.trail = []
+                    self.command("reset")
                 
                 if event.key == pygame.K_c:
                     # Cambiar modo de cámara
@@ -596,47 +1411,50 @@ class Simulator:
                 if event.key == pygame.K_l:
                     # Programar ruta
                     self.program_path()
+                
+                if event.key == pygame.K_o:
+                    # Importar ruta u objetivo desde un archivo
+                    self.open_path_file()
+                
+                if self.replay is not None:
+                    self.replay_key(event.key)
             
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Botón izquierdo
                     # Convertir coordenadas de pantalla a coordenadas del mundo
                     world_pos = self.screen_to_world(event.pos)
                     if world_pos:
-                        self.robot.set_target_position(world_pos[0], world_pos[1])
+                        self.command("target", (world_pos[0], world_pos[1], None))
+                
+                if event.button == 3:  # Botón derecho: empezar a dibujar una ruta
+                    self.drag_points = [event.pos]
+            
+            if event.type == pygame.DROPFILE:
+                # Archivo soltado sobre la ventana
+                self.importer.submit(event.file)
+            
+            if event.type == pygame.MOUSEWHEEL:
+                self.zoom_camera(0.9 ** event.y)
+            
+            if event.type == pygame.MOUSEMOTION and self.drag_points is not None:
+                self.drag_points.append(event.pos)
+            
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 3 and self.drag_points is not None:
+                self.drag_points.append(event.pos)
+                self.finish_drag_path()
+        
+        # Importaciones terminadas: se aplican como cualquier otra orden
+        self.apply_imports()
         
         # Controles continuos
         keys = pygame.key.get_pressed()
         
-        # Solo procesar controles manuales si no estamos en modo automático
-        if self.robot.control_mode == "MANUAL":
-            # Control de motores
-            if keys[pygame.K_w]:
-                self.robot.left_voltage += 0.1
-                self.robot.right_voltage += 0.1
-            if keys[pygame.K_s]:
-                self.robot.left_voltage -= 0.1
-                self.robot.right_voltage -= 0.1
-            if keys[pygame.K_a]:
-                self.robot.left_voltage -= 0.1
-                self.robot.right_voltage += 0.1
-            if keys[pygame.K_d]:
-                self.robot.left_voltage += 0.1
-                self.robot.right_voltage -= 0.1
-            
-            # Limitar voltajes
-            self.robot.left_voltage = max(min(self.robot.left_voltage, self.robot.max_voltage), -self.robot.max_voltage)
-            self.robot.right_voltage = max(min(self.robot.right_voltage, self.robot.max_voltage), -self.robot.max_voltage)
-            
-            # Reducir voltajes gradualmente si no se presionan teclas
-            if not (keys[pygame.K_w] or keys[pygame.K_s] or keys[pygame.K_a] or keys[pygame.K_d]):
-                self.robot.left_voltage *= 0.95
-                self.robot.right_voltage *= 0.95
-                
-                # Si los voltajes son muy pequeños, establecerlos a cero
-                if abs(self.robot.left_voltage) < 0.1:
-                    self.robot.left_voltage = 0.0
-                if abs(self.robot.right_voltage) < 0.1:
-                    self.robot.right_voltage = 0.0
+        # Control manual (sólo actúa en modo MANUAL); se graba en cada lectura para poder re-simular
+        mask = self.manual_mask(keys)
+        with self.robot_lock:
+            if self.input_recorder is not None:
+                self.input_recorder.tick(self.physics.steps if self.physics else self.steps, mask)
+            apply_manual_control(self.robot, mask)
         
         # Control de cámara
         if keys[pygame.K_q]:
@@ -646,26 +1464,96 @@ class Simulator:
         
         return True
     
+    def manual_mask(self, keys):
+        """Máscara de las teclas de control manual pulsadas (W, S, A, D)"""
+        mask = 0
+        if keys[pygame.K_w]:
+            mask |= KEY_FORWARD
+        if keys[pygame.K_s]:
+            mask |= KEY_BACKWARD
+        if keys[pygame.K_a]:
+            mask |= KEY_LEFT
+        if keys[pygame.K_d]:
+            mask |= KEY_RIGHT
+        return mask
+    
+    def command(self, kind, data=None):
+        """Aplica una orden del usuario al robot, grabándola si se está grabando la entrada
+        
+        Bloquea el robot sólo durante la orden: los diálogos que la preceden
+        no deben detener el hilo de física.
+        """
+        with self.robot_lock:
+            if self.input_recorder is not None:
+                # El paso se lee con el robot bloqueado: es el paso anterior al que se aplica la orden
+                self.input_recorder.command(kind, data, self.physics.steps if self.physics else self.steps)
+            apply_command(self.robot, kind, data)
+    
+    def apply_imports(self):
+        """Aplica las rutas y objetivos que los hilos de importación ya han terminado de leer"""
+        for source, kind, data in self.importer.poll():
+            if kind == "error":
+                print(data)
+                continue
+            self.command(kind, data)
+            if kind == "path":
+                print(f"Ruta importada de {source}: {len(data)} puntos")
+            else:
+                print(f"Objetivo importado de {source}: ({data[0]:.2f}, {data[1]:.2f})")
+    
+    def open_path_file(self):
+        """Elige un archivo CSV, JSON o NPY con un diálogo; se lee en segundo plano"""
+        source = filedialog.askopenfilename(
+            parent=self.root, title="Importar ruta u objetivo",
+            filetypes=[("Rutas", "*.csv *.json *.npy *.txt"), ("Todos los archivos", "*")])
+        if source:
+            self.importer.submit(source)
+    
+    def replay_key(self, key):
+        """Controles de la reproducción: pausa, saltos de 5 s y velocidad"""
+        if key == pygame.K_SPACE:
+            self.replay.paused = not self.replay.paused
+        elif key == pygame.K_RIGHT:
+            self.replay.seek(self.replay.time + 5.0)
+        elif key == pygame.K_LEFT:
+            self.replay.seek(self.replay.time - 5.0)
+        elif key == pygame.K_UP:
+            self.replay.speed *= 2.0
+        elif key == pygame.K_DOWN:
+            self.replay.speed /= 2.0
+    
     def screen_to_world(self, screen_pos):
-        """Convierte coordenadas de pantalla a coordenadas del mundo"""
-        x, y = screen_pos
-        
-        # Obtener matrices de proyección y modelview
-        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-        projection = glGetDoublev(GL_PROJECTION_MATRIX)
-        viewport = glGetIntegerv(GL_VIEWPORT)
-        
-        # Obtener profundidad en el punto
-        winZ = glReadPixels(x, viewport[3] - y, 1, 1, GL_DEPTH_COMPONENT, GL_FLOAT)
-        
-        # Si el punto está demasiado lejos, no es válido
-        if winZ[0][0] >= 1.0:
+        """Convierte coordenadas de pantalla a coordenadas del mundo sobre el plano z=0"""
+        world = self.screen_to_world_many([screen_pos])[0]
+        if np.isnan(world[0]):
             return None
+        return tuple(float(v) for v in world)
+    
+    def screen_to_world_many(self, screen_points):
+        """Convierte muchos puntos de pantalla a la vez; los que no tocan el suelo quedan en NaN"""
+        return pick_ground_plane(screen_points, self.camera_eye, self.camera_target,
+                                 CAMERA_FOV, SCREEN_WIDTH, SCREEN_HEIGHT)
+    
+    def finish_drag_path(self):
+        """Convierte los puntos arrastrados con el ratón en una ruta para el robot"""
+        points = self.screen_to_world_many(self.drag_points)
+        self.drag_points = None
+        points = points[~np.isnan(points[:, 0]), :2]
+        
+        # Descartar puntos demasiado cercanos entre sí (o al robot)
+        start = np.array([self.state.x, self.state.y])
+        path_points = [start]
+        for point in points:
+            if np.hypot(*(point - path_points[-1])) >= 0.25:
+                path_points.append(point)
+        path_points = np.array(path_points[1:])
+        if len(path_points) == 0:
+            return
         
-        # Desproyectar para obtener coordenadas del mundo
-        world_pos = gluUnProject(x, viewport[3] - y, winZ[0][0], modelview, projection, viewport)
-        
-        return world_pos
+        # Orientación de cada punto: dirección del tramo que llega a él
+        deltas = np.diff(np.vstack((start, path_points)), axis=0)
+        thetas = np.arctan2(deltas[:, 1], deltas[:, 0])
+        self.command("path", [(float(x), float(y), float(t)) for (x, y), t in zip(path_points, thetas)])
     
     def set_target_position(self):
         """Abre un diálogo para establecer una posición objetivo"""
@@ -686,7 +1574,7 @@ class Simulator:
             theta_rad = math.radians(theta)
             
             # Establecer posición objetivo
-            self.robot.set_target_position(x, y, theta_rad)
+            self.command("target", (x, y, theta_rad))
             
         except Exception as e:
             print(f"Error al establecer posición: {e}")
@@ -695,7 +1583,7 @@ class Simulator:
         """Abre un diálogo para programar una ruta"""
         try:
             # Preguntar cuántos puntos tendrá la ruta
-            num_points = simpledialog.askinteger("Puntos de ruta", "¿Cuántos puntos tendrá la ruta?", parent=self.root, minvalue=1, maxvalue=10)
+            num_points = simpledialog.askinteger("Puntos de ruta", "¿Cuántos puntos tendrá la ruta?", parent=self.root, minvalue=1)
             if num_points is None:
                 return
             
@@ -721,7 +1609,7 @@ class Simulator:
                 path.append((x, y, theta_rad))
             
             # Establecer ruta
-            self.robot.set_path(path)
+            self.command("path", path)
             
         except Exception as e:
             print(f"Error al programar ruta: {e}")
@@ -730,42 +1618,123 @@ class Simulator:
         """Bucle principal del simulador"""
         running = True
         
+        if self.physics:
+            self.physics.start()
+            self.state = self.physics.snapshot()
+        
+        profiler = self.profiler
         while running:
-            # Manejar entrada
-            running = self.handle_input()
+            # Manejar entrada (sólo las órdenes al robot lo bloquean, nunca los diálogos)
+            with profiler.section("handle_input"):
+                running = self.handle_input()
             
             # Calcular delta de tiempo
             current_time = pygame.time.get_ticks() / 1000.0
             dt = current_time - self.last_time
             self.last_time = current_time
             
-            # Actualizar robot
-            self.robot.update(dt)
+            # Actualizar robot, o leer la última instantánea publicada por el hilo de física
+            with profiler.section("robot.update"):
+                if self.replay:
+                    self.replay.advance(dt)
+                    self.replay.apply(self.robot)
+                elif self.physics:
+                    self.physics.snapshot(self.state)
+                else:
+                    self.robot.update(dt)
+                    self.steps += 1
+                    if self.input_recorder is not None:
+                        self.input_recorder.step(dt)
             
             # Limpiar pantalla
             glClearColor(0.9, 0.9, 0.9, 1.0)
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
             
             # Actualizar cámara
-            self.update_camera()
+            with profiler.section("update_camera"):
+                self.update_camera()
+                self.load_chunks()
             
             # Dibujar escena
-            self.draw_grid()
-            self.robot.draw()
+            with profiler.section("draw_grid"):
+                self.draw_grid()
+            with profiler.section("draw_obstacles"):
+                self.draw_obstacles()
+            with profiler.section("draw_map"):
+                self.draw_map()
+            with profiler.section("robot.draw"):
+                self.robot.draw(self.state)
             
             # Dibujar información
-            self.draw_info()
+            with profiler.section("draw_info"):
+                self.draw_info()
+                self.draw_profiler()
             
             # Actualizar pantalla
-            pygame.display.flip()
+            with profiler.section("display.flip"):
+                pygame.display.flip()
+            profiler.end_frame()
             
             # Controlar FPS
             self.clock.tick(60)
         
         # Limpiar
+        if self.physics:
+            self.physics.stop()
+        if self.replay is None:
+            print("\n".join(self.robot.analytics.report()))
+        if self.input_recorder is not None:
+            steps = self.physics.steps if self.physics else self.steps
+            self.input_recorder.save(self.robot, steps, self.physics.dt if self.physics else None)
+            print(f"Entrada grabada en {self.input_recorder.path} ({steps} pasos)")
+        if self.robot.recorder is not None:
+            self.robot.recorder.close()
+            print(f"Grabación guardada en {self.robot.recorder.path} ({self.robot.recorder.count} registros)")
+        if self.profile_export:
+            self.profiler.export(self.profile_export)
+            print(f"Perfil guardado en {self.profile_export}")
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    simulator = Simulator()
+    parser = argparse.ArgumentParser(description="Simulador 3D de Robot Diferencial")
+    parser.add_argument("--physics-rate", type=float, default=None,
+                        help="Ejecutar física y control en un hilo propio a esta frecuencia (Hz), p. ej. 1000")
+    parser.add_argument("--profile", action="store_true",
+                        help="Activar el perfilador de fases y mostrar su panel (F3)")
+    parser.add_argument("--profile-export", default=None,
+                        help="Exportar los percentiles de cada fase al salir (.csv o .json)")
+    parser.add_argument("--scene", default=None,
+                        help="Archivo JSON de escena con obstáculos (círculos, cajas y polígonos)")
+    parser.add_argument("--lidar", type=int, default=None, metavar="HACES",
+                        help="Montar un lidar 2D con este número de haces y dibujar sus rayos")
+    parser.add_argument("--particles", type=int, default=None, metavar="N",
+                        help="Estimar la pose con un filtro de N partículas (odometría + lidar)")
+    parser.add_argument("--world", default=None, metavar="DIRECTORIO",
+                        help="Mundo sin límites: cargar trozos chunk_<cx>_<cy>.json de este directorio bajo demanda")
+    parser.add_argument("--world-seed", type=int, default=None, metavar="SEMILLA",
+                        help="Mundo sin límites con obstáculos procedurales generados a partir de esta semilla")
+    parser.add_argument("--map", action="store_true",
+                        help="Construir un mapa de ocupación con el lidar y dibujarlo sobre el suelo")
+    parser.add_argument("--record", default=None, metavar="DIRECTORIO",
+                        help="Grabar cada estado del robot en este directorio (columnas binarias)")
+    parser.add_argument("--replay", default=None, metavar="DIRECTORIO",
+                        help="Reproducir una grabación (Espacio: pausa, ←/→: saltar 5 s, ↑/↓: velocidad)")
+    parser.add_argument("--record-input", default=None, metavar="ARCHIVO",
+                        help="Grabar la entrada de la sesión (.npz) para re-simularla con eventos.py")
+    parser.add_argument("--import", dest="imports", action="append", default=[], metavar="ARCHIVO",
+                        help="Ruta u objetivo en CSV, JSON o NPY (\"-\": entrada estándar); se lee en segundo plano")
+    args = parser.parse_args()
+    
+    world = None
+    if args.world:
+        world = ChunkedWorld(directory_loader(args.world), cell_size=GRID_SPACING)
+    elif args.world_seed is not None:
+        world = ChunkedWorld(procedural_loader(args.world_seed), cell_size=GRID_SPACING)
+    
+    simulator = Simulator(physics_rate=args.physics_rate, profile=args.profile,
+                          profile_export=args.profile_export, scene=args.scene,
+                          lidar_beams=args.lidar, particles=args.particles, world=world,
+                          mapping=args.map, record=args.record, replay=args.replay,
+                          record_input=args.record_input, imports=args.imports)
     simulator.run()
@@ -0,0 +1,263 @@
+import math
+import numpy as np
+
+
+class ArrayPath:
+    """Ruta compacta de n puntos (x, y, theta) guardada en arreglos de NumPy.
+
+    Precalcula la longitud de arco acumulada y un índice espacial de tramos,
+    de modo que las consultas de punto más cercano y de punto adelantado
+    (lookahead) no recorren la ruta completa. Se comporta como una secuencia
+    de tuplas (x, y, theta), así que puede usarse donde se usaba la lista.
+    """
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] not in (2, 3) or len(points) == 0:
+            raise ValueError("La ruta debe ser un arreglo (n, 2) o (n, 3) con al menos un punto")
+        if points.shape[1] == 2:
+            # Sin orientación: usar la dirección de cada tramo
+            points = np.column_stack((points, self._segment_headings(points)))
+        self.points = np.ascontiguousarray(points)
+        self.xy = np.ascontiguousarray(self.points[:, :2])
+
+        deltas = np.diff(self.xy, axis=0)
+        self.segment_lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        self.cumulative_length = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self.total_length = float(self.cumulative_length[-1])
+        self._build_segment_index()
+
+        # Perfil de velocidad opcional (m/s por punto), ver speed_profile()
+        self.speeds = None
+
+    @staticmethod
+    def _segment_headings(xy):
+        deltas = np.diff(xy, axis=0)
+        headings = np.arctan2(deltas[:, 1], deltas[:, 0])
+        if len(headings) == 0:
+            return np.zeros(len(xy))
+        return np.concatenate((headings[:1], headings))
+
+    # Interfaz de secuencia
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        x, y, theta = self.points[index]
+        return (float(x), float(y), float(theta))
+
+    def __iter__(self):
+        return iter(map(tuple, self.points.tolist()))
+
+    def __array__(self, dtype=None, copy=None):
+        return self.points if dtype is None else self.points.astype(dtype)
+
+    def _build_segment_index(self):
+        """Índice de tramos por celdas: cada tramo se asigna a la celda de su punto medio"""
+        segments = len(self.segment_lengths)
+        if segments == 0:
+            self._cell_size = 1.0
+            self._cell_keys = np.zeros(0, dtype=np.int64)
+            self._cell_order = np.zeros(0, dtype=np.int64)
+            self._cell_bounds = (0, 0, 0, 0)
+            return
+
+        # Celdas al menos tan grandes como el tramo más largo: un tramo sólo toca su celda y las vecinas
+        extent = np.ptp(self.xy, axis=0).max()
+        self._cell_size = max(float(self.segment_lengths.max()), extent / math.sqrt(segments), 1e-6)
+        midpoints = (self.xy[:-1] + self.xy[1:]) / 2
+        cells = np.floor(midpoints / self._cell_size).astype(np.int64)
+        self._cell_bounds = (int(cells[:, 0].min()), int(cells[:, 1].min()),
+                             int(cells[:, 0].max()), int(cells[:, 1].max()))
+        keys = self._cell_key(cells[:, 0], cells[:, 1])
+        self._cell_order = np.argsort(keys, kind="stable")
+        self._cell_keys = keys[self._cell_order]
+
+    @staticmethod
+    def _cell_key(cx, cy):
+        return (cx.astype(np.int64) << 32) ^ (cy.astype(np.int64) & 0xFFFFFFFF)
+
+    def _project(self, x, y, first, last):
+        """Proyecta (x, y) sobre los tramos first..last-1 y devuelve el más cercano"""
+        segments = np.arange(first, last)
+        return self._project_segments(x, y, segments)
+
+    def _project_segments(self, x, y, segments):
+        a = self.xy[segments]
+        b = self.xy[segments + 1]
+        ab = b - a
+        length_sq = np.einsum("ij,ij->i", ab, ab)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = ((x - a[:, 0]) * ab[:, 0] + (y - a[:, 1]) * ab[:, 1]) / length_sq
+        t = np.clip(np.nan_to_num(t), 0.0, 1.0)
+        px = a[:, 0] + t * ab[:, 0]
+        py = a[:, 1] + t * ab[:, 1]
+        distance_sq = (px - x) ** 2 + (py - y) ** 2
+        best = int(np.argmin(distance_sq))
+        segment = int(segments[best])
+        s = self.cumulative_length[segment] + t[best] * self.segment_lengths[segment]
+        return float(s), segment, math.sqrt(distance_sq[best])
+
+    def nearest(self, x, y, hint=None, window=2.0):
+        """Punto de la ruta más cercano a (x, y)
+
+        Devuelve (s, tramo, distancia), donde s es la longitud de arco del punto.
+        Con hint (longitud de arco aproximada, p. ej. el progreso anterior) sólo
+        se examinan los tramos dentro de [hint - window, hint + window], que se
+        localizan por búsqueda binaria. Sin hint se usa el índice de celdas.
+        """
+        if len(self.segment_lengths) == 0:
+            return 0.0, 0, math.hypot(self.xy[0, 0] - x, self.xy[0, 1] - y)
+
+        if hint is not None:
+            first = self.segment_at(hint - window)
+            last = self.segment_at(hint + window) + 1
+            return self._project(x, y, first, last)
+
+        # Búsqueda por anillos de celdas alrededor del punto (los anillos fuera del índice están vacíos)
+        cx = math.floor(x / self._cell_size)
+        cy = math.floor(y / self._cell_size)
+        min_cx, min_cy, max_cx, max_cy = self._cell_bounds
+        ring = max(0, min_cx - cx, cx - max_cx, min_cy - cy, cy - max_cy)
+        max_ring = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy)
+        best = None
+        while ring <= max_ring:
+            ring_x, ring_y = self._ring_cells(cx, cy, ring)
+            keys = self._cell_key(ring_x, ring_y)
+            starts = np.searchsorted(self._cell_keys, keys, side="left")
+            ends = np.searchsorted(self._cell_keys, keys, side="right")
+            if (ends > starts).any():
+                segments = np.concatenate([self._cell_order[s:e] for s, e in zip(starts, ends) if e > s])
+                candidate = self._project_segments(x, y, segments)
+                if best is None or candidate[2] < best[2]:
+                    best = candidate
+            # Los tramos de anillos posteriores están al menos a (ring - 1/2) celdas del punto
+            if best is not None and best[2] <= (ring - 0.5) * self._cell_size:
+                break
+            ring += 1
+        return best
+
+    @staticmethod
+    def _ring_cells(cx, cy, ring):
+        if ring == 0:
+            return np.array([cx]), np.array([cy])
+        side = np.arange(-ring, ring + 1)
+        xs = np.concatenate((side, side, np.full(2 * ring - 1, -ring), np.full(2 * ring - 1, ring)))
+        ys = np.concatenate((np.full(2 * ring + 1, -ring), np.full(2 * ring + 1, ring),
+                             side[1:-1], side[1:-1]))
+        return xs + cx, ys + cy
+
+    def segment_at(self, s):
+        """Índice del tramo que contiene la longitud de arco s (búsqueda binaria)"""
+        segment = int(np.searchsorted(self.cumulative_length, s, side="right")) - 1
+        return min(max(segment, 0), max(len(self.segment_lengths) - 1, 0))
+
+    def point_at(self, s):
+        """Punto (x, y, rumbo del tramo) a longitud de arco s, acotada a [0, longitud total]"""
+        if len(self.segment_lengths) == 0:
+            return self[0]
+        s = min(max(s, 0.0), self.total_length)
+        segment = self.segment_at(s)
+        length = self.segment_lengths[segment]
+        t = (s - self.cumulative_length[segment]) / length if length > 0 else 0.0
+        a = self.xy[segment]
+        b = self.xy[segment + 1]
+        heading = math.atan2(b[1] - a[1], b[0] - a[0])
+        return (float(a[0] + t * (b[0] - a[0])), float(a[1] + t * (b[1] - a[1])), heading)
+
+    def curvatures(self):
+        """Curvatura (1/m) con signo en cada punto, estimada con el círculo por tres puntos"""
+        curvature = np.zeros(len(self.points))
+        if len(self.points) < 3:
+            return curvature
+        a, b, c = self.xy[:-2], self.xy[1:-1], self.xy[2:]
+        ab, bc, ac = b - a, c - b, c - a
+        cross = ab[:, 0] * bc[:, 1] - ab[:, 1] * bc[:, 0]
+        denominator = (np.hypot(ab[:, 0], ab[:, 1]) * np.hypot(bc[:, 0], bc[:, 1])
+                       * np.hypot(ac[:, 0], ac[:, 1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            curvature[1:-1] = np.where(denominator > 0, 2 * cross / denominator, 0.0)
+        curvature[0], curvature[-1] = curvature[1], curvature[-2]
+        return curvature
+
+    def speed_at(self, s):
+        """Velocidad del perfil (si lo hay) a longitud de arco s, interpolada linealmente"""
+        if self.speeds is None:
+            return None
+        return float(np.interp(s, self.cumulative_length, self.speeds))
+
+
+def smooth_path(waypoints, start=None, start_heading=None, spacing=0.05):
+    """Spline Catmull-Rom centrípeta que pasa por los puntos (x, y[, theta]) dados
+
+    start añade la posición actual del robot como primer punto; start_heading
+    orienta la tangente inicial. Devuelve una ArrayPath muestreada cada
+    ~spacing metros; la orientación del último punto se conserva si se dio.
+    """
+    waypoints = np.asarray(waypoints, dtype=np.float64).reshape(len(waypoints), -1)
+    control = waypoints[:, :2]
+    if start is not None:
+        control = np.vstack((np.asarray(start, dtype=np.float64)[:2], control))
+    # Eliminar puntos repetidos consecutivos
+    keep = np.concatenate(([True], np.hypot(*np.diff(control, axis=0).T) > 1e-9))
+    control = control[keep]
+    if len(control) < 2:
+        return ArrayPath(waypoints[-1:, :3] if waypoints.shape[1] == 3 else control)
+
+    # Puntos virtuales en los extremos
+    if start_heading is not None:
+        first_length = np.hypot(*(control[1] - control[0]))
+        before = control[0] - first_length * np.array([math.cos(start_heading), math.sin(start_heading)])
+    else:
+        before = 2 * control[0] - control[1]
+    after = 2 * control[-1] - control[-2]
+    extended = np.vstack((before, control, after))
+
+    samples = [control[:1]]
+    for i in range(1, len(extended) - 2):
+        p0, p1, p2, p3 = extended[i - 1:i + 3]
+        # Parametrización centrípeta (alpha = 0.5)
+        t0 = 0.0
+        t1 = t0 + max(np.hypot(*(p1 - p0)), 1e-9) ** 0.5
+        t2 = t1 + max(np.hypot(*(p2 - p1)), 1e-9) ** 0.5
+        t3 = t2 + max(np.hypot(*(p3 - p2)), 1e-9) ** 0.5
+        count = max(2, int(math.ceil(np.hypot(*(p2 - p1)) / spacing)))
+        t = np.linspace(t1, t2, count + 1)[1:, None]
+        a1 = (t1 - t) / (t1 - t0) * p0 + (t - t0) / (t1 - t0) * p1
+        a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
+        a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
+        b1 = (t2 - t) / (t2 - t0) * a1 + (t - t0) / (t2 - t0) * a2
+        b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
+        samples.append((t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2)
+
+    xy = np.vstack(samples)
+    headings = ArrayPath._segment_headings(xy)
+    if waypoints.shape[1] == 3:
+        headings[-1] = waypoints[-1, 2]
+    return ArrayPath(np.column_stack((xy, headings)))
+
+
+def speed_profile(path, max_wheel_velocity, wheel_radius, wheel_distance, max_acceleration=0.5,
+                  initial_speed=0.0, min_speed=0.05, final_speed=0.0):
+    """Perfil de velocidad limitado por curvatura y aceleración para una ArrayPath
+
+    En cada punto la velocidad se limita para que ninguna rueda supere
+    max_wheel_velocity con la curvatura local, y luego se aplican pasadas
+    hacia adelante y hacia atrás con v^2 = v0^2 + 2*a*ds. Guarda el resultado
+    en path.speeds y lo devuelve.
+    """
+    curvature = np.abs(path.curvatures())
+    limit = max_wheel_velocity * wheel_radius / (1 + curvature * wheel_distance / 2)
+
+    speeds = limit.copy()
+    speeds[0] = min(speeds[0], max(initial_speed, min_speed))
+    speeds[-1] = min(speeds[-1], final_speed)
+    ds = path.segment_lengths
+    for i in range(1, len(speeds)):
+        speeds[i] = min(speeds[i], math.sqrt(speeds[i - 1] ** 2 + 2 * max_acceleration * ds[i - 1]))
+    for i in range(len(speeds) - 2, -1, -1):
+        speeds[i] = min(speeds[i], math.sqrt(speeds[i + 1] ** 2 + 2 * max_acceleration * ds[i]))
+
+    path.speeds = np.maximum(speeds, min(min_speed, speeds.max()))
+    path.speeds[-1] = max(final_speed, 0.0)
+    return path.speeds
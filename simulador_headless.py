@@ -0,0 +1,188 @@
+import argparse
+import math
+import numpy as np
+
+from robot_simulador import DifferentialRobot, GRID_SPACING
+from obstaculos import ObstacleWorld
+from grabacion import TrajectoryRecorder
+from analitica import TrajectoryAnalytics
+from importador import load_command
+
+# Formato de cada muestra de la trayectoria grabada
+TRAJECTORY_DTYPE = np.dtype([
+    ("t", np.float64),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("theta", np.float64),
+    ("v_left", np.float64),
+    ("v_right", np.float64),
+    ("left_voltage", np.float64),
+    ("right_voltage", np.float64),
+])
+
+
+def mission_complete(robot):
+    """Indica si el robot terminó su misión automática (o está quieto en modo manual)"""
+    if robot.control_mode == "AUTO_PATH":
+        return robot.current_path_index >= len(robot.path)
+    if robot.control_mode == "AUTO_PURSUIT":
+        return False
+    if robot.control_mode == "AUTO_POSITION":
+        if not robot.target_position:
+            return True
+        target_x, target_y, target_theta = robot.target_position
+        distance = math.hypot(target_x - robot.x, target_y - robot.y)
+        angle_diff = (target_theta - robot.theta) % (2 * math.pi)
+        if angle_diff > math.pi:
+            angle_diff -= 2 * math.pi
+        return distance < robot.position_tolerance and abs(angle_diff) < robot.angle_tolerance
+    return robot.left_voltage == 0.0 and robot.right_voltage == 0.0
+
+
+class HeadlessRunner:
+    """Avanza un DifferentialRobot con paso fijo, sin ventana ni contexto OpenGL.
+
+    La simulación corre tan rápido como lo permita la CPU y devuelve la
+    trayectoria grabada como un arreglo estructurado (TRAJECTORY_DTYPE).
+    """
+
+    def __init__(self, robot=None, dt=0.01, record_every=1):
+        self.robot = robot if robot is not None else DifferentialRobot()
+        self.dt = dt
+        self.record_every = max(1, int(record_every))
+        self.time = 0.0
+        self.steps = 0
+
+    def step(self):
+        """Avanza la simulación un paso fijo"""
+        self.robot.update(self.dt)
+        self.steps += 1
+        self.time = self.steps * self.dt
+
+    def run(self, duration=None, max_steps=None, stop_when=mission_complete):
+        """Simula hasta cumplir la duración, el número de pasos o la condición de parada
+
+        Devuelve la trayectoria grabada (incluye el estado inicial).
+        """
+        if duration is None and max_steps is None and stop_when is None:
+            raise ValueError("Se necesita duration, max_steps o stop_when para terminar")
+
+        limit = math.inf
+        if duration is not None:
+            limit = min(limit, int(math.ceil(duration / self.dt - 1e-9)))
+        if max_steps is not None:
+            limit = min(limit, max_steps)
+
+        # Preasignar la grabación y duplicarla sólo si la simulación no tiene límite fijo
+        capacity = int(limit // self.record_every) + 1 if limit != math.inf else 4096
+        trajectory = np.empty(capacity, dtype=TRAJECTORY_DTYPE)
+        count = 0
+
+        steps = 0
+        while True:
+            if (steps % self.record_every) == 0:
+                if count == len(trajectory):
+                    trajectory = np.resize(trajectory, 2 * len(trajectory))
+                trajectory[count] = self._sample()
+                count += 1
+
+            if steps >= limit or (stop_when is not None and steps > 0 and stop_when(self.robot)):
+                break
+
+            self.step()
+            steps += 1
+
+        # Guardar siempre el último estado
+        if (steps % self.record_every) != 0:
+            if count == len(trajectory):
+                trajectory = np.resize(trajectory, len(trajectory) + 1)
+            trajectory[count] = self._sample()
+            count += 1
+
+        return trajectory[:count].copy()
+
+    def _sample(self):
+        robot = self.robot
+        return (self.time, robot.x, robot.y, robot.theta, robot.v_left, robot.v_right,
+                robot.left_voltage, robot.right_voltage)
+
+
+def parse_pose(text):
+    """Convierte 'x,y[,theta_grados]' en una tupla (x, y, theta_rad o None)"""
+    values = [float(v) for v in text.split(",")]
+    if len(values) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"Pose inválida: {text}")
+    theta = math.radians(values[2]) if len(values) == 3 else None
+    return values[0], values[1], theta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulación sin ventana del robot diferencial")
+    parser.add_argument("--dt", type=float, default=0.01, help="Paso fijo de simulación (s)")
+    parser.add_argument("--duration", type=float, default=None, help="Tiempo máximo simulado (s)")
+    parser.add_argument("--start", type=parse_pose, default=(0.0, 0.0, 0.0), help="Pose inicial x,y,theta")
+    parser.add_argument("--target", type=parse_pose, default=None, help="Objetivo x,y[,theta]")
+    parser.add_argument("--path", type=parse_pose, nargs="+", default=None, help="Ruta x,y,theta ...")
+    parser.add_argument("--pursuit", action="store_true",
+                        help="Seguir la ruta con punto adelantado (AUTO_PURSUIT) en lugar de punto a punto")
+    parser.add_argument("--smooth", action="store_true",
+                        help="Recorrer la ruta por una spline con perfil de velocidad sin parar en cada punto")
+    parser.add_argument("--lookahead", type=float, default=0.5, help="Distancia del punto adelantado (m)")
+    parser.add_argument("--integrator", choices=("EULER", "EXACT"), default="EULER",
+                        help="Integrador cinemático del robot")
+    parser.add_argument("--scene", default=None, help="Archivo JSON de escena con obstáculos")
+    parser.add_argument("--record-every", type=int, default=1, help="Grabar una muestra cada N pasos")
+    parser.add_argument("--out", default=None, help="Archivo .npy donde guardar la trayectoria")
+    parser.add_argument("--record", default=None, metavar="DIRECTORIO",
+                        help="Grabar cada paso en columnas binarias (reproducible con robot_simulador.py --replay)")
+    parser.add_argument("--import", dest="import_source", default=None, metavar="ARCHIVO",
+                        help="Ruta u objetivo en CSV, JSON o NPY (\"-\": entrada estándar); sustituye a --path/--target")
+    args = parser.parse_args(argv)
+
+    path = [(x, y, theta or 0.0) for x, y, theta in args.path] if args.path else None
+    target = args.target
+    if args.import_source:
+        kind, data = load_command(args.import_source)
+        path, target = (data, None) if kind == "path" else (None, data)
+
+    robot = DifferentialRobot()
+    robot.integrator = args.integrator
+    robot.x, robot.y = args.start[0], args.start[1]
+    robot.theta = args.start[2] or 0.0
+    if args.scene:
+        robot.obstacles = ObstacleWorld.load(args.scene, GRID_SPACING)
+    if path and args.smooth:
+        robot.lookahead_distance = args.lookahead
+        robot.track_waypoints(path)
+    elif path and args.pursuit:
+        robot.follow_path(path, lookahead=args.lookahead)
+    elif path:
+        robot.set_path(path)
+    elif target:
+        robot.set_target_position(*target)
+
+    if args.record:
+        robot.recorder = TrajectoryRecorder(args.record)
+    robot.analytics = TrajectoryAnalytics()
+
+    duration = args.duration if args.duration is not None else 600.0
+    runner = HeadlessRunner(robot, dt=args.dt, record_every=args.record_every)
+    trajectory = runner.run(duration=duration)
+
+    final = trajectory[-1]
+    print(f"Pasos: {runner.steps} | Tiempo simulado: {final['t']:.2f} s")
+    print(f"Posición final: ({final['x']:.3f}, {final['y']:.3f}) | "
+          f"Orientación: {math.degrees(final['theta']):.1f}°")
+    if robot.obstacles is not None:
+        print(f"Pasos revertidos por colisión: {robot.collisions}")
+    print("\n".join(robot.analytics.report()))
+    if robot.recorder is not None:
+        robot.recorder.close()
+        print(f"Grabación guardada en {args.record} ({robot.recorder.count} registros)")
+    if args.out:
+        np.save(args.out, trajectory)
+        print(f"Trayectoria guardada en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
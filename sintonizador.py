@@ -0,0 +1,189 @@
+import argparse
+import json
+import math
+import numpy as np
+
+from robot_simulador import DifferentialRobot
+from lote import load_scenarios, random_scenarios, run_batch
+
+# Intervalo de búsqueda de cada parámetro: ganancias de ControlGains y tolerancias del robot
+SEARCH_SPACE = {
+    "align_voltage": (0.5, 6.0),
+    "turn_voltage": (1.0, 12.0),
+    "heading_gate": (0.02, 0.5),
+    "turn_slowdown_angle": (0.1, 1.5),
+    "base_voltage": (3.0, 12.0),
+    "steering_gain": (0.0, 10.0),
+    "slowdown_distance": (0.2, 3.0),
+    "min_speed_factor": (0.05, 1.0),
+    "position_tolerance": (0.02, 0.1),
+    "angle_tolerance": (0.01, 0.05),
+}
+
+
+def default_params(space=SEARCH_SPACE):
+    """Valores actuales del robot para los parámetros del espacio de búsqueda"""
+    robot = DifferentialRobot()
+    values = robot.gains.as_dict()
+    values.update(position_tolerance=robot.position_tolerance, angle_tolerance=robot.angle_tolerance)
+    return {name: values[name] for name in space}
+
+
+class GainTuner:
+    """Búsqueda aleatoria con reducción sucesiva (successive halving) de las ganancias de move_to_target
+
+    Cada ronda evalúa a los candidatos que siguen en pie sobre más misiones
+    de la batería (todas las combinaciones candidato × misión de la ronda van
+    juntas a lote.run_batch, que las reparte entre los núcleos) y conserva
+    la mejor 1/eta parte. Un candidato sólo suma las misiones nuevas: las de
+    rondas anteriores ya están evaluadas.
+
+    La puntuación es el tiempo medio hasta la meta; una misión que no llega
+    o termina fuera de max_error / max_heading_error cuenta como max_time
+    más una penalización de otro max_time, así que ser rápido nunca
+    compensa ser impreciso.
+    """
+
+    def __init__(self, missions, space=SEARCH_SPACE, max_error=0.1, max_heading_error=0.05,
+                 workers=None, seed=None):
+        if not missions:
+            raise ValueError("Se necesita al menos una misión")
+        self.missions = list(missions)
+        self.space = dict(space)
+        self.max_error = max_error
+        self.max_heading_error = max_heading_error
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.evaluated = 0  # simulaciones ejecutadas
+
+    def sample(self, count):
+        """count candidatos al azar; el primero son los valores actuales, como referencia"""
+        names = list(self.space)
+        low = np.array([self.space[name][0] for name in names])
+        high = np.array([self.space[name][1] for name in names])
+        values = self.rng.uniform(low, high, (count, len(names)))
+        candidates = [dict(zip(names, row)) for row in values.tolist()]
+        if candidates:
+            candidates[0] = default_params(self.space)
+        return candidates
+
+    def evaluate(self, candidates, start, stop):
+        """Resultados (candidatos, misiones) de RESULT_DTYPE sobre las misiones [start, stop)"""
+        missions = self.missions[start:stop]
+        scenarios = [mission.with_params(candidate) for candidate in candidates for mission in missions]
+        results = run_batch(scenarios, workers=self.workers)
+        self.evaluated += len(scenarios)
+        return results.reshape(len(candidates), len(missions))
+
+    def accurate(self, results):
+        return (results["reached"] & (results["final_error"] <= self.max_error)
+                & (results["heading_error"] <= self.max_heading_error))
+
+    def score(self, results):
+        """Puntuación por candidato (menor es mejor) a partir de sus filas de resultados"""
+        max_time = np.array([mission.max_time for mission in self.missions[:results.shape[1]]])
+        time = np.where(results["reached"], results["time"], max_time)
+        penalty = np.where(self.accurate(results), 0.0, max_time)
+        return (time + penalty).mean(axis=1)
+
+    def tune(self, candidates=81, eta=3, min_missions=None, progress=None):
+        """Ejecuta la búsqueda y devuelve un diccionario con el mejor candidato y el de referencia
+
+        progress(ronda, candidatos, misiones) se llama al empezar cada ronda.
+        """
+        total = len(self.missions)
+        if min_missions is None:
+            # Tantas rondas como permita reducir los candidatos hasta uno
+            rounds = max(1, int(math.log(max(candidates, 1), eta)))
+            min_missions = max(1, total // eta ** (rounds - 1))
+        pool = self.sample(candidates)
+        results = [None] * len(pool)
+        alive = list(range(len(pool)))
+        done = 0
+        stop = min(total, min_missions)
+        round_number = 0
+        while True:
+            if progress is not None:
+                progress(round_number, len(alive), stop)
+            new = self.evaluate([pool[i] for i in alive], done, stop)
+            for row, i in enumerate(alive):
+                results[i] = new[row] if results[i] is None else np.concatenate((results[i], new[row]))
+            done = stop
+            scores = self.score(np.stack([results[i] for i in alive]))
+            order = np.argsort(scores, kind="stable")
+            if done >= total:
+                break
+            alive = [alive[i] for i in order[:max(1, math.ceil(len(alive) / eta))]]
+            # El último superviviente se evalúa directamente sobre el resto de la batería
+            stop = total if len(alive) == 1 else min(total, stop * eta)
+            round_number += 1
+
+        # Ganador: el más rápido entre los que cumplen todas las misiones con precisión
+        finalists = np.stack([results[i] for i in alive])
+        accuracy = self.accurate(finalists).mean(axis=1)
+        ranking = sorted(range(len(alive)), key=lambda k: (accuracy[k] < 1.0, scores[k]))
+        best = ranking[0]
+
+        if 0 in alive:
+            baseline_results = results[0]
+        else:
+            baseline_results = self.evaluate([pool[0]], 0, total)[0]
+        return {
+            "params": pool[alive[best]],
+            "score": float(scores[best]),
+            "accuracy": float(accuracy[best]),
+            "summary": self.summary(finalists[best]),
+            "baseline": pool[0],
+            "baseline_summary": self.summary(baseline_results),
+            "evaluated": self.evaluated,
+        }
+
+    def summary(self, results):
+        """Tiempo medio y precisión de un candidato sobre toda la batería"""
+        reached = results["reached"]
+        return {
+            "accuracy": float(self.accurate(results).mean()),
+            "reached": float(reached.mean()),
+            "mean_time": float(results["time"][reached].mean()) if reached.any() else math.nan,
+            "mean_error": float(results["final_error"].mean()),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ajuste automático de las ganancias de move_to_target")
+    parser.add_argument("--scenarios", default=None,
+                        help="Archivo JSON con la batería de misiones (por defecto, misiones al azar)")
+    parser.add_argument("--missions", type=int, default=81, help="Misiones al azar de la batería")
+    parser.add_argument("--candidates", type=int, default=81, help="Candidatos de la primera ronda")
+    parser.add_argument("--eta", type=int, default=3, help="Factor de reducción entre rondas")
+    parser.add_argument("--max-error", type=float, default=0.1, help="Error final de posición admitido (m)")
+    parser.add_argument("--max-heading-error", type=float, default=0.05,
+                        help="Error final de orientación admitido (rad)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de misiones y candidatos")
+    parser.add_argument("--out", default=None, help="Archivo JSON donde guardar las mejores ganancias")
+    args = parser.parse_args(argv)
+
+    missions = load_scenarios(args.scenarios) if args.scenarios else random_scenarios(args.missions, seed=args.seed)
+    tuner = GainTuner(missions, max_error=args.max_error, max_heading_error=args.max_heading_error,
+                      workers=args.workers, seed=args.seed)
+    result = tuner.tune(candidates=args.candidates, eta=args.eta,
+                        progress=lambda r, n, m: print(f"Ronda {r}: {n} candidatos × {m} misiones"))
+
+    for label, key in (("Actual", "baseline_summary"), ("Mejor", "summary")):
+        summary = result[key]
+        print(f"{label}: tiempo medio {summary['mean_time']:.2f} s | precisión {summary['accuracy']:.0%} | "
+              f"error final medio {summary['mean_error']:.3f} m")
+    if result["accuracy"] < 1.0:
+        print("Ningún candidato cumplió todas las misiones con la precisión pedida")
+    for name, value in result["params"].items():
+        print(f"  {name} = {value:.4g}")
+    print(f"Simulaciones: {result['evaluated']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result["params"], f, indent=2)
+        print(f"Ganancias guardadas en {args.out}")
+
+
+if __name__ == "__main__":
+    main()